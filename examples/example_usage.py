@@ -63,15 +63,18 @@ def main():
         }
     ]
     
-    results = []
-    for patient in patients:
-        response = requests.post(f"{base_url}/predict", json=patient["data"])
-        result = response.json()
-        results.append({
-            "patient_id": patient["id"],
-            "prediction": result["prediction"],
-            "model_version": result["model_version"]
-        })
+    # One request for the whole roster instead of one POST per patient
+    batch = {"instances": [dict(p["data"], id=p["id"]) for p in patients]}
+    response = requests.post(f"{base_url}/predict/batch", json=batch)
+    batch_result = response.json()
+    results = [
+        {
+            "patient_id": item["id"],
+            "prediction": item["prediction"],
+            "model_version": batch_result["model_version"]
+        }
+        for item in batch_result["predictions"]
+    ]
     
     # Sort by risk (descending)
     results.sort(key=lambda x: x["prediction"], reverse=True)
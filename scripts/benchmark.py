@@ -1,16 +1,52 @@
 """
-Benchmark script to compare model versions.
+Benchmark harness comparing model artifacts and inference engines.
+
+Each engine is timed with ``perf_counter_ns`` over a sweep of batch sizes
+(1 row up to 1M synthetic rows drawn from the diabetes feature
+distribution), with warmup calls and repeated trials. Results report the
+median, IQR and rows/sec, and can be saved as a baseline that later runs
+are checked against. Folded linear models are also run at each inference
+precision as the API serves them: rows are decoded from raw float64 and
+float32 request bodies, and the report gives the deviation from float64 on
+the test split, the input memory per row and the throughput of each body.
+Linear models also report the added cost of ``explain=true``: computing the
+contributions and top drivers, and building and JSON-encoding a batch
+response with and without explanations.
 """
+import argparse
+import subprocess
+import sys
 import time
 import pickle
 import json
 import numpy as np
 from pathlib import Path
-from sklearn.datasets import load_diabetes
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.artifact import load_artifact  # noqa: E402
+from src.datacache import load_split  # noqa: E402
+from src.codec import CODECS, F32_MEDIA_TYPE, F64_MEDIA_TYPE  # noqa: E402
+from src.explain import LinearExplainer  # noqa: E402
+from src.inference import (  # noqa: E402
+    PRECISION_TOLERANCE, PRECISIONS, ReducedPrecisionEngine, SklearnEngine, build_engine,
+    engine_from_artifact, stored_deviation,
+)
+
 RANDOM_SEED = 42
+LOAD_REPEATS = 50
+
+BATCH_SIZES = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+# Explained responses are JSON-encoded, so the explain sweep stops earlier
+EXPLAIN_MAX_BATCH = 10_000
+WARMUP_CALLS = 3
+TRIALS = 15
+# Small batches are called in a loop until one trial lasts at least this long,
+# so timer resolution and call overhead do not dominate the measurement
+MIN_TRIAL_NS = 2_000_000
+REGRESSION_THRESHOLD = 0.10
+BASELINE_PATH = Path("models") / "benchmark_baseline.json"
 
 
 def load_model(model_path):
@@ -19,100 +55,405 @@ def load_model(model_path):
         return pickle.load(f)
 
 
-def benchmark_model(model_path, X_test, y_test):
-    """Benchmark a model's performance and speed."""
-    print(f"\nBenchmarking {model_path.name}...")
-    
-    # Load model
+def time_load(load_fn, path, repeats=LOAD_REPEATS):
+    """Median wall time (ms) of loading an artifact ready for serving."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load_fn(path)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+COLD_LOAD_SNIPPETS = {
+    "pickle": "import pickle; pickle.load(open({path!r}, 'rb'))",
+    "binary": (
+        "from src.artifact import load_artifact; "
+        "from src.inference import engine_from_artifact; "
+        "engine_from_artifact(load_artifact({path!r}))"
+    ),
+}
+
+
+def time_cold_load(fmt, path):
+    """Wall time (ms) to import dependencies and load an artifact in a fresh process."""
+    code = (
+        "import time; _t = time.perf_counter(); "
+        + COLD_LOAD_SNIPPETS[fmt].format(path=str(path))
+        + "; print((time.perf_counter() - _t) * 1000)"
+    )
+    repo_root = Path(__file__).resolve().parent.parent
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=repo_root
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def load_binary_engine(path):
+    """Map a binary artifact and build its inference engine."""
+    return engine_from_artifact(load_artifact(path))
+
+
+def synthetic_rows(X, n_rows, seed=RANDOM_SEED):
+    """Sample rows from a multivariate normal fitted to the feature matrix ``X``."""
+    X = np.asarray(X, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    return rng.multivariate_normal(X.mean(axis=0), np.cov(X, rowvar=False), size=n_rows)
+
+
+def calibrate(fn, min_trial_ns=MIN_TRIAL_NS):
+    """Number of calls per trial needed for a trial to last ``min_trial_ns``."""
+    start = time.perf_counter_ns()
+    fn()
+    once = max(time.perf_counter_ns() - start, 1)
+    return max(1, -(-min_trial_ns // once))
+
+
+def measure(fn, warmup=WARMUP_CALLS, trials=TRIALS, min_trial_ns=MIN_TRIAL_NS):
+    """
+    Time ``fn()`` and return per-call statistics in nanoseconds.
+
+    Warmup calls are discarded. Each trial runs ``fn`` ``inner`` times and
+    records the mean; median and IQR are taken across trials.
+    """
+    for _ in range(warmup):
+        fn()
+    inner = calibrate(fn, min_trial_ns)
+    samples = []
+    for _ in range(trials):
+        start = time.perf_counter_ns()
+        for _ in range(inner):
+            fn()
+        samples.append((time.perf_counter_ns() - start) / inner)
+    q1, median, q3 = np.percentile(samples, [25, 50, 75])
+    return {
+        "median_ns": float(median),
+        "iqr_ns": float(q3 - q1),
+        "min_ns": float(min(samples)),
+        "trials": trials,
+        "calls_per_trial": int(inner),
+    }
+
+
+def model_name(model_path):
+    """Label for an artifact: ``model`` or ``<version>/model`` for versioned dirs."""
+    if model_path.parent == Path("models"):
+        return model_path.stem
+    return f"{model_path.parent.name}/{model_path.stem}"
+
+
+def artifact_engines(model_path):
+    """Engines to benchmark for one artifact: {name: engine}."""
     pipeline = load_model(model_path)
-    
-    # Measure prediction time
-    start_time = time.time()
-    X_scaled = pipeline["scaler"].transform(X_test)
-    predictions = pipeline["model"].predict(X_scaled)
-    end_time = time.time()
-    
+    engines = {"sklearn": SklearnEngine(pipeline)}
+    fused = build_engine(pipeline)
+    if fused.kind != "sklearn":
+        engines[fused.kind] = fused
+    binary_path = model_path.with_suffix(".bin")
+    if binary_path.exists():
+        try:
+            engines["binary"] = load_binary_engine(binary_path)
+        except ValueError as e:
+            print(f"  Skipping {binary_path.name}: {e}")
+    return pipeline, engines
+
+
+def sweep(engine, X_synth, batch_sizes, warmup, trials):
+    """Time ``engine.predict`` for each batch size."""
+    points = []
+    for size in batch_sizes:
+        batch = np.ascontiguousarray(X_synth[:size])
+        stats = measure(lambda: engine.predict(batch), warmup=warmup, trials=trials)
+        stats["batch_size"] = size
+        stats["rows_per_sec"] = size / (stats["median_ns"] / 1e9)
+        points.append(stats)
+        print(f"    {size:>9,} rows: median {stats['median_ns'] / 1e3:>12.2f} µs  "
+              f"IQR {stats['iqr_ns'] / 1e3:>10.2f} µs  {stats['rows_per_sec']:>14,.0f} rows/s")
+    return points
+
+
+def precision_report(fused, X_test, X_synth, warmup, trials):
+    """Deviation, input memory and served throughput of each precision."""
+    # Decode the rows exactly as the raw codecs hand them to the engine
+    bodies = {
+        "float64": CODECS[F64_MEDIA_TYPE].decode(X_synth.astype("<f8").tobytes()),
+        "float32": CODECS[F32_MEDIA_TYPE].decode(X_synth.astype("<f4").tobytes()),
+    }
+    X_test = np.asarray(X_test, dtype=np.float64)
+    report = {}
+    for precision in PRECISIONS:
+        if precision == "float64":
+            engine, deviation = fused, 0.0
+        else:
+            engine = ReducedPrecisionEngine(fused.weights, fused.bias, precision)
+            deviation = stored_deviation(engine, fused, X_test)
+        stored = bodies[precision]
+        timings = {body: measure(lambda: engine.predict(X), warmup=warmup, trials=trials)
+                   for body, X in bodies.items()}
+        report[precision] = {
+            "max_deviation": deviation,
+            "enabled": deviation <= PRECISION_TOLERANCE,
+            "input_bytes_per_row": stored.itemsize * stored.shape[1],
+            "rows_per_sec_from_float64": len(stored) / (timings["float64"]["median_ns"] / 1e9),
+            "rows_per_sec_from_stored": len(stored) / (timings[precision]["median_ns"] / 1e9),
+            "rows_per_sec_from_float32": len(stored) / (timings["float32"]["median_ns"] / 1e9),
+        }
+        print(f"    {precision:<8} deviation {deviation:>9.3g}  "
+              f"{report[precision]['input_bytes_per_row']:>3} B/row  "
+              f"{report[precision]['rows_per_sec_from_float64']:>14,.0f} rows/s from f64 body  "
+              f"{report[precision]['rows_per_sec_from_float32']:>14,.0f} rows/s from f32 body")
+    return report
+
+
+def batch_response(engine, X, explainer=None):
+    """A /predict/batch JSON body as the API renders it, optionally explained."""
+    predictions = engine.predict(X).tolist()
+    items = [{"index": i, "id": None, "prediction": p} for i, p in enumerate(predictions)]
+    if explainer is not None:
+        for item, explanation in zip(items, explainer.explain(X)):
+            item["explanation"] = explanation
+    content = {"predictions": items, "errors": [], "model_version": "benchmark"}
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def explain_report(engine, explainer, X_synth, batch_sizes, warmup, trials):
+    """Added cost of explanations, for the computation and the JSON response."""
+    points = []
+    for size in [b for b in batch_sizes if b <= EXPLAIN_MAX_BATCH]:
+        X = np.ascontiguousarray(X_synth[:size])
+
+        def compute():
+            engine.predict(X)
+            explainer.top_drivers(explainer.contributions(X))
+
+        timings = {
+            "predict": measure(lambda: engine.predict(X), warmup=warmup, trials=trials),
+            "compute": measure(compute, warmup=warmup, trials=trials),
+            "response": measure(lambda: batch_response(engine, X), warmup=warmup, trials=trials),
+            "explained": measure(lambda: batch_response(engine, X, explainer),
+                                 warmup=warmup, trials=trials),
+        }
+        median = {name: t["median_ns"] for name, t in timings.items()}
+        point = {
+            "batch_size": size,
+            **{f"{name}_us": round(ns / 1e3, 2) for name, ns in median.items()},
+            "compute_overhead": median["compute"] / median["predict"] - 1,
+            "response_overhead": median["explained"] / median["response"] - 1,
+            "response_size_ratio": (len(batch_response(engine, X, explainer))
+                                    / len(batch_response(engine, X))),
+        }
+        points.append(point)
+        print(f"    {size:>6,} rows: compute {point['compute_us']:>9.2f} µs "
+              f"(predict {point['predict_us']:>8.2f})  JSON response "
+              f"{point['explained_us']:>10.2f} µs (plain {point['response_us']:>9.2f}, "
+              f"{point['response_overhead']:+.0%}, {point['response_size_ratio']:.1f}x bytes)")
+    return points
+
+
+def benchmark_model(model_path, X_test, y_test, X_synth, batch_sizes, warmup, trials):
+    """Benchmark a model's accuracy, load time and inference speed per engine."""
+    print(f"\nBenchmarking {model_path}...")
+
+    pipeline, engines = artifact_engines(model_path)
+
     # Calculate metrics
+    predictions = pipeline["model"].predict(pipeline["scaler"].transform(X_test))
     rmse = np.sqrt(mean_squared_error(y_test, predictions))
     mae = mean_absolute_error(y_test, predictions)
     r2 = r2_score(y_test, predictions)
-    
-    # Calculate speed metrics
-    total_time = end_time - start_time
-    time_per_sample = (total_time / len(X_test)) * 1000  # ms
-    
+
     # Get model size
     model_size_mb = model_path.stat().st_size / (1024 * 1024)
-    
-    results = {
-        "model": model_path.stem,
+
+    # Measure load time for the pickle and (if present) binary artifact
+    pickle_load_ms = time_load(load_model, model_path)
+    binary_path = model_path.with_suffix(".bin")
+    has_binary = "binary" in engines
+    binary_load_ms = time_load(load_binary_engine, binary_path) if has_binary else None
+    pickle_cold_ms = time_cold_load("pickle", model_path.resolve())
+    binary_cold_ms = time_cold_load("binary", binary_path.resolve()) if has_binary else None
+
+    # Sweep batch sizes for every engine that can serve this artifact
+    sweeps = {}
+    for name, engine in engines.items():
+        print(f"  {name} engine:")
+        sweeps[name] = sweep(engine, X_synth, batch_sizes, warmup, trials)
+
+    precision = None
+    if "fused-linear" in engines:
+        print(f"  Reduced precision ({len(X_synth):,} rows, tolerance {PRECISION_TOLERANCE:g}):")
+        precision = precision_report(engines["fused-linear"], X_test, X_synth, warmup, trials)
+
+    explain = None
+    if "fused-linear" in engines:
+        print("  Explanations (explain=true):")
+        explain = explain_report(engines["fused-linear"], LinearExplainer.from_pipeline(pipeline),
+                                 X_synth, batch_sizes, warmup, trials)
+
+    return {
+        "model": model_name(model_path),
         "rmse": round(rmse, 2),
         "mae": round(mae, 2),
         "r2": round(r2, 4),
-        "total_time_ms": round(total_time * 1000, 2),
-        "time_per_sample_ms": round(time_per_sample, 4),
-        "throughput_samples_per_sec": round(len(X_test) / total_time, 2),
-        "model_size_mb": round(model_size_mb, 3)
+        "model_size_mb": round(model_size_mb, 3),
+        "pickle_load_ms": round(pickle_load_ms, 4),
+        "binary_load_ms": None if binary_load_ms is None else round(binary_load_ms, 4),
+        "pickle_cold_load_ms": round(pickle_cold_ms, 2),
+        "binary_cold_load_ms": None if binary_cold_ms is None else round(binary_cold_ms, 2),
+        "engines": sweeps,
+        "precision": precision,
+        "explain": explain,
     }
-    
-    return results
 
 
-def main():
-    """Run benchmark comparison."""
-    print("🔬 Model Benchmark Comparison")
-    print("=" * 60)
-    
-    # Load data
-    diabetes = load_diabetes(as_frame=True)
-    X = diabetes.frame.drop(columns=["target"])
-    y = diabetes.frame["target"]
-    
-    # Split data (same as training)
-    _, X_test, _, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=RANDOM_SEED
-    )
-    
-    print(f"Test set size: {len(X_test)} samples")
-    
-    # Find all model files
-    model_dir = Path("models")
-    model_files = list(model_dir.glob("model*.pkl"))
-    
-    if not model_files:
-        print("❌ No model files found. Please train a model first.")
-        return
-    
-    # Benchmark each model
-    results = []
-    for model_path in model_files:
-        result = benchmark_model(model_path, X_test, y_test)
-        results.append(result)
-    
-    # Display results
+def _points(results):
+    """Flatten results to {(model, engine, batch_size): point}."""
+    return {
+        (r["model"], engine, p["batch_size"]): p
+        for r in results
+        for engine, points in r["engines"].items()
+        for p in points
+    }
+
+
+def find_regressions(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare with a baseline run; return a list of regression descriptions.
+
+    A point regresses when its median exceeds the baseline median by more
+    than ``threshold`` and by more than the baseline's IQR, so ordinary
+    trial-to-trial noise does not fail the run.
+    """
+    old_points = _points(baseline["results"])
+    regressions = []
+    for key, point in sorted(_points(results).items()):
+        old = old_points.get(key)
+        if old is None:
+            continue
+        slowdown = point["median_ns"] / old["median_ns"] - 1
+        if slowdown > threshold and point["median_ns"] - old["median_ns"] > old["iqr_ns"]:
+            model, engine, size = key
+            regressions.append(f"{model} [{engine}] {size:,} rows: {slowdown:+.1%} "
+                               f"({old['median_ns'] / 1e3:.2f} → {point['median_ns'] / 1e3:.2f} µs)")
+    return regressions
+
+
+def print_results(results):
+    """Display accuracy, size, load time and the fastest sweep points."""
     print("\n" + "=" * 60)
     print("📊 BENCHMARK RESULTS")
     print("=" * 60)
-    
+
     for result in results:
         print(f"\n{result['model']}:")
         print(f"  Accuracy Metrics:")
         print(f"    RMSE: {result['rmse']}")
         print(f"    MAE:  {result['mae']}")
         print(f"    R²:   {result['r2']}")
-        print(f"  Performance Metrics:")
-        print(f"    Total time:     {result['total_time_ms']:.2f} ms")
-        print(f"    Time/sample:    {result['time_per_sample_ms']:.4f} ms")
-        print(f"    Throughput:     {result['throughput_samples_per_sec']:.0f} samples/sec")
+        print(f"  Performance Metrics (median per call):")
+        for engine, points in result["engines"].items():
+            single, largest = points[0], points[-1]
+            print(f"    {engine:<13} {single['batch_size']:,} row: {single['median_ns'] / 1e3:.2f} µs   "
+                  f"{largest['batch_size']:,} rows: {largest['rows_per_sec']:,.0f} rows/s")
+        if result.get("precision"):
+            print(f"  Precision (max deviation on test split, input memory, rows/s as served):")
+            for name, p in result["precision"].items():
+                status = "ok" if p["enabled"] else "refused"
+                print(f"    {name:<8} {p['max_deviation']:<9.3g} {status:<8} "
+                      f"{p['input_bytes_per_row']:>3} B/row  {p['rows_per_sec_from_stored']:,.0f} rows/s")
+        if result.get("explain"):
+            print("  Explain overhead (computation / JSON batch response):")
+            for p in result["explain"]:
+                print(f"    {p['batch_size']:>6,} rows: {p['compute_overhead']:+.0%} / "
+                      f"{p['response_overhead']:+.0%}")
         print(f"  Model size: {result['model_size_mb']:.3f} MB")
-    
+        print(f"  Load time (warm / fresh process incl. imports):")
+        print(f"    Pickle:         {result['pickle_load_ms']:.4f} ms / "
+              f"{result['pickle_cold_load_ms']:.1f} ms")
+        if result['binary_load_ms'] is not None:
+            print(f"    Binary (mmap):  {result['binary_load_ms']:.4f} ms / "
+                  f"{result['binary_cold_load_ms']:.1f} ms")
+        else:
+            print(f"    Binary (mmap):  n/a (no {result['model']}.bin)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-sizes", default=",".join(str(b) for b in BATCH_SIZES),
+                        help="Comma-separated batch sizes to sweep")
+    parser.add_argument("--warmup", type=int, default=WARMUP_CALLS, help="Discarded calls per point")
+    parser.add_argument("--trials", type=int, default=TRIALS, help="Timed trials per point")
+    parser.add_argument("--save-baseline", nargs="?", const=str(BASELINE_PATH),
+                        help=f"Save this run as the baseline (default {BASELINE_PATH})")
+    parser.add_argument("--baseline", help="Fail if this run regresses against the given baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Allowed slowdown of a median before failing (0.10 = 10%%)")
+    parser.add_argument("--output", default=str(Path("models") / "benchmark_results.json"))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run benchmark comparison."""
+    args = parse_args(argv)
+    batch_sizes = sorted(int(b) for b in args.batch_sizes.split(","))
+
+    print("🔬 Model Benchmark Comparison")
+    print("=" * 60)
+
+    # Load and split data (same as training; memory-mapped from the data cache)
+    split = load_split(test_size=0.2, seed=RANDOM_SEED)
+    X_test, y_test = split["X_test"], split["y_test"]
+    X_synth = synthetic_rows(split["X"], max(batch_sizes))
+
+    print(f"Test set size: {len(X_test)} samples")
+    print(f"Synthetic rows: {len(X_synth):,}; batch sizes: {', '.join(f'{b:,}' for b in batch_sizes)}")
+    print(f"Warmup calls: {args.warmup}; trials per point: {args.trials}")
+
+    # Find all model files, including versioned directories
+    model_dir = Path("models")
+    model_files = sorted(model_dir.glob("model*.pkl")) + sorted(model_dir.glob("*/model.pkl"))
+
+    if not model_files:
+        print("❌ No model files found. Please train a model first.")
+        return
+
+    # Benchmark each model
+    results = [
+        benchmark_model(path, X_test, y_test, X_synth, batch_sizes, args.warmup, args.trials)
+        for path in model_files
+    ]
+    print_results(results)
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "settings": {"batch_sizes": batch_sizes, "warmup": args.warmup, "trials": args.trials},
+        "results": results,
+    }
+
     # Save results
-    output_file = model_dir / "benchmark_results.json"
+    output_file = Path(args.output)
     with open(output_file, 'w') as f:
-        json.dump(results, f, indent=2)
-    
+        json.dump(run, f, indent=2)
     print(f"\n✅ Results saved to {output_file}")
 
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"📌 Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
 
 if __name__ == "__main__":
     main()
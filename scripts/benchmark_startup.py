@@ -0,0 +1,129 @@
+"""
+Cold-start benchmark: time from launching the API process to the first
+successful /health and /predict responses, per startup configuration.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+PAYLOAD = {
+    "age": 0.02, "sex": -0.044, "bmi": 0.06, "bp": -0.03, "s1": -0.02,
+    "s2": 0.03, "s3": -0.02, "s4": 0.02, "s5": 0.02, "s6": -0.001
+}
+
+# Startup configurations compared by default: (name, environment overrides)
+CONFIGS = [
+    ("eager-pickle", {"STARTUP_MODE": "eager", "MODEL_FORMAT": "pickle"}),
+    ("eager-binary", {"STARTUP_MODE": "eager", "MODEL_FORMAT": "binary"}),
+    ("lazy-binary", {"STARTUP_MODE": "lazy", "MODEL_FORMAT": "binary"}),
+]
+
+
+def free_port():
+    """Ask the OS for an unused local port."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, data=None, timeout=30.0, poll=0.005):
+    """Poll ``url`` until it returns 200; return the response body."""
+    deadline = time.perf_counter() + timeout
+    headers = {"Content-Type": "application/json"} if data else {}
+    while time.perf_counter() < deadline:
+        try:
+            req = urllib.request.Request(url, data=data, headers=headers)
+            with urllib.request.urlopen(req, timeout=1) as resp:
+                if resp.status == 200:
+                    return json.loads(resp.read())
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(poll)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def measure_once(env_overrides):
+    """Start one server process and time its first /health and /predict."""
+    port = free_port()
+    env = dict(os.environ, **env_overrides)
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        health = wait_for(f"http://127.0.0.1:{port}/health")
+        health_ms = (time.perf_counter() - start) * 1000
+        wait_for(f"http://127.0.0.1:{port}/predict", data=json.dumps(PAYLOAD).encode())
+        predict_ms = (time.perf_counter() - start) * 1000
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return health_ms, predict_ms, health.get("startup", {})
+
+
+def benchmark_config(name, env_overrides, repeats):
+    """Repeat the cold start and summarise it with medians."""
+    print(f"\nBenchmarking {name} ({repeats} runs)...")
+    runs = [measure_once(env_overrides) for _ in range(repeats)]
+    health, predict, timings = zip(*runs)
+    import_ms = [t.get("import_ms", np.nan) for t in timings]
+    load_ms = [t.get("model_load_ms", np.nan) for t in timings]
+    return {
+        "config": name,
+        "env": env_overrides,
+        "first_health_ms": round(float(np.median(health)), 1),
+        "first_predict_ms": round(float(np.median(predict)), 1),
+        "module_import_ms": round(float(np.nanmedian(import_ms)), 1),
+        "model_load_ms": round(float(np.nanmedian(load_ms)), 2),
+        "sklearn_imported": any(t.get("sklearn_imported") for t in timings),
+    }
+
+
+def main():
+    """Run the cold-start benchmark for each configuration."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default="models/startup_benchmark.json")
+    args = parser.parse_args()
+
+    print("🚀 API Cold-Start Benchmark")
+    print("=" * 60)
+
+    if not (REPO_ROOT / "models" / "model.pkl").exists():
+        print("❌ No model files found. Please train a model first.")
+        return
+
+    results = [benchmark_config(name, env, args.repeats) for name, env in CONFIGS]
+
+    print("\n" + "=" * 60)
+    print("📊 STARTUP RESULTS (medians)")
+    print("=" * 60)
+    for r in results:
+        print(f"\n{r['config']}:")
+        print(f"  First /health:   {r['first_health_ms']:.1f} ms")
+        print(f"  First /predict:  {r['first_predict_ms']:.1f} ms")
+        print(f"  Module import:   {r['module_import_ms']:.1f} ms")
+        print(f"  Model load:      {r['model_load_ms']:.2f} ms")
+        print(f"  sklearn imported: {r['sklearn_imported']}")
+
+    output_file = REPO_ROOT / args.output
+    with open(output_file, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n✅ Results saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Worker-scaling benchmark: throughput of ``python -m src.serve`` from 1 to N
+worker processes, driven by the load generator in ``scripts/load_test.py``.
+
+The load is produced by several client processes so the client does not cap
+the measured throughput. On a single machine clients and workers share the
+cores, so pin them apart (e.g. ``taskset``) for clean numbers on big hosts.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scripts.benchmark_startup import REPO_ROOT, free_port, wait_for  # noqa: E402
+from scripts.load_test import SCENARIOS, build_requests, run_load, sample_rows, summarise  # noqa: E402
+from src.serve import default_workers  # noqa: E402
+
+
+def start_supervisor(n_workers, env_overrides):
+    """Start ``src.serve`` with ``n_workers`` and wait until it answers."""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.serve", "--workers", str(n_workers),
+         "--port", str(port), "--log-level", "warning", "--watch-interval", "0"],
+        cwd=REPO_ROOT, env=dict(os.environ, **env_overrides),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for(f"{base_url}/health")
+        # Every worker must be up, not just the first one to accept
+        pids, deadline = set(), time.perf_counter() + 30
+        while len(pids) < n_workers and time.perf_counter() < deadline:
+            pids.add(wait_for(f"{base_url}/health")["pid"])
+        if len(pids) < n_workers:
+            raise RuntimeError(f"Only {len(pids)} of {n_workers} workers answered within 30 s")
+    except BaseException:
+        process.terminate()
+        process.wait(timeout=15)
+        raise
+    return process, base_url
+
+
+def client_process(base_url, scenario, batch_size, concurrency, duration, seed):
+    """One load-generating process; returns raw latencies and statuses."""
+    path, payloads, rows_per_request = build_requests(
+        scenario, sample_rows(max(1000, 10 * batch_size), seed), batch_size)
+    headers = {"X-Cache-Bypass": "true"}
+    latencies, statuses, elapsed = asyncio.run(
+        run_load(base_url, path, payloads, concurrency, duration, 0.0, headers))
+    return latencies, statuses, elapsed, rows_per_request
+
+
+def measure(base_url, args):
+    """Run all client processes in parallel and merge their results."""
+    with ProcessPoolExecutor(max_workers=args.clients) as pool:
+        # Warm every worker (and the clients' imports) before timing
+        list(pool.map(client_process, *zip(*[
+            (base_url, args.scenario, args.batch_size, args.concurrency, 1.0, i)
+            for i in range(args.clients)])))
+        runs = list(pool.map(client_process, *zip(*[
+            (base_url, args.scenario, args.batch_size, args.concurrency, args.duration, i)
+            for i in range(args.clients)])))
+    latencies = [x for run in runs for x in run[0]]
+    statuses = [s for run in runs for s in run[1]]
+    elapsed = max(run[2] for run in runs)
+    return summarise(latencies, statuses, elapsed, runs[0][3])
+
+
+def main():
+    """Measure throughput for each worker count and save the scaling curve."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", default=None,
+                        help="Comma-separated worker counts (default: 1, 2, 4, ... up to the CPU count)")
+    parser.add_argument("--clients", type=int, default=2, help="Load-generating processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="In-flight requests per client")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--scenario", default="predict", choices=list(SCENARIOS))
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--output", default="models/worker_scaling.json")
+    args = parser.parse_args()
+
+    cpus = default_workers()
+    if args.workers:
+        counts = [int(w) for w in args.workers.split(",")]
+    else:
+        counts = sorted({min(2 ** i, cpus) for i in range(cpus.bit_length() + 1)})
+    env_overrides = dict(item.split("=", 1) for item in args.env)
+
+    print("🚀 Worker Scaling Benchmark")
+    print("=" * 60)
+    print(f"CPUs available: {cpus}; clients: {args.clients} x {args.concurrency} in flight")
+
+    if not (REPO_ROOT / "models" / "model.pkl").exists():
+        print("❌ No model files found. Please train a model first.")
+        return
+
+    results = []
+    for n_workers in counts:
+        print(f"\n{n_workers} worker(s)...")
+        process, base_url = start_supervisor(n_workers, env_overrides)
+        try:
+            run = {"workers": n_workers, **measure(base_url, args)}
+        finally:
+            process.terminate()
+            process.wait(timeout=15)
+        base = results[0]["throughput_rps"] if results else run["throughput_rps"]
+        run["speedup"] = round(run["throughput_rps"] / base, 2) if base else None
+        run["efficiency"] = round(run["speedup"] / n_workers, 2) if run["speedup"] else None
+        results.append(run)
+        latency = run.get("latency_ms", {})
+        print(f"  {run['throughput_rps']:.0f} req/s  x{run['speedup']} "
+              f"p50 {latency.get('p50', np.nan):.2f} ms  p99 {latency.get('p99', np.nan):.2f} ms  "
+              f"errors {run['error_rate']:.2%}")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cpus": cpus,
+        "scenario": args.scenario,
+        "clients": args.clients,
+        "concurrency_per_client": args.concurrency,
+        "server_env": env_overrides,
+        "runs": results,
+    }
+    output_file = REPO_ROOT / args.output
+    with open(output_file, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
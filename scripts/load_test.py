@@ -0,0 +1,269 @@
+"""
+Load-test the HTTP service end to end.
+
+Starts the API with uvicorn (or targets ``--url``), drives /predict and
+/predict/batch (JSON or raw float64 bodies) at each requested concurrency, either as fast as possible
+(closed loop) or at a fixed request rate (open loop), and reports
+throughput, p50/p95/p99 latency and error rates as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scripts.benchmark_startup import REPO_ROOT, free_port, wait_for  # noqa: E402
+from src.codec import F64_MEDIA_TYPE  # noqa: E402
+from src.features import FEATURE_NAMES  # noqa: E402
+
+SCENARIOS = ("predict", "batch", "predict-binary", "batch-binary")
+
+
+def sample_rows(n_rows, seed=0):
+    """Draw feature rows from the diabetes dataset, as sent by real clients."""
+    from sklearn.datasets import load_diabetes
+
+    X = load_diabetes().data
+    rng = np.random.default_rng(seed)
+    return X[rng.integers(0, len(X), n_rows)]
+
+
+def build_requests(scenario, rows, batch_size):
+    """
+    Return (path, list of payloads, rows per request) for a scenario.
+
+    Payloads are JSON-able dicts, or raw float64 bodies for the ``-binary``
+    scenarios.
+    """
+    if scenario == "predict-binary":
+        return "/predict", [np.asarray(r, dtype="<f8").tobytes() for r in rows], 1
+    if scenario == "batch-binary":
+        batches = [
+            np.ascontiguousarray(rows[i:i + batch_size], dtype="<f8").tobytes()
+            for i in range(0, len(rows) - batch_size + 1, batch_size)
+        ]
+        return "/predict/batch", batches, batch_size
+    records = [dict(zip(FEATURE_NAMES, map(float, r))) for r in rows]
+    if scenario == "predict":
+        return "/predict", records, 1
+    batches = [
+        {"instances": records[i:i + batch_size]}
+        for i in range(0, len(records) - batch_size + 1, batch_size)
+    ]
+    return "/predict/batch", batches, batch_size
+
+
+def summarise(latencies, statuses, elapsed, rows_per_request):
+    """Throughput, latency percentiles and error counts for one run."""
+    latencies = np.asarray(latencies) * 1000
+    n = len(statuses)
+    errors = sum(1 for s in statuses if s != 200)
+    counts = {}
+    for s in statuses:
+        counts[str(s)] = counts.get(str(s), 0) + 1
+    ok = n - errors
+    result = {
+        "requests": n,
+        "errors": errors,
+        "error_rate": errors / n if n else 0.0,
+        "status_counts": counts,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(ok / elapsed, 1) if elapsed else 0.0,
+        "rows_per_sec": round(ok * rows_per_request / elapsed, 1) if elapsed else 0.0,
+    }
+    if n:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        result["latency_ms"] = {
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "mean": round(float(latencies.mean()), 3),
+            "max": round(float(latencies.max()), 3),
+        }
+    return result
+
+
+async def run_load(base_url, path, payloads, concurrency, duration, rate, headers):
+    """
+    Send requests for ``duration`` seconds from ``concurrency`` workers.
+
+    With ``rate`` > 0 requests are scheduled at fixed intervals and latency
+    is measured from the scheduled send time, so a stalled server is not
+    hidden by workers waiting on it (coordinated omission).
+    """
+    latencies, statuses = [], []
+    ticket = iter(range(10**12))
+    binary_headers = {**headers, "Content-Type": F64_MEDIA_TYPE}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        start = time.perf_counter()
+        deadline = start + duration
+
+        async def worker():
+            while True:
+                i = next(ticket)
+                scheduled = start + i / rate if rate else time.perf_counter()
+                if scheduled >= deadline:
+                    return
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    payload = payloads[i % len(payloads)]
+                    if isinstance(payload, bytes):
+                        resp = await client.post(path, content=payload, headers=binary_headers)
+                    else:
+                        resp = await client.post(path, json=payload, headers=headers)
+                    status = resp.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - scheduled)
+                statuses.append(status)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, statuses, elapsed
+
+
+def start_server(env_overrides):
+    """Start uvicorn on a free port and wait until /health answers."""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=dict(os.environ, **env_overrides),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for(f"{base_url}/health")
+    except TimeoutError:
+        process.terminate()
+        raise
+    return process, base_url
+
+
+def compare(results, baseline_path):
+    """Print throughput and latency changes against an earlier results file."""
+    with open(baseline_path) as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["runs"]}
+    print(f"\n📉 Compared with {baseline_path}:")
+    for r in results:
+        old = baseline.get((r["scenario"], r["concurrency"]))
+        if old is None or "latency_ms" not in r or "latency_ms" not in old:
+            continue
+        rps = (r["throughput_rps"] / old["throughput_rps"] - 1) * 100 if old["throughput_rps"] else 0
+        p99 = (r["latency_ms"]["p99"] / old["latency_ms"]["p99"] - 1) * 100
+        print(f"  {r['scenario']:<8} c={r['concurrency']:<4} throughput {rps:+.1f}%  p99 {p99:+.1f}%")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="Target an already running server instead of starting one")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,8,32",
+                        help="Comma-separated concurrency levels")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="Target requests/second per run (0 = as fast as possible)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Unrecorded seconds before each run")
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows per /predict/batch request")
+    parser.add_argument("--model-version", help="Send X-Model-Version with every request")
+    parser.add_argument("--allow-cache", action="store_true",
+                        help="Let repeated /predict vectors hit the prediction cache")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Server environment override (repeatable)")
+    parser.add_argument("--label", default="default", help="Name of this server configuration")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--output", default="models/load_test_results.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run every scenario at every concurrency level and save the results."""
+    args = parse_args(argv)
+    env_overrides = dict(item.split("=", 1) for item in args.env)
+    concurrency_levels = [int(c) for c in args.concurrency.split(",")]
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    headers = {}
+    if not args.allow_cache:
+        headers["X-Cache-Bypass"] = "true"
+    if args.model_version:
+        headers["X-Model-Version"] = args.model_version
+
+    print("🚀 API Load Test")
+    print("=" * 60)
+
+    process = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        if not (REPO_ROOT / "models" / "model.pkl").exists():
+            print("❌ No model files found. Please train a model first.")
+            return
+        process, base_url = start_server(env_overrides)
+
+    try:
+        health = httpx.get(f"{base_url}/health", timeout=10).json()
+        rows = sample_rows(max(1000, 10 * args.batch_size))
+        results = []
+        for scenario in scenarios:
+            path, payloads, rows_per_request = build_requests(scenario, rows, args.batch_size)
+            for concurrency in concurrency_levels:
+                print(f"\n{scenario} ({path}), concurrency={concurrency}, "
+                      f"rate={'max' if not args.rate else args.rate}...")
+                if args.warmup > 0:
+                    asyncio.run(run_load(base_url, path, payloads, concurrency,
+                                         args.warmup, 0.0, headers))
+                latencies, statuses, elapsed = asyncio.run(run_load(
+                    base_url, path, payloads, concurrency, args.duration, args.rate, headers))
+                run = {"scenario": scenario, "endpoint": path, "concurrency": concurrency,
+                       "target_rate_rps": args.rate or None, "rows_per_request": rows_per_request,
+                       **summarise(latencies, statuses, elapsed, rows_per_request)}
+                results.append(run)
+                latency = run.get("latency_ms", {})
+                print(f"  {run['throughput_rps']:.1f} req/s  p50 {latency.get('p50', 0):.2f} ms  "
+                      f"p95 {latency.get('p95', 0):.2f} ms  p99 {latency.get('p99', 0):.2f} ms  "
+                      f"errors {run['error_rate']:.2%}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    report = {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "model_version": args.model_version or health.get("model_version"),
+        "inference_engine": health.get("inference_engine"),
+        "server_env": env_overrides,
+        "settings": {"duration_s": args.duration, "warmup_s": args.warmup,
+                     "rate_rps": args.rate or None, "batch_size": args.batch_size,
+                     "cache_bypass": not args.allow_cache},
+        "runs": results,
+    }
+    output_file = REPO_ROOT / args.output
+    with open(output_file, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results saved to {output_file}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,50 +2,323 @@
 FastAPI service for diabetes progression prediction.
 """
 
-import pickle
-import json
-from pathlib import Path
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-import numpy as np
+import os
+import signal
+import sys
+import threading
+import time
+import uuid
+
+# Start of module import, used for the startup timings reported by /health
+_IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import Any, Dict, List, Optional  # noqa: E402
+from fastapi import (  # noqa: E402
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.exceptions import RequestValidationError  # noqa: E402
+from fastapi.responses import (  # noqa: E402
+    FileResponse,
+    JSONResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
+from starlette.concurrency import run_in_threadpool  # noqa: E402
+from pydantic import BaseModel, Field, ValidationError  # noqa: E402
+import numpy as np  # noqa: E402
+
+if __package__ in (None, ""):
+    # Allow running as ``python src/api.py`` from the repository root
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audit import AUDIT_ENABLED, AuditBackpressureError, AuditLog  # noqa: E402
+from src.batching import MicroBatcher  # noqa: E402
+from src.cache import PredictionCache  # noqa: E402
+from src.codec import (  # noqa: E402
+    CodecError,
+    CodecUnavailableError,
+    binary_request_body,
+    negotiate,
+)
+from src.drift import DRIFT_ENABLED, DriftMonitor  # noqa: E402
+from src.fastpath import FastPathError, parse_batch, parse_row  # noqa: E402
+from src.features import (  # noqa: E402
+    FEATURE_ABS_LIMIT,
+    FEATURE_NAMES,
+    row_error,
+    rows_to_matrix,
+    to_float_matrix,
+    valid_rows,
+)
+from src.jobs import (  # noqa: E402
+    FINISHED,
+    JOBS_CHUNK_SIZE,
+    JOBS_DATA_ROOT,
+    JOBS_DIR,
+    JOBS_WORKERS,
+    JobNotFoundError,
+    JobStore,
+    JobWorkerPool,
+    job_status,
+)
+from src.registry import ModelNotFoundError, ModelRegistry, ModelWatcher  # noqa: E402
+from src.streaming import DEFAULT_CHUNK_SIZE, ChunkedScorer  # noqa: E402
+from src.telemetry import (  # noqa: E402
+    MetricsMiddleware,
+    MetricsRegistry,
+    instrumented,
+    timed,
+)
+from src.triage import top_k  # noqa: E402
 
 # Load model and metadata
 MODEL_DIR = Path("models")
-MODEL_PATH = MODEL_DIR / "model.pkl"
-METRICS_PATH = MODEL_DIR / "metrics.json"
+
+# Version served when a request does not ask for one (default: models/metrics.json)
+DEFAULT_MODEL_VERSION = os.getenv("DEFAULT_MODEL_VERSION") or None
+
+# Seconds between checks for new artifacts under MODEL_DIR (0 disables the watcher)
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+
+# Token required by /admin endpoints in the X-Admin-Token header (unset: open)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Comma-separated keys accepted in the X-API-Key header for the trusted
+# fast path; /trusted routes require one when set (unset: open)
+TRUSTED_API_KEYS = frozenset(
+    key.strip() for key in os.getenv("TRUSTED_API_KEYS", "").split(",") if key.strip()
+)
+TRUSTED_PREFIX = "/trusted/"
+
+# Set by ``python -m src.serve``: reloads are coordinated by the supervisor
+SERVE_SUPERVISOR_PID = int(os.getenv("SERVE_SUPERVISOR_PID", "0")) or None
+
+# Largest number of rows accepted by /predict/batch in a single request
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+
+# "auto" folds linear pipelines into a single dot product; "sklearn" disables it
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "auto")
+
+# Inference precision: a default ("float64" or "float32") and/or per-version
+# overrides, e.g. "float64,v0.2:float32". float32 scores float32 bodies
+# natively and is refused if it deviates by more than PRECISION_TOLERANCE
+INFERENCE_PRECISION = os.getenv("INFERENCE_PRECISION", "float64")
+
+# "auto" serves model.bin when present and falls back to model.pkl;
+# "binary" or "pickle" force one format
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "auto")
+
+# "eager" loads models at import time; "lazy" defers loading to the lifespan
+# startup hook (or the first request) so workers boot without touching artifacts
+STARTUP_MODE = os.getenv("STARTUP_MODE", "eager")
+
+# /predict result cache: max entries (0 disables), entry lifetime, and the
+# rounding step applied to features before keying (0 keys on exact values)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+PREDICTION_CACHE_QUANTUM = float(os.getenv("PREDICTION_CACHE_QUANTUM", "0"))
+
+# Coalesce concurrent /predict calls into one model call per window
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "0") == "1"
+MICROBATCH_WINDOW_MS = float(os.getenv("MICROBATCH_WINDOW_MS", "2"))
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+
+# Record request counts, latencies and per-stage timings for /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Global variables
+registry = ModelRegistry()
+model_watcher = None
+job_store = None
+job_pool = None
+micro_batchers = {}
+startup_timings = {}
+metrics = MetricsRegistry()
+_load_lock = threading.Lock()
+
+prediction_cache = (
+    PredictionCache(
+        PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL, PREDICTION_CACHE_QUANTUM
+    )
+    if PREDICTION_CACHE_SIZE > 0
+    else None
+)
+if prediction_cache is not None:
+    # Entries of a version become stale as soon as its model is replaced
+    registry.add_listener(prediction_cache.clear)
+
+# Every scored row is recorded here when AUDIT_ENABLED=1 (see src/audit.py)
+audit_log = AuditLog() if AUDIT_ENABLED else None
+
+# Served-row statistics per version; a replaced model starts from scratch
+drift_monitors = {}
+_drift_lock = threading.Lock()
+registry.add_listener(lambda version: drift_monitors.pop(version, None))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Load models on startup in lazy mode; stop background work on shutdown."""
+    global job_pool
+    if STARTUP_MODE == "lazy":
+        await run_in_threadpool(ensure_model_loaded)
+    if JOBS_WORKERS > 0:
+        job_pool = JobWorkerPool(JOBS_WORKERS, JOBS_DIR, MODEL_DIR).start()
+    yield
+    if job_pool is not None:
+        await run_in_threadpool(job_pool.stop)
+        job_pool = None
+    if model_watcher is not None:
+        model_watcher.stop()
+    for batcher in micro_batchers.values():
+        await batcher.close()
+    if audit_log is not None:
+        await run_in_threadpool(audit_log.close)
+
 
 # Initialize FastAPI
 app = FastAPI(
     title="Diabetes Progression Prediction API",
     description="ML service for predicting diabetes disease progression",
     version="0.1.0",
+    lifespan=lifespan,
 )
-# Global variables
-model_pipeline = None
-model_metadata = None
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+
+def reload_models():
+    """Load new or changed artifacts into the registry; return reloaded versions."""
+    return registry.refresh(
+        MODEL_DIR,
+        fmt=MODEL_FORMAT,
+        engine_mode=INFERENCE_ENGINE,
+        default_version=DEFAULT_MODEL_VERSION,
+        precision=INFERENCE_PRECISION,
+    )
 
 
 def load_model():
-    """Load the trained model and metadata."""
-    global model_pipeline, model_metadata
+    """Load every available model version and start the artifact watcher."""
+    global model_watcher
 
-    if not MODEL_PATH.exists():
-        raise FileNotFoundError(f"Model not found at {MODEL_PATH}")
+    started = time.perf_counter()
+    reload_models()
+    if not registry.versions():
+        raise FileNotFoundError(f"Model not found in {MODEL_DIR}")
+    startup_timings["model_load_ms"] = (time.perf_counter() - started) * 1000
+    startup_timings["sklearn_imported"] = "sklearn" in sys.modules
 
-    with open(MODEL_PATH, "rb") as f:
-        model_pipeline = pickle.load(f)
+    for version in registry.versions():
+        print(f"Model loaded: {version} ({registry.get(version).engine.kind} engine)")
+
+    if MODEL_WATCH_INTERVAL > 0 and model_watcher is None:
+        model_watcher = ModelWatcher(
+            registry,
+            MODEL_DIR,
+            MODEL_WATCH_INTERVAL,
+            fmt=MODEL_FORMAT,
+            engine_mode=INFERENCE_ENGINE,
+            default_version=DEFAULT_MODEL_VERSION,
+            precision=INFERENCE_PRECISION,
+        )
+        model_watcher.start()
+
+
+def ensure_model_loaded():
+    """Load models on first use when startup loading was deferred."""
+    if registry.versions():
+        return
+    with _load_lock:
+        if not registry.versions():
+            load_model()
+
+
+def _acquire(version=None):
+    """Lease a model version, mapping unknown versions to 404."""
+    ensure_model_loaded()
+    try:
+        return registry.acquire(version)
+    except ModelNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"Model version {version!r} not loaded"
+        )
+
+
+def _audit(version, X, predictions):
+    """Record scored rows in the audit log; 503 if its writer is too far behind."""
+    if audit_log is None:
+        return
+    try:
+        audit_log.record(version, X, predictions)
+    except AuditBackpressureError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-    if METRICS_PATH.exists():
-        with open(METRICS_PATH, "r") as f:
-            model_metadata = json.load(f)
-    else:
-        model_metadata = {"version": "unknown"}
 
-    print(f"Model loaded: {model_metadata.get('version', 'unknown')}")
+async def _audit_row(version, X, prediction):
+    """Record one /predict row, waiting off the event loop only if the buffer is full."""
+    if audit_log is not None and not audit_log.offer(version, X, [prediction]):
+        await run_in_threadpool(_audit, version, X, [prediction])
 
 
-# Load model on startup
-load_model()
+def _drift_monitor(model):
+    """The drift monitor of a model version (None if disabled or unsupported)."""
+    if not DRIFT_ENABLED or model.drift_reference is None:
+        return None
+    monitor = drift_monitors.get(model.version)
+    if monitor is None or monitor.reference is not model.drift_reference:
+        with _drift_lock:
+            monitor = drift_monitors.get(model.version)
+            if monitor is None or monitor.reference is not model.drift_reference:
+                monitor = DriftMonitor(model.drift_reference)
+                drift_monitors[model.version] = monitor
+    return monitor
+
+
+def _observe(model, X, predictions):
+    """Add scored rows to the model version's drift statistics."""
+    monitor = _drift_monitor(model)
+    if monitor is not None:
+        monitor.observe(X, predictions)
+
+
+def _monitored_predict(model):
+    """``model.engine.predict``, also feeding the audit log and drift statistics."""
+    if audit_log is None and not DRIFT_ENABLED:
+        return model.engine.predict
+
+    def predict(X):
+        predictions = model.engine.predict(X)
+        _audit(model.version, X, predictions)
+        _observe(model, X, predictions)
+        return predictions
+
+    return predict
+
+
+def _batcher_for(version):
+    """Micro-batcher scoring with the live model for ``version``."""
+    if version not in micro_batchers:
+        micro_batchers[version] = MicroBatcher(
+            lambda X: registry.get(version).engine.predict(X),
+            window_ms=MICROBATCH_WINDOW_MS,
+            max_batch_size=MICROBATCH_MAX_SIZE,
+        )
+    return micro_batchers[version]
+
+
+startup_timings["import_ms"] = (time.perf_counter() - _IMPORT_STARTED) * 1000
+
+# Load model on startup unless deferred to the lifespan hook
+if STARTUP_MODE != "lazy":
+    load_model()
 
 
 class PredictionInput(BaseModel):
@@ -79,41 +352,920 @@ class PredictionInput(BaseModel):
         }
 
 
+class FeatureContribution(BaseModel):
+    """One feature's additive contribution to a prediction."""
+
+    feature: str
+    contribution: float
+
+
+class Explanation(BaseModel):
+    """Additive decomposition of a prediction into per-feature contributions."""
+
+    base_value: float = Field(..., description="Prediction for the mean patient")
+    contributions: Dict[str, float] = Field(
+        ...,
+        description="Contribution of each feature; they sum to prediction - base_value",
+    )
+    top_drivers: List[FeatureContribution] = Field(
+        ..., description="Largest absolute contributions, largest first"
+    )
+
+
 class PredictionOutput(BaseModel):
     """Output schema for prediction."""
 
     prediction: float = Field(..., description="Predicted progression score")
     model_version: str = Field(..., description="Model version used")
+    percentile: Optional[float] = Field(
+        None, description="Percent of the reference cohort scoring at or below"
+    )
+    risk_tier: Optional[str] = Field(None, description="Risk tier of the percentile")
+    explanation: Optional[Explanation] = Field(
+        None, description="Per-feature contributions to the prediction"
+    )
+
+
+class BatchPredictionInput(BaseModel):
+    """
+    Input schema for batch prediction.
+
+    Supply either ``instances`` (one object per patient, optionally with an
+    ``id`` key) or ``columns`` (one list per feature). ``ids`` optionally tags
+    each row so results can be matched back by the caller.
+    """
+
+    instances: Optional[List[Dict[str, Any]]] = Field(
+        None, description="Row-oriented payload: one feature object per patient"
+    )
+    columns: Optional[Dict[str, List[Any]]] = Field(
+        None, description="Columnar payload: one list of values per feature"
+    )
+    ids: Optional[List[str]] = Field(None, description="Optional client row IDs")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "instances": [
+                    {
+                        "id": "patient_001",
+                        "age": 0.02,
+                        "sex": -0.044,
+                        "bmi": 0.06,
+                        "bp": -0.03,
+                        "s1": -0.02,
+                        "s2": 0.03,
+                        "s3": -0.02,
+                        "s4": 0.02,
+                        "s5": 0.02,
+                        "s6": -0.001,
+                    }
+                ]
+            }
+        }
+
+
+class BatchPredictionItem(BaseModel):
+    """Prediction for a single row of a batch."""
+
+    index: int = Field(..., description="Row position in the submitted batch")
+    id: Optional[str] = Field(None, description="Client row ID, if supplied")
+    prediction: float = Field(..., description="Predicted progression score")
+    percentile: Optional[float] = Field(None, description="Cohort percentile")
+    risk_tier: Optional[str] = Field(None, description="Risk tier")
+    explanation: Optional[Explanation] = Field(
+        None, description="Feature contributions"
+    )
+
+
+class BatchRowError(BaseModel):
+    """Validation error for a single row of a batch."""
+
+    index: int = Field(..., description="Row position in the submitted batch")
+    id: Optional[str] = Field(None, description="Client row ID, if supplied")
+    detail: str = Field(..., description="Why the row could not be scored")
+
+
+class BatchPredictionOutput(BaseModel):
+    """Output schema for batch prediction."""
+
+    predictions: List[BatchPredictionItem]
+    errors: List[BatchRowError]
+    model_version: str = Field(..., description="Model version used")
+
+
+class TopKOutput(BaseModel):
+    """Output schema for top-K risk ranking."""
+
+    ranked: List[BatchPredictionItem] = Field(
+        ..., description="Highest-risk rows, highest first"
+    )
+    errors: List[BatchRowError]
+    n_scored: int = Field(..., description="Valid rows ranked")
+    model_version: str = Field(..., description="Model version used")
+
+
+def _columns_to_matrix(columns):
+    """Build an (n, 10) feature matrix from a columnar payload."""
+    missing = [f for f in FEATURE_NAMES if f not in columns]
+    if missing:
+        raise HTTPException(
+            status_code=422, detail=f"Missing feature columns: {', '.join(missing)}"
+        )
+    lengths = {len(columns[f]) for f in FEATURE_NAMES}
+    if len(lengths) > 1:
+        raise HTTPException(status_code=422, detail="Feature columns differ in length")
+    n_rows = lengths.pop()
+    values = [columns[f] for f in FEATURE_NAMES]
+    return to_float_matrix(values).reshape(len(FEATURE_NAMES), n_rows).T
+
+
+def _batch_to_matrix(batch):
+    """Return the feature matrix and row IDs for a batch payload."""
+    if (batch.instances is None) == (batch.columns is None):
+        raise HTTPException(
+            status_code=422, detail="Provide exactly one of 'instances' or 'columns'"
+        )
+
+    if batch.instances is not None:
+        X = rows_to_matrix(batch.instances)
+        row_ids = [row.get("id") for row in batch.instances]
+    else:
+        X = _columns_to_matrix(batch.columns)
+        row_ids = [None] * X.shape[0]
+
+    if batch.ids is not None:
+        if len(batch.ids) != X.shape[0]:
+            raise HTTPException(
+                status_code=422, detail="'ids' must have one entry per row"
+            )
+        row_ids = batch.ids
+
+    return X, [None if i is None else str(i) for i in row_ids]
 
 
 @app.get("/health")
 def health_check():
     """Health check endpoint."""
-    return {"status": "ok", "model_version": model_metadata.get("version", "unknown")}
+    ensure_model_loaded()
+    model = registry.get()
+    return {
+        "status": "ok",
+        "model_version": model.version,
+        "inference_engine": model.engine.kind,
+        "available_versions": registry.versions(),
+        "startup": startup_timings,
+        "pid": os.getpid(),
+    }
+
+
+async def _predict_row(model, X):
+    """Score a single row; sklearn calls stay off the event loop."""
+    if MICROBATCH_ENABLED:
+        # The model runs in the batcher's task, so time the whole wait
+        with timed("microbatch"):
+            return await _batcher_for(model.version).submit(X[0])
+    if model.engine.kind == "sklearn":
+        return float((await run_in_threadpool(model.engine.predict, X))[0])
+    return float(model.engine.predict(X)[0])
+
+
+async def _cached_predict_row(model, X, bypass):
+    """Score a single row through the cache; returns (prediction, cache status)."""
+    if prediction_cache is None or bypass:
+        return await _predict_row(model, X), "bypass"
+
+    with timed("cache_lookup"):
+        key = prediction_cache.key(model.version, X[0], model.loaded_at)
+        prediction = prediction_cache.get(key)
+    if prediction is not None:
+        return prediction, "hit"
+
+    prediction = await _predict_row(model, X)
+    prediction_cache.put(key, prediction)
+    return prediction, "miss"
 
 
-@app.post("/predict", response_model=PredictionOutput)
-def predict(input_data: PredictionInput):
+def _parse_json(schema, body):
+    """Validate a JSON body against ``schema``, reporting errors as FastAPI does."""
+    try:
+        return schema.model_validate_json(body)
+    except ValidationError as e:
+        errors = [
+            {**error, "loc": ("body", *error["loc"])}
+            for error in e.errors(include_url=False)
+        ]
+        raise RequestValidationError(errors, body=body)
+
+
+def _decode(codec, body):
+    """Decode a binary body, mapping codec failures to 415/422."""
+    try:
+        return codec.decode(body)
+    except CodecUnavailableError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except CodecError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def _is_trusted(request, api_key):
+    """
+    Whether a request takes the trusted fast path.
+
+    Requests on ``/trusted`` routes always do (403 without a valid key when
+    TRUSTED_API_KEYS is set); other routes do when they carry a valid key.
+    """
+    valid_key = api_key is not None and api_key in TRUSTED_API_KEYS
+    if request.url.path.startswith(TRUSTED_PREFIX):
+        if TRUSTED_API_KEYS and not valid_key:
+            raise HTTPException(status_code=403, detail="Invalid API key")
+        return True
+    return valid_key
+
+
+def _fast(parse, body):
+    """Run a fast-path parser, mapping malformed bodies to 422."""
+    try:
+        return parse(body)
+    except FastPathError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+async def _single_row(request, codec, trusted=False):
+    """The (1, 10) feature row of a /predict request in either encoding."""
+    body = await request.body()
+    if codec is None and trusted:
+        with timed("parse"):
+            X = _fast(parse_row, body)
+        with timed("validate"):
+            if not valid_rows(X)[0]:
+                raise HTTPException(
+                    status_code=422, detail=row_error(X[0], FEATURE_ABS_LIMIT)
+                )
+        return X
+    if codec is not None:
+        with timed("parse"):
+            X = _decode(codec, body)
+        if X.shape[0] != 1 or not np.isfinite(X).all():
+            raise HTTPException(
+                status_code=422, detail="Body must hold exactly one finite feature row"
+            )
+        return X
+
+    with timed("parse"):
+        input_data = _parse_json(PredictionInput, body)
+    # Convert input to array
+    with timed("build_array"):
+        X = np.array([[getattr(input_data, f) for f in FEATURE_NAMES]])
+    # pydantic accepts NaN/Infinity, which the fused engine would score
+    with timed("validate"):
+        if not valid_rows(X, limit=np.inf)[0]:
+            raise HTTPException(status_code=422, detail=row_error(X[0]))
+    return X
+
+
+def _cohort(model):
+    """The model's cohort index; 409 if it was trained without one."""
+    if model.cohort is None:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Model {model.version} has no cohort index; retrain to enable triage",
+        )
+    return model.cohort
+
+
+def _explainer(model):
+    """The model's explainer; 409 if the model is not linear."""
+    if model.explainer is None:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Model {model.version} does not support explanations",
+        )
+    return model.explainer
+
+
+@app.post(
+    "/predict",
+    response_model=PredictionOutput,
+    response_model_exclude_none=True,
+    openapi_extra=binary_request_body(PredictionInput.model_json_schema()),
+)
+@app.post(
+    "/models/{version}/predict",
+    response_model=PredictionOutput,
+    response_model_exclude_none=True,
+    openapi_extra=binary_request_body(PredictionInput.model_json_schema()),
+)
+@app.post(
+    "/trusted/predict",
+    response_model=PredictionOutput,
+    response_model_exclude_none=True,
+    openapi_extra=binary_request_body(PredictionInput.model_json_schema()),
+)
+@instrumented
+async def predict(
+    request: Request,
+    response: Response,
+    version: Optional[str] = None,
+    x_model_version: Optional[str] = Header(None),
+    x_cache_bypass: bool = Header(False),
+    x_api_key: Optional[str] = Header(None),
+    triage: bool = Query(False, description="Add cohort percentile and risk tier"),
+    explain: bool = Query(False, description="Add per-feature contributions"),
+):
     """
     Predict diabetes progression score.
 
-    Higher scores indicate greater disease progression risk.
+    Higher scores indicate greater disease progression risk. The model version
+    is taken from the path, else the ``X-Model-Version`` header, else the
+    default version. Send ``X-Cache-Bypass: true`` to skip the result cache.
+    The body is JSON, or one raw float row / MessagePack map (see
+    ``src/codec.py``), in which case the response uses the same encoding.
+    With ``triage=true`` the JSON response adds the score's percentile in
+    the model's reference cohort and its risk tier; ``explain=true`` adds
+    each feature's contribution to the score (see ``src/explain.py``).
+    Trusted clients (``/trusted/predict`` or a valid ``X-API-Key``) skip
+    pydantic: the body is parsed straight into an array and range-checked.
     """
+    codec = negotiate(request.headers.get("content-type"))
+    X = await _single_row(request, codec, _is_trusted(request, x_api_key))
+
+    model = _acquire(version or x_model_version)
     try:
-        # Convert input to array
-        feature_names = ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
-        X = np.array([[getattr(input_data, f) for f in feature_names]])
+        # Make prediction, serving repeated vectors from the cache
+        prediction, cache_status = await _cached_predict_row(model, X, x_cache_bypass)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+    finally:
+        registry.release(model)
+    await _audit_row(model.version, X, prediction)
+    _observe(model, X, [prediction])
+
+    headers = {"X-Cache": cache_status, "X-Model-Version": model.version}
+    if codec is not None:
+        with timed("serialize"):
+            content = codec.encode([prediction], [], model.version)
+        return Response(content, media_type=codec.media_type, headers=headers)
+    response.headers.update(headers)
+    output = PredictionOutput(prediction=prediction, model_version=model.version)
+    if triage:
+        (output.percentile,), (output.risk_tier,) = _cohort(model).triage([prediction])
+    if explain:
+        with timed("explain"):
+            (explanation,) = _explainer(model).explain(X)
+            output.explanation = Explanation.model_validate(explanation)
+    return output
+
 
-        # Make prediction
-        X_scaled = model_pipeline["scaler"].transform(X)
-        prediction = float(model_pipeline["model"].predict(X_scaled)[0])
+def _score_matrix(X, version, valid=None):
+    """
+    Score the valid rows of ``X`` in one engine call.
 
-        return PredictionOutput(
-            prediction=prediction,
-            model_version=model_metadata.get("version", "unknown"),
+    Rows are valid where the ``valid`` mask is set (default: all finite).
+    Returns ``(valid_idx, invalid_idx, predictions, model)``; the model's
+    lease is already released.
+    """
+    n_rows = X.shape[0]
+    if n_rows > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {n_rows} rows exceeds limit of {MAX_BATCH_SIZE}",
         )
+
+    if valid is None:
+        valid = np.isfinite(X).all(axis=1)
+    valid_idx = np.flatnonzero(valid)
+    # Skip the gather copy in the common all-valid case
+    rows = X if valid_idx.size == n_rows else X[valid_idx]
+    predictions = np.empty(0)
+
+    model = _acquire(version)
+    try:
+        if valid_idx.size:
+            predictions = model.engine.predict(rows)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+    finally:
+        registry.release(model)
+    if valid_idx.size:
+        _audit(model.version, rows, predictions)
+        _observe(model, rows, predictions)
+    return valid_idx, np.flatnonzero(~valid), predictions, model
+
+
+def _binary_batch(codec, body, version):
+    """Score a binary batch; predictions come back NaN-filled for invalid rows."""
+    with timed("parse"):
+        X = _decode(codec, body)
+    valid_idx, invalid_idx, predictions, model = _score_matrix(X, version)
+
+    with timed("serialize"):
+        output = np.full(X.shape[0], np.nan)
+        output[valid_idx] = predictions
+        content = codec.encode(output, invalid_idx, model.version)
+    headers = {
+        "X-Model-Version": model.version,
+        "X-Invalid-Rows": str(invalid_idx.size),
+    }
+    return Response(content, media_type=codec.media_type, headers=headers)
+
+
+@app.post(
+    "/predict/batch",
+    response_model=BatchPredictionOutput,
+    response_model_exclude_none=True,
+    openapi_extra=binary_request_body(BatchPredictionInput.model_json_schema()),
+)
+@app.post(
+    "/models/{version}/predict/batch",
+    response_model=BatchPredictionOutput,
+    response_model_exclude_none=True,
+    openapi_extra=binary_request_body(BatchPredictionInput.model_json_schema()),
+)
+@app.post(
+    "/trusted/predict/batch",
+    response_model=BatchPredictionOutput,
+    response_model_exclude_none=True,
+    openapi_extra=binary_request_body(BatchPredictionInput.model_json_schema()),
+)
+@instrumented
+async def predict_batch(
+    request: Request,
+    version: Optional[str] = None,
+    x_model_version: Optional[str] = Header(None),
+    x_api_key: Optional[str] = Header(None),
+    triage: bool = Query(False, description="Add cohort percentile and risk tier"),
+    explain: bool = Query(False, description="Add per-feature contributions"),
+):
+    """
+    Predict diabetes progression scores for many patients at once.
+
+    All valid rows are scored with a single inference engine call. Rows with
+    missing or non-numeric features are reported in ``errors`` and do not
+    fail the rest of the batch. Binary bodies (raw float rows or MessagePack)
+    are decoded without per-field validation and answered in the same
+    encoding; invalid rows then get a NaN prediction. ``triage=true`` adds
+    each JSON row's cohort percentile and risk tier, ``explain=true`` its
+    feature contributions (one vectorized pass over the valid rows).
+    Trusted JSON batches (``/trusted/predict/batch`` or a valid
+    ``X-API-Key``) are parsed straight into an array, and rows that are
+    non-finite or out of range are rejected by index in one vectorized check.
+    """
+    codec = negotiate(request.headers.get("content-type"))
+    trusted = _is_trusted(request, x_api_key)
+    body = await request.body()
+    version = version or x_model_version
+    # Decoding and scoring large batches is CPU-bound; keep it off the loop
+    if codec is not None:
+        return await run_in_threadpool(_binary_batch, codec, body, version)
+    return await run_in_threadpool(_json_batch, body, version, triage, explain, trusted)
+
+
+def _prediction_items(model, row_ids, indices, predictions, triage, explanations=None):
+    """Per-row prediction dicts, with percentile and tier when triaging."""
+    items = [
+        {"index": int(i), "id": row_ids[i], "prediction": p}
+        for i, p in zip(indices.tolist(), predictions.tolist())
+    ]
+    if triage:
+        percentiles, tiers = _cohort(model).triage(predictions)
+        for item, percentile, tier in zip(items, percentiles, tiers):
+            item["percentile"] = percentile
+            item["risk_tier"] = tier
+    if explanations is not None:
+        for item, explanation in zip(items, explanations):
+            item["explanation"] = explanation
+    return items
+
+
+def _row_errors(X, row_ids, invalid_idx, limit=None):
+    return [
+        {"index": int(i), "id": row_ids[i], "detail": row_error(X[i], limit)}
+        for i in invalid_idx
+    ]
+
+
+def _json_batch(body, version, triage=False, explain=False, trusted=False):
+    """Score a JSON batch into the BatchPredictionOutput layout."""
+    if trusted:
+        with timed("parse"):
+            X, row_ids = _fast(parse_batch, body)
+        with timed("validate"):
+            valid = valid_rows(X)
+        limit = FEATURE_ABS_LIMIT
+    else:
+        with timed("parse"):
+            batch = _parse_json(BatchPredictionInput, body)
+        with timed("build_array"):
+            X, row_ids = _batch_to_matrix(batch)
+        valid, limit = None, None
+    valid_idx, invalid_idx, predictions, model = _score_matrix(X, version, valid)
+    explanations = None
+    if explain:
+        with timed("explain"):
+            explanations = _explainer(model).explain(X[valid_idx])
+
+    with timed("serialize"):
+        content = {
+            "predictions": _prediction_items(
+                model, row_ids, valid_idx, predictions, triage, explanations
+            ),
+            "errors": _row_errors(X, row_ids, invalid_idx, limit),
+            "model_version": model.version,
+        }
+        return JSONResponse(content=content, headers={"X-Model-Version": model.version})
+
+
+@app.post("/predict/topk", response_model=TopKOutput)
+@app.post("/models/{version}/predict/topk", response_model=TopKOutput)
+@instrumented
+def predict_topk(
+    batch: BatchPredictionInput,
+    k: int = Query(10, ge=1, description="Number of highest-risk rows to return"),
+    version: Optional[str] = None,
+    x_model_version: Optional[str] = Header(None),
+    explain: bool = Query(False, description="Add per-feature contributions"),
+):
+    """
+    Rank a batch by predicted risk and return the ``k`` highest-risk rows.
+
+    Only the top ``k`` are sorted (``argpartition``), not the whole batch.
+    Rows carry their cohort percentile and risk tier when the model has a
+    cohort index. ``explain=true`` explains only the returned rows.
+    """
+    with timed("build_array"):
+        X, row_ids = _batch_to_matrix(batch)
+    valid_idx, invalid_idx, predictions, model = _score_matrix(
+        X, version or x_model_version
+    )
+
+    with timed("rank"):
+        order = top_k(predictions, k)
+    explanations = None
+    if explain:
+        with timed("explain"):
+            explanations = _explainer(model).explain(X[valid_idx[order]])
+    with timed("serialize"):
+        content = {
+            "ranked": _prediction_items(
+                model,
+                row_ids,
+                valid_idx[order],
+                predictions[order],
+                model.cohort is not None,
+                explanations,
+            ),
+            "errors": _row_errors(X, row_ids, invalid_idx),
+            "n_scored": int(valid_idx.size),
+            "model_version": model.version,
+        }
+        return JSONResponse(content=content, headers={"X-Model-Version": model.version})
+
+
+class _BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for generators that are still reading the request body.
+
+    Starlette's default disconnect listener consumes ``receive`` messages,
+    which would race with the generator pulling body chunks.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _release_after(body, model):
+    """Hold a model lease until a streamed response body is exhausted."""
+    try:
+        async for block in body:
+            yield block
+    finally:
+        registry.release(model)
+
+
+@app.post("/predict/stream")
+@app.post("/models/{version}/predict/stream")
+@instrumented
+def predict_stream(
+    request: Request,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=MAX_BATCH_SIZE),
+    version: Optional[str] = None,
+    x_model_version: Optional[str] = Header(None),
+):
+    """
+    Score an NDJSON or CSV request body in chunks, streaming NDJSON results.
+
+    Send ``Content-Type: text/csv`` for CSV (header row required), otherwise
+    the body is read as one JSON object per line. Each output line carries the
+    row ``index``, ``id`` and either ``prediction`` or ``error``.
+    """
+    content_type = request.headers.get("content-type", "")
+    fmt = "csv" if content_type.startswith("text/csv") else "ndjson"
+    model = _acquire(version or x_model_version)
+    scorer = ChunkedScorer(_monitored_predict(model), fmt=fmt, chunk_size=chunk_size)
+    return _BodyStreamingResponse(
+        _release_after(scorer.ascore_bytes(request.stream()), model),
+        media_type="application/x-ndjson",
+        headers={"X-Model-Version": model.version},
+    )
+
+
+def _jobs():
+    """The job store, created on first use."""
+    global job_store
+    if job_store is None:
+        job_store = JobStore(JOBS_DIR)
+    return job_store
+
+
+def _job(job_id):
+    """A job's record, mapping unknown IDs to 404."""
+    try:
+        return _jobs().get(job_id)
+    except JobNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Job {job_id!r} not found")
+
+
+def _job_source(source):
+    """Resolve a dataset reference, which must stay under JOBS_DATA_ROOT."""
+    root = JOBS_DATA_ROOT.resolve()
+    path = (root / source).resolve()
+    if not path.is_relative_to(root) or not path.is_file():
+        raise HTTPException(
+            status_code=400, detail=f"Source {source!r} is not a file under {root}"
+        )
+    return path
+
+
+async def _save_upload(request, path):
+    """Stream the request body to ``path`` without holding it in memory."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        async for data in request.stream():
+            await run_in_threadpool(f.write, data)
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    request: Request,
+    source: Optional[str] = Query(
+        None, description="Dataset path under JOBS_DATA_ROOT"
+    ),
+    fmt: Optional[str] = Query(None, alias="format", pattern="^(ndjson|csv)$"),
+    chunk_size: int = Query(JOBS_CHUNK_SIZE, ge=1, le=1_000_000),
+    version: Optional[str] = None,
+    x_model_version: Optional[str] = Header(None),
+):
+    """
+    Queue an NDJSON or CSV file for bulk scoring and return its job ID.
+
+    Upload the file as the request body (``Content-Type: text/csv`` for CSV)
+    or reference a server-side dataset with ``source``. The model version is
+    pinned at submission. Poll ``GET /jobs/{id}``, then download
+    ``GET /jobs/{id}/result``.
+    """
+    model = _acquire(version or x_model_version)
+    registry.release(model)
+
+    job_id = uuid.uuid4().hex
+    if source is not None:
+        input_path = _job_source(source)
+        fmt = fmt or ("csv" if input_path.suffix.lower() == ".csv" else "ndjson")
+    else:
+        content_type = request.headers.get("content-type", "")
+        fmt = fmt or ("csv" if content_type.startswith("text/csv") else "ndjson")
+        input_path = _jobs().job_dir(job_id) / f"input.{fmt}"
+        await _save_upload(request, input_path)
+
+    job = _jobs().create(input_path, fmt, model.version, chunk_size, job_id=job_id)
+    return job_status(job)
+
+
+@app.get("/jobs")
+def list_jobs(limit: int = Query(50, ge=1, le=1000)):
+    """Most recently submitted jobs."""
+    return {"jobs": [job_status(job) for job in _jobs().list(limit)]}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status and progress of a job."""
+    return job_status(_job(job_id))
+
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    """NDJSON results of a finished job (409 while it is still running)."""
+    job = _job(job_id)
+    if job["status"] != "done":
+        raise HTTPException(
+            status_code=409, detail=f"Job {job_id} is {job['status']}, not done"
+        )
+    return FileResponse(
+        _jobs().result_path(job_id),
+        media_type="application/x-ndjson",
+        filename=f"{job_id}.ndjson",
+    )
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancel a queued or running job."""
+    job = _job(job_id)
+    if job["status"] in FINISHED:
+        return job_status(job)
+    return job_status(_jobs().cancel(job_id))
+
+
+@app.get("/stats/batching")
+def batching_stats():
+    """Queue depth and batch size histograms for each version's micro-batcher."""
+    if not MICROBATCH_ENABLED:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "versions": {v: b.stats() for v, b in micro_batchers.items()},
+    }
+
+
+@app.get("/stats/cache")
+def cache_stats():
+    """Hit, miss and eviction counters for the prediction cache."""
+    if prediction_cache is None:
+        return {"enabled": False}
+    return prediction_cache.stats()
+
+
+@app.get("/stats/audit")
+def audit_stats():
+    """Audit buffer occupancy, rows written, flush latency and backpressure waits."""
+    if audit_log is None:
+        return {"enabled": False}
+    return audit_log.stats()
+
+
+@app.get("/drift")
+@app.get("/models/{version}/drift")
+def drift_report(version: Optional[str] = None):
+    """
+    Feature and prediction distributions of served rows versus training.
+
+    Per feature: running mean and standard deviation, the mean shift in
+    training standard deviations, the spread ratio, KLL-sketch quantiles and
+    the PSI against training decile bins; the same for the prediction
+    against the reference cohort. ``drifted`` lists columns whose PSI
+    exceeds ``DRIFT_PSI_ALERT``. Statistics cover this worker process since
+    the version was loaded.
+    """
+    if not DRIFT_ENABLED:
+        return {"enabled": False}
+    model = _acquire(version)
+    try:
+        monitor = _drift_monitor(model)
+    finally:
+        registry.release(model)
+    if monitor is None:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Model {model.version} has no training statistics for drift",
+        )
+    return {"enabled": True, "model_version": model.version, **monitor.report()}
+
+
+def _drift_metrics():
+    """PSI gauges per model version and column."""
+    samples = []
+    for version, monitor in list(drift_monitors.items()):
+        feature_psi, prediction_psi = monitor.psi()
+        labels = [*monitor.features, "prediction"]
+        for column, value in zip(labels, [*feature_psi.tolist(), prediction_psi]):
+            if value is not None and np.isfinite(value):
+                samples.append(({"model_version": version, "column": column}, value))
+    return [
+        (
+            "triage_drift_psi",
+            "gauge",
+            "Population stability index of served rows against training.",
+            samples,
+        )
+    ]
+
+
+def _audit_metrics():
+    """Audit log gauges and counters."""
+    stats = audit_log.stats()
+    return [
+        (
+            "triage_audit_buffered_rows",
+            "gauge",
+            "Scored rows waiting to be written to the audit log.",
+            [({}, stats["buffered"])],
+        ),
+        (
+            "triage_audit_rows_written_total",
+            "counter",
+            "Rows written and fsynced to the audit log.",
+            [({}, stats["rows_written"])],
+        ),
+        (
+            "triage_audit_backpressure_waits_total",
+            "counter",
+            "Times recording waited for a full audit buffer.",
+            [({}, stats["backpressure_waits"])],
+        ),
+    ]
+
+
+def _runtime_metrics():
+    """Gauges and counters owned by the cache, batchers and registry."""
+    families = [
+        (
+            "triage_models_loaded",
+            "gauge",
+            "Model versions currently served.",
+            [({}, len(registry.versions()))],
+        ),
+        (
+            "triage_model_load_seconds",
+            "gauge",
+            "Time taken by the last startup model load.",
+            [({}, startup_timings.get("model_load_ms", 0.0) / 1000)],
+        ),
+    ]
+    if prediction_cache is not None:
+        stats = prediction_cache.stats()
+        families += [
+            (
+                f"triage_cache_{name}_total",
+                "counter",
+                f"Prediction cache {name}.",
+                [({}, stats[name])],
+            )
+            for name in ("hits", "misses", "evictions", "expirations")
+        ]
+        families.append(
+            (
+                "triage_cache_size",
+                "gauge",
+                "Prediction cache entries.",
+                [({}, stats["size"])],
+            )
+        )
+    if audit_log is not None:
+        families += _audit_metrics()
+    if drift_monitors:
+        families += _drift_metrics()
+    depths = [
+        ({"model_version": v}, b.stats()["queue_depth"])
+        for v, b in micro_batchers.items()
+    ]
+    if depths:
+        families.append(
+            (
+                "triage_microbatch_queue_depth",
+                "gauge",
+                "Requests waiting in each micro-batcher.",
+                depths,
+            )
+        )
+    return families
+
+
+metrics.add_collector(_runtime_metrics)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Prometheus text exposition of request, stage and runtime metrics."""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/models")
+def list_models():
+    """Loaded model versions, the default version and any still draining."""
+    ensure_model_loaded()
+    return registry.info()
+
+
+@app.post("/admin/reload")
+def admin_reload(x_admin_token: Optional[str] = Header(None)):
+    """
+    Reload new or changed artifacts from the model directory.
+
+    Under the multi-worker supervisor the reload is handed to it, so every
+    worker switches together; the response then only confirms scheduling.
+    """
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if SERVE_SUPERVISOR_PID:
+        os.kill(SERVE_SUPERVISOR_PID, signal.SIGHUP)
+        return {"reloaded": [], "scheduled": True, **registry.info()}
+    reloaded = reload_models()
+    return {"reloaded": reloaded, **registry.info()}
 
 
 @app.get("/")
@@ -121,8 +1273,22 @@ def root():
     """Root endpoint with API information."""
     return {
         "service": "Diabetes Progression Prediction",
-        "version": model_metadata.get("version", "unknown"),
-        "endpoints": {"health": "/health", "predict": "/predict", "docs": "/docs"},
+        "version": registry.default_version or "unknown",
+        "endpoints": {
+            "health": "/health",
+            "predict": "/predict",
+            "predict_batch": "/predict/batch",
+            "predict_stream": "/predict/stream",
+            "predict_topk": "/predict/topk",
+            "jobs": "/jobs",
+            "batching_stats": "/stats/batching",
+            "cache_stats": "/stats/cache",
+            "audit_stats": "/stats/audit",
+            "drift": "/drift",
+            "models": "/models",
+            "metrics": "/metrics",
+            "docs": "/docs",
+        },
     }
 
 
@@ -0,0 +1,165 @@
+"""
+Versioned binary model artifact that can be memory-mapped without unpickling.
+
+Layout (all integers little-endian):
+
+    8 bytes   magic ``b"DTRGART\\0"``
+    4 bytes   uint32 length of the JSON header
+    N bytes   JSON header: format version, model type, feature order,
+              array table (offset/shape/dtype) and SHA-256 of the data block
+    padding   up to a 64-byte boundary
+    data      raw little-endian arrays, each aligned to 64 bytes
+
+Loading maps the file and exposes each array as a read-only NumPy view, so no
+sklearn objects (or sklearn itself) are needed to serve a linear model.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"DTRGART\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_LENGTH = struct.Struct("<I")
+
+
+class ArtifactError(ValueError):
+    """Raised when an artifact is malformed, unsupported or corrupted."""
+
+
+class ModelArtifact:
+    """A loaded binary artifact: parsed header plus array views."""
+
+    def __init__(self, header, arrays, buffer=None):
+        self.header = header
+        self.arrays = arrays
+        self._buffer = buffer
+
+    @property
+    def model_type(self):
+        return self.header["model_type"]
+
+    @property
+    def feature_names(self):
+        return self.header["feature_names"]
+
+    @property
+    def metadata(self):
+        return self.header.get("metadata", {})
+
+
+def _align(n):
+    """Round ``n`` up to the next multiple of ALIGNMENT."""
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+
+def linear_pipeline_arrays(pipeline):
+    """
+    Extract the arrays describing a StandardScaler + linear model pipeline.
+
+    Raises ArtifactError if the pipeline has no linear representation.
+    """
+    scaler = pipeline.get("scaler")
+    model = pipeline.get("model")
+    if not hasattr(scaler, "mean_") or not hasattr(model, "coef_"):
+        raise ArtifactError("Pipeline is not a scaler + linear model")
+
+    coef = np.asarray(model.coef_, dtype=np.float64).reshape(-1)
+    n_features = coef.shape[0]
+    mean = np.zeros(n_features) if scaler.mean_ is None else scaler.mean_
+    scale = np.ones(n_features) if scaler.scale_ is None else scaler.scale_
+    return {
+        "scaler_mean": np.asarray(mean, dtype=np.float64),
+        "scaler_scale": np.asarray(scale, dtype=np.float64),
+        "coef": coef,
+        "intercept": np.asarray(model.intercept_, dtype=np.float64).reshape(1),
+    }
+
+
+def save_artifact(path, arrays, model_type, feature_names, metadata=None):
+    """Write ``arrays`` (name -> ndarray) and a header to ``path``."""
+    table = {}
+    blocks = []
+    offset = 0
+    for name, array in arrays.items():
+        data = np.ascontiguousarray(
+            array, dtype=np.asarray(array).dtype.newbyteorder("<")
+        )
+        table[name] = {
+            "offset": offset,
+            "shape": list(data.shape),
+            "dtype": data.dtype.str,
+        }
+        raw = data.tobytes()
+        padded = _align(len(raw))
+        blocks.append(raw + b"\0" * (padded - len(raw)))
+        offset += padded
+    payload = b"".join(blocks)
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "model_type": model_type,
+        "feature_names": list(feature_names),
+        "arrays": table,
+        "checksum": "sha256:" + hashlib.sha256(payload).hexdigest(),
+        "metadata": metadata or {},
+    }
+    header_bytes = json.dumps(header, sort_keys=True).encode("utf-8")
+    prefix = MAGIC + _LENGTH.pack(len(header_bytes)) + header_bytes
+    prefix += b"\0" * (_align(len(prefix)) - len(prefix))
+
+    # Write then rename so a watching server never maps a partial file
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(prefix)
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def _read_header(buffer):
+    """Parse the header and return it with the start offset of the data block."""
+    if bytes(buffer[: len(MAGIC)]) != MAGIC:
+        raise ArtifactError("Not a model artifact (bad magic)")
+    (length,) = _LENGTH.unpack_from(buffer, len(MAGIC))
+    start = len(MAGIC) + _LENGTH.size
+    end = start + length
+    header = json.loads(bytes(buffer[start:end]))
+    if header.get("format_version") != FORMAT_VERSION:
+        raise ArtifactError(
+            f"Unsupported artifact format {header.get('format_version')}"
+        )
+    return header, _align(end)
+
+
+def load_artifact(path, verify=True):
+    """
+    Memory-map an artifact and return a ModelArtifact.
+
+    With ``verify=True`` the data block is checked against the header
+    checksum before any array is exposed.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header, data_start = _read_header(buffer)
+    if verify:
+        digest = hashlib.sha256(memoryview(buffer)[data_start:]).hexdigest()
+        if "sha256:" + digest != header["checksum"]:
+            raise ArtifactError(f"Checksum mismatch for {path}")
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        arrays[name] = np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=data_start + spec["offset"]
+        ).reshape(spec["shape"])
+    return ModelArtifact(header, arrays, buffer)
@@ -0,0 +1,511 @@
+"""
+Prediction audit log with batched, asynchronous writes.
+
+Every scored row is kept for clinical audit: timestamp, model version,
+input vector and prediction. Recording copies the rows into a preallocated
+in-memory ring buffer, so requests never wait on the disk. A background
+thread flushes the buffer every ``AUDIT_FLUSH_INTERVAL`` seconds, or as soon
+as it is half full. Each flush is written as one columnar block with one
+``write`` and one ``fsync``. Rows leave the buffer only after their block is
+on disk. If the writer falls behind, the buffer fills up and ``record``
+waits for space for up to ``AUDIT_BLOCK_TIMEOUT`` seconds. It then raises
+AuditBackpressureError, and the API answers 503 instead of serving an
+unaudited prediction. A request's rows are buffered all or nothing, so none
+of a failed request's rows are logged.
+
+Files are append-only and named ``audit-<start time>-<pid>-<seq>.bin``, so
+every worker process writes its own. They rotate at ``AUDIT_FILE_MAX_MB``.
+A file is a header followed by blocks:
+
+    file:  FILE_MAGIC, uint32 length, JSON {"format", "features", "pid", "created"}
+    block: BLOCK_MAGIC, uint32 header length, uint32 payload length,
+           JSON {"rows", "t_min", "t_max", "versions", "present"},
+           payload columns (little-endian): timestamp f8[rows],
+           version code u2[rows], features f8[n_features, rows], prediction f8[rows]
+
+Block headers carry the time range and the model versions present, so the
+reader skips non-matching blocks with a seek and never decodes their
+payload. A block cut short by a crash ends the file's readable data.
+
+    python -m src.audit --since 2026-10-01T00:00 --version v0.2
+    python -m src.audit --count
+"""
+
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from src.features import FEATURE_NAMES, N_FEATURES
+
+# Record every scored row to the audit log (1 to enable)
+AUDIT_ENABLED = os.getenv("AUDIT_ENABLED", "0") == "1"
+
+# Directory of audit log files
+AUDIT_DIR = Path(os.getenv("AUDIT_DIR", "audit"))
+
+# Rows held in memory before recording waits for the writer
+AUDIT_BUFFER_ROWS = int(os.getenv("AUDIT_BUFFER_ROWS", "65536"))
+
+# Seconds between background flushes (each is one write and one fsync)
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+
+# Seconds a request waits for buffer space before failing with 503
+AUDIT_BLOCK_TIMEOUT = float(os.getenv("AUDIT_BLOCK_TIMEOUT", "5.0"))
+
+# Size at which the current audit file is closed and a new one started
+AUDIT_FILE_MAX_MB = float(os.getenv("AUDIT_FILE_MAX_MB", "64"))
+
+FORMAT_VERSION = 1
+FILE_MAGIC = b"TRIAGEAUDIT\x00"
+BLOCK_MAGIC = b"AUDB"
+_LENGTH = struct.Struct("<I")
+_BLOCK = struct.Struct("<4sII")
+
+
+class AuditBackpressureError(RuntimeError):
+    """Raised when the audit buffer stays full for longer than the timeout."""
+
+
+def _encode_block(timestamps, codes, X, predictions, versions):
+    """One block's bytes: framing, JSON header and columnar payload."""
+    present = [versions[c] for c in np.unique(codes).tolist()]
+    header = json.dumps(
+        {
+            "rows": len(timestamps),
+            "t_min": float(timestamps.min()),
+            "t_max": float(timestamps.max()),
+            "versions": versions,
+            "present": present,
+        }
+    ).encode("utf-8")
+    payload = b"".join(
+        [
+            timestamps.astype("<f8").tobytes(),
+            codes.astype("<u2").tobytes(),
+            np.ascontiguousarray(X.T, dtype="<f8").tobytes(),
+            predictions.astype("<f8").tobytes(),
+        ]
+    )
+    return _BLOCK.pack(BLOCK_MAGIC, len(header), len(payload)) + header + payload
+
+
+def _fsync_dir(directory):
+    """Persist a directory entry (a newly created file)."""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class AuditLog:
+    """Ring buffer of scored rows flushed to rotating files by a writer thread."""
+
+    def __init__(
+        self,
+        directory=AUDIT_DIR,
+        capacity=AUDIT_BUFFER_ROWS,
+        flush_interval=AUDIT_FLUSH_INTERVAL,
+        max_file_bytes=AUDIT_FILE_MAX_MB * 2**20,
+        block_timeout=AUDIT_BLOCK_TIMEOUT,
+        clock=time.time,
+    ):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.directory = Path(directory)
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.max_file_bytes = int(max_file_bytes)
+        self.block_timeout = block_timeout
+        self._clock = clock
+        self._timestamps = np.empty(capacity, dtype=np.float64)
+        self._codes = np.empty(capacity, dtype=np.uint16)
+        self._X = np.empty((capacity, N_FEATURES), dtype=np.float64)
+        self._predictions = np.empty(capacity, dtype=np.float64)
+        # Rows ever recorded (head) and ever written (tail); head - tail are buffered
+        self._head = 0
+        self._tail = 0
+        self._versions = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._writer = None
+        self._file = None
+        self._file_bytes = 0
+        self._file_seq = 0
+        self.rows_written = 0
+        self.blocks_written = 0
+        self.files_opened = 0
+        self.backpressure_waits = 0
+        self.write_errors = 0
+        self.last_flush_ms = 0.0
+
+    def _ensure_writer(self):
+        """Start the writer thread on first use (the caller holds the lock)."""
+        if self._writer is None:
+            self._writer = threading.Thread(
+                target=self._run, name="audit-writer", daemon=True
+            )
+            self._writer.start()
+
+    def _code(self, version):
+        if version not in self._versions:
+            self._versions.append(version)
+        return self._versions.index(version)
+
+    def _put(self, code, timestamp, X, predictions):
+        """Copy rows into the ring at the head (the caller holds the lock)."""
+        start = 0
+        while start < len(predictions):
+            position = self._head % self.capacity
+            count = min(len(predictions) - start, self.capacity - position)
+            stop, end = start + count, position + count
+            self._timestamps[position:end] = timestamp
+            self._codes[position:end] = code
+            self._X[position:end] = X[start:stop]
+            self._predictions[position:end] = predictions[start:stop]
+            self._head += count
+            start = stop
+        if self._head - self._tail >= self.capacity // 2:
+            # Wake the writer early instead of waiting out the interval
+            self._cond.notify_all()
+
+    def offer(self, version, X, predictions):
+        """Record rows only if they fit without waiting; returns whether they did."""
+        X, predictions = _rows(X, predictions)
+        with self._cond:
+            self._ensure_writer()
+            if self.capacity - (self._head - self._tail) < len(predictions):
+                return False
+            self._put(self._code(version), self._clock(), X, predictions)
+        return True
+
+    def record(self, version, X, predictions):
+        """
+        Record scored rows, waiting while the buffer has no room for all of them.
+
+        Rows are recorded all or nothing: if space does not free up within
+        ``block_timeout`` seconds, AuditBackpressureError is raised and none
+        were kept, so a retry does not log them twice. Batches larger than
+        the buffer are written synchronously as their own block.
+        """
+        X, predictions = _rows(X, predictions)
+        if len(predictions) > self.capacity:
+            try:
+                self.record_sync(version, X, predictions)
+            except OSError as e:
+                raise AuditBackpressureError(f"Audit write failed: {e}") from e
+            return
+        timestamp = self._clock()
+        deadline = time.monotonic() + self.block_timeout
+        with self._cond:
+            self._ensure_writer()
+            while self.capacity - (self._head - self._tail) < len(predictions):
+                self.backpressure_waits += 1
+                self._cond.notify_all()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise AuditBackpressureError(
+                        f"Audit log is {self.capacity} rows behind its writer"
+                    )
+                self._cond.wait(remaining)
+            self._put(self._code(version), timestamp, X, predictions)
+
+    def record_sync(self, version, X, predictions):
+        """
+        Write rows as their own block and fsync it before returning.
+
+        Rows already buffered are flushed first. A failed write raises the
+        OSError, and none of the rows are kept.
+        """
+        X, predictions = _rows(X, predictions)
+        timestamp = self._clock()
+        self.flush()
+        with self._cond:
+            code = self._code(version)
+            versions = list(self._versions)
+        n_rows = len(predictions)
+        block = _encode_block(
+            np.full(n_rows, timestamp),
+            np.full(n_rows, code, dtype=np.uint16),
+            X,
+            predictions,
+            versions,
+        )
+        with self._flush_lock:
+            try:
+                self._write(block)
+            except OSError:
+                self.write_errors += 1
+                raise
+        self.rows_written += n_rows
+        self.blocks_written += 1
+
+    def _pending(self):
+        """Copies of the buffered rows (the caller holds the lock)."""
+        positions = np.arange(self._tail, self._head) % self.capacity
+        return (
+            self._timestamps[positions],
+            self._codes[positions],
+            self._X[positions],
+            self._predictions[positions],
+        )
+
+    def flush(self):
+        """Write buffered rows as one block and fsync; returns rows written."""
+        with self._flush_lock:
+            with self._cond:
+                head = self._head
+                if head == self._tail:
+                    return 0
+                columns = self._pending()
+                versions = list(self._versions)
+            started = time.perf_counter()
+            try:
+                self._write(_encode_block(*columns, versions))
+            except OSError as e:
+                # Rows stay buffered and are retried by the next flush
+                self.write_errors += 1
+                print(f"Warning: audit flush failed: {e}")
+                return 0
+            with self._cond:
+                written = head - self._tail
+                self._tail = head
+                self._cond.notify_all()
+            self.rows_written += written
+            self.blocks_written += 1
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            return written
+
+    def _open_file(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(self._clock()))
+        self._file_seq += 1
+        path = self.directory / f"audit-{stamp}-{os.getpid()}-{self._file_seq:04d}.bin"
+        header = json.dumps(
+            {
+                "format": FORMAT_VERSION,
+                "features": FEATURE_NAMES,
+                "pid": os.getpid(),
+                "created": self._clock(),
+            }
+        ).encode("utf-8")
+        self._file = open(path, "ab")
+        self._file.write(FILE_MAGIC + _LENGTH.pack(len(header)) + header)
+        self._file_bytes = self._file.tell()
+        _fsync_dir(self.directory)
+        self.files_opened += 1
+
+    def _write(self, block):
+        """Append one block to the current file (rotating first if full), then fsync."""
+        if (
+            self._file is not None
+            and self._file_bytes + len(block) > self.max_file_bytes
+        ):
+            self._file.close()
+            self._file = None
+        if self._file is None:
+            self._open_file()
+        self._file.write(block)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file_bytes += len(block)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._cond:
+                if self._head - self._tail < self.capacity // 2:
+                    self._cond.wait(self.flush_interval)
+            errors = self.write_errors
+            self.flush()
+            if self.write_errors > errors:
+                # Back off instead of spinning on a failing disk
+                self._stop_event.wait(self.flush_interval)
+
+    def close(self):
+        """Stop the writer, flush what is buffered and close the current file."""
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        self.flush()
+        with self._flush_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self._stop_event.clear()
+
+    def stats(self):
+        """Buffer occupancy and write counters."""
+        with self._cond:
+            buffered = self._head - self._tail
+        return {
+            "enabled": True,
+            "buffered": buffered,
+            "capacity": self.capacity,
+            "rows_written": self.rows_written,
+            "blocks_written": self.blocks_written,
+            "files_opened": self.files_opened,
+            "backpressure_waits": self.backpressure_waits,
+            "write_errors": self.write_errors,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+def _rows(X, predictions):
+    predictions = np.asarray(predictions, dtype=np.float64).reshape(-1)
+    X = np.asarray(X, dtype=np.float64).reshape(len(predictions), N_FEATURES)
+    return X, predictions
+
+
+def _read_exact(f, n):
+    data = f.read(n)
+    return data if len(data) == n else None
+
+
+def _block_headers(f):
+    """Yield ``(header, payload_length)`` per block, leaving ``f`` at the payload."""
+    while True:
+        frame = _read_exact(f, _BLOCK.size)
+        if frame is None:
+            return
+        magic, header_length, payload_length = _BLOCK.unpack(frame)
+        header = _read_exact(f, header_length) if magic == BLOCK_MAGIC else None
+        if header is None:
+            return
+        yield json.loads(header), payload_length
+
+
+def _decode_payload(payload, rows, n_features):
+    columns, offset = [], 0
+    for dtype, count in (("<f8", rows), ("<u2", rows), ("<f8", rows * n_features)):
+        columns.append(np.frombuffer(payload, dtype=dtype, count=count, offset=offset))
+        offset += columns[-1].nbytes
+    predictions = np.frombuffer(payload, dtype="<f8", count=rows, offset=offset)
+    timestamps, codes, features = columns
+    return timestamps, codes, features.reshape(n_features, rows).T, predictions
+
+
+def read_file(path, start=None, end=None, version=None):
+    """
+    Yield ``(timestamps, versions, X, predictions)`` per matching block of one file.
+
+    Rows are limited to ``start <= timestamp < end`` (epoch seconds) and to
+    ``version`` when given. Blocks outside the range are skipped unread.
+    """
+    start = -np.inf if start is None else start
+    end = np.inf if end is None else end
+    with open(path, "rb") as f:
+        if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(f"{path} is not an audit log")
+        length = _read_exact(f, _LENGTH.size)
+        if length is None:
+            return
+        meta = json.loads(f.read(_LENGTH.unpack(length)[0]))
+        n_features = len(meta["features"])
+        for header, payload_length in _block_headers(f):
+            if (
+                header["t_max"] < start
+                or header["t_min"] >= end
+                or (version is not None and version not in header["present"])
+            ):
+                f.seek(payload_length, os.SEEK_CUR)
+                continue
+            payload = _read_exact(f, payload_length)
+            if payload is None:
+                return
+            timestamps, codes, X, predictions = _decode_payload(
+                payload, header["rows"], n_features
+            )
+            keep = (timestamps >= start) & (timestamps < end)
+            if version is not None:
+                keep &= codes == header["versions"].index(version)
+            if keep.any():
+                names = np.asarray(header["versions"], dtype=object)[codes[keep]]
+                yield timestamps[keep], names, X[keep], predictions[keep]
+
+
+def log_files(directory, end=None):
+    """Audit files in ``directory`` in creation order, skipping those started after ``end``."""
+    files = sorted(Path(directory).glob("audit-*.bin"))
+    if end is None:
+        return files
+    # File names start with their UTC creation time
+    cutoff = time.strftime("%Y%m%dT%H%M%S", time.gmtime(end))
+    return [p for p in files if p.name.split("-")[1] <= cutoff]
+
+
+def scan(directory, start=None, end=None, version=None):
+    """Yield matching ``(timestamps, versions, X, predictions)`` blocks of a log directory."""
+    for path in log_files(directory, end):
+        yield from read_file(path, start, end, version)
+
+
+def parse_time(value):
+    """Epoch seconds from a number or an ISO-8601 string (UTC unless zoned)."""
+    try:
+        return float(value)
+    except ValueError:
+        stamp = datetime.fromisoformat(value)
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return stamp.timestamp()
+
+
+def _write_rows(blocks, fmt, out):
+    fields = ["timestamp", "model_version", *FEATURE_NAMES, "prediction"]
+    writer = csv.writer(out) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(fields)
+    for timestamps, versions, X, predictions in blocks:
+        for t, v, row, p in zip(
+            timestamps.tolist(), versions.tolist(), X.tolist(), predictions.tolist()
+        ):
+            stamp = datetime.fromtimestamp(t, timezone.utc).isoformat()
+            values = [stamp, v, *row, p]
+            if writer is not None:
+                writer.writerow(values)
+            else:
+                out.write(json.dumps(dict(zip(fields, values))) + "\n")
+
+
+def main(argv=None):
+    """Command-line entry point: print audited rows or per-version counts."""
+    parser = argparse.ArgumentParser(description="Read the prediction audit log")
+    parser.add_argument("--dir", default=str(AUDIT_DIR))
+    parser.add_argument("--since", type=parse_time, help="Epoch seconds or ISO time")
+    parser.add_argument("--until", type=parse_time, help="Exclusive end time")
+    parser.add_argument("--version", help="Only rows scored by this model version")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument(
+        "--count", action="store_true", help="Print row counts per model version"
+    )
+    args = parser.parse_args(argv)
+
+    blocks = scan(args.dir, args.since, args.until, args.version)
+    if not args.count:
+        _write_rows(blocks, args.format, sys.stdout)
+        return
+    counts = {}
+    for _, versions, _, _ in blocks:
+        names, n = np.unique(versions.astype(str), return_counts=True)
+        for name, count in zip(names.tolist(), n.tolist()):
+            counts[name] = counts.get(name, 0) + count
+    for name, count in sorted(counts.items()):
+        print(f"{name}  {count}")
+    print(f"{sum(counts.values())} rows")
+
+
+if __name__ == "__main__":
+    main()
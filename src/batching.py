@@ -0,0 +1,155 @@
+"""
+Dynamic micro-batching for single-row prediction requests.
+
+Concurrent ``/predict`` calls are queued and coalesced for up to a short
+window (or until a maximum batch size is reached), scored as one matrix, and
+each waiting handler receives its own row of the result.
+"""
+
+import asyncio
+import bisect
+import contextvars
+
+import numpy as np
+
+DEFAULT_WINDOW_MS = 2.0
+DEFAULT_MAX_BATCH_SIZE = 64
+
+# Histogram bucket upper bounds (inclusive); counts above the last go to "+Inf"
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class Histogram:
+    """Fixed-bucket histogram with per-bucket (non-cumulative) counts."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Record one observation."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        """Return bucket counts keyed by upper bound, plus count and sum."""
+        labels = [str(b) for b in self.buckets] + ["+Inf"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-row requests into batched model calls.
+
+    ``score_fn`` takes an (n, n_features) matrix and returns n predictions.
+    The worker task is bound to the running event loop and is restarted if
+    the batcher is used from a different loop.
+    """
+
+    def __init__(
+        self,
+        score_fn,
+        window_ms=DEFAULT_WINDOW_MS,
+        max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.score_fn = score_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_depths = Histogram(QUEUE_DEPTH_BUCKETS)
+        self.max_queue_depth = 0
+        self._loop = None
+        self._queue = None
+        self._task = None
+
+    async def submit(self, row):
+        """Queue one feature row and wait for its prediction."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._start(loop)
+
+        future = loop.create_future()
+        self._queue.put_nowait((row, future))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return await future
+
+    def _start(self, loop):
+        """Create the queue and worker task on ``loop``."""
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        # A task copies the current context; started from an empty one, the
+        # long-lived worker does not inherit the first request's stage timer
+        self._task = contextvars.Context().run(loop.create_task, self._run())
+
+    async def _collect(self):
+        """Wait for the first request, then gather more until the window closes."""
+        batch = [await self._queue.get()]
+        self.queue_depths.observe(self._queue.qsize() + 1)
+        deadline = self._loop.time() + self.window
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _dispatch(self, batch):
+        """Score a collected batch and resolve each waiting future."""
+        self.batch_sizes.observe(len(batch))
+        futures = [future for _, future in batch]
+        try:
+            X = np.vstack([row for row, _ in batch])
+            predictions = self.score_fn(X).tolist()
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, prediction in zip(futures, predictions):
+            if not future.done():
+                future.set_result(float(prediction))
+
+    async def _run(self):
+        """Worker loop: collect, score, repeat."""
+        while True:
+            self._dispatch(await self._collect())
+
+    async def close(self):
+        """Cancel the worker task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        """Return queue depth and batch size statistics for tuning."""
+        return {
+            "enabled": True,
+            "window_ms": self.window * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_depth_histogram": self.queue_depths.snapshot(),
+            "batch_size_histogram": self.batch_sizes.snapshot(),
+        }
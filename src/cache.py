@@ -0,0 +1,96 @@
+"""
+In-process prediction cache with LRU and TTL eviction.
+
+Entries are keyed by model version, the loaded instance of that version
+and the feature vector. With a ``quantum`` each feature is rounded to a
+multiple of it before hashing, so resubmitted vectors that differ only by
+float noise still hit.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """Bounded cache of ``(version, features) -> prediction``."""
+
+    def __init__(self, maxsize=10000, ttl=3600.0, quantum=0.0, clock=time.monotonic):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.quantum = quantum
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def key(self, version, row, instance=None):
+        """
+        Cache key for one feature row under ``version``.
+
+        ``instance`` identifies the loaded model, so a prediction that
+        finishes on a replaced model cannot be served by its successor.
+        """
+        row = np.asarray(row, dtype=np.float64)
+        if self.quantum:
+            row = np.rint(row / self.quantum).astype(np.int64)
+        return version, instance, row.tobytes()
+
+    def get(self, key):
+        """Return the cached prediction for ``key`` or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a prediction, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (value, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self, version=None):
+        """Drop all entries, or only those of ``version``."""
+        with self._lock:
+            if version is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == version]:
+                del self._entries[key]
+
+    def stats(self):
+        """Hit/miss/eviction counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": True,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "quantum": self.quantum,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,129 @@
+"""
+Binary request/response encodings negotiated by Content-Type.
+
+    application/x-triage-f64   raw little-endian float64, row-major (n, 10)
+    application/x-triage-f32   raw little-endian float32, row-major (n, 10)
+    application/msgpack        {"data": <bytes>, "dtype": "f8"|"f4"} or
+                               {"rows": [[...], ...]}  (needs ``msgpack``)
+
+Raw bodies decode with ``np.frombuffer``: no copy, no per-field validation.
+Responses use the request's encoding. Raw responses hold one prediction per
+row in the request dtype, with NaN for rows that had non-finite features.
+MessagePack responses are ``{"predictions", "invalid_rows", "model_version"}``.
+"""
+
+import numpy as np
+
+from src.features import N_FEATURES, to_float_matrix
+
+F64_MEDIA_TYPE = "application/x-triage-f64"
+F32_MEDIA_TYPE = "application/x-triage-f32"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+
+class CodecError(ValueError):
+    """Raised when a body cannot be decoded with the negotiated encoding."""
+
+
+class CodecUnavailableError(CodecError):
+    """Raised when an encoding needs an optional package that is missing."""
+
+
+class RawCodec:
+    """Fixed-width little-endian float rows."""
+
+    def __init__(self, media_type, dtype):
+        self.media_type = media_type
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+
+    def decode(self, body):
+        """View the body as an (n, 10) matrix without copying it."""
+        row_bytes = self.dtype.itemsize * N_FEATURES
+        if not body or len(body) % row_bytes:
+            raise CodecError(
+                f"Body of {len(body)} bytes is not a whole number of "
+                f"{N_FEATURES}-feature {self.dtype.name} rows"
+            )
+        return np.frombuffer(body, dtype=self.dtype).reshape(-1, N_FEATURES)
+
+    def encode(self, predictions, invalid_rows, model_version):
+        """Predictions as raw floats in the request dtype."""
+        return np.asarray(predictions, dtype=self.dtype).tobytes()
+
+
+class MsgpackCodec:
+    """MessagePack maps carrying either a raw float buffer or nested rows."""
+
+    media_type = MSGPACK_MEDIA_TYPE
+
+    @staticmethod
+    def _msgpack():
+        try:
+            import msgpack
+        except ImportError as e:
+            raise CodecUnavailableError(
+                "MessagePack support requires the msgpack package"
+            ) from e
+        return msgpack
+
+    def decode(self, body):
+        try:
+            payload = self._msgpack().unpackb(body)
+        except CodecError:
+            raise
+        except Exception as e:
+            raise CodecError(f"Invalid MessagePack body: {e}") from e
+        return self.decode_payload(payload)
+
+    def decode_payload(self, payload):
+        """The (n, 10) matrix of an unpacked MessagePack map."""
+        if not isinstance(payload, dict):
+            raise CodecError("MessagePack body must be a map")
+        if "data" in payload:
+            dtype = payload.get("dtype", "f8")
+            if dtype not in ("f8", "f4"):
+                raise CodecError(f"Unsupported dtype {dtype!r} (use 'f8' or 'f4')")
+            data = payload["data"]
+            if not isinstance(data, (bytes, bytearray)):
+                raise CodecError(f"'data' must be binary, got {type(data).__name__}")
+            return RawCodec(self.media_type, dtype).decode(data)
+        if "rows" in payload:
+            shape_error = f"'rows' must be a list of {N_FEATURES}-value rows"
+            try:
+                X = to_float_matrix(payload["rows"])
+            except (TypeError, ValueError) as e:
+                raise CodecError(shape_error) from e
+            if X.ndim != 2 or X.shape[1] != N_FEATURES:
+                raise CodecError(shape_error)
+            return X
+        raise CodecError("MessagePack body needs 'data' or 'rows'")
+
+    def encode(self, predictions, invalid_rows, model_version):
+        return self._msgpack().packb(
+            {
+                "predictions": np.asarray(predictions, dtype=np.float64).tolist(),
+                "invalid_rows": [int(i) for i in invalid_rows],
+                "model_version": model_version,
+            }
+        )
+
+
+CODECS = {
+    F64_MEDIA_TYPE: RawCodec(F64_MEDIA_TYPE, "f8"),
+    F32_MEDIA_TYPE: RawCodec(F32_MEDIA_TYPE, "f4"),
+    MSGPACK_MEDIA_TYPE: MsgpackCodec(),
+}
+
+
+def negotiate(content_type):
+    """Codec for a Content-Type header, or None for JSON (the default)."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return CODECS.get(media_type)
+
+
+def binary_request_body(schema):
+    """OpenAPI requestBody listing JSON (``schema``) and the binary encodings."""
+    content = {"application/json": {"schema": schema}}
+    for media_type in CODECS:
+        content[media_type] = {"schema": {"type": "string", "format": "binary"}}
+    return {"requestBody": {"required": True, "content": content}}
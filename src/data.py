@@ -0,0 +1,158 @@
+"""
+Chunked data sources for training on extracts larger than memory.
+
+Every source yields ``(X, y)`` float64 chunks with the feature columns in
+``FEATURE_NAMES`` order. Supported inputs:
+
+    *.csv              read with pandas in ``chunk_size`` row blocks
+    *.parquet / *.pq   read batch by batch with pyarrow (optional dependency)
+    *.npy              memory-mapped 2-D array, target in the last column
+                       unless a separate target ``.npy`` is given
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.features import FEATURE_NAMES
+
+DEFAULT_CHUNK_SIZE = 100_000
+TARGET_COLUMN = "target"
+
+
+class DataSource:
+    """Base class: iterate ``(X, y)`` chunks of at most ``chunk_size`` rows."""
+
+    def __init__(
+        self, path, features=FEATURE_NAMES, target=TARGET_COLUMN, chunk_size=None
+    ):
+        self.path = Path(path)
+        self.features = list(features)
+        self.target = target
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+
+    def iter_chunks(self):
+        raise NotImplementedError
+
+    def __iter__(self):
+        return self.iter_chunks()
+
+    def _split(self, frame):
+        """Feature matrix and target vector from a DataFrame chunk."""
+        missing = [c for c in self.features + [self.target] if c not in frame]
+        if missing:
+            raise ValueError(f"{self.path} is missing columns: {', '.join(missing)}")
+        X = frame[self.features].to_numpy(dtype=np.float64)
+        y = frame[self.target].to_numpy(dtype=np.float64)
+        return X, y
+
+
+class CSVSource(DataSource):
+    """CSV file with a header row naming the feature and target columns."""
+
+    def iter_chunks(self):
+        columns = self.features + [self.target]
+        reader = pd.read_csv(self.path, usecols=columns, chunksize=self.chunk_size)
+        with reader:
+            for frame in reader:
+                yield self._split(frame)
+
+
+class ParquetSource(DataSource):
+    """Parquet file read one record batch at a time."""
+
+    def iter_chunks(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet files requires pyarrow") from e
+
+        columns = self.features + [self.target]
+        parquet_file = pq.ParquetFile(self.path)
+        for batch in parquet_file.iter_batches(
+            batch_size=self.chunk_size, columns=columns
+        ):
+            yield self._split(batch.to_pandas())
+
+
+class NpySource(DataSource):
+    """
+    Memory-mapped ``.npy`` matrix.
+
+    Columns are the features in ``FEATURE_NAMES`` order followed by the
+    target, or features only when ``target_path`` names a separate array.
+    """
+
+    def __init__(self, path, target_path=None, **kwargs):
+        super().__init__(path, **kwargs)
+        self.target_path = Path(target_path) if target_path else None
+
+    def iter_chunks(self):
+        data = np.load(self.path, mmap_mode="r")
+        n_features = len(self.features)
+        if self.target_path is not None:
+            target = np.load(self.target_path, mmap_mode="r")
+            expected = n_features
+        else:
+            target = None
+            expected = n_features + 1
+        if data.ndim != 2 or data.shape[1] != expected:
+            raise ValueError(
+                f"{self.path} has shape {data.shape}; expected (n, {expected})"
+            )
+
+        for start in range(0, data.shape[0], self.chunk_size):
+            end = start + self.chunk_size
+            block = np.asarray(data[start:end], dtype=np.float64)
+            if target is None:
+                yield block[:, :n_features], block[:, n_features]
+            else:
+                yield block, np.asarray(target[start:end], dtype=np.float64)
+
+
+SOURCES = {
+    ".csv": CSVSource,
+    ".parquet": ParquetSource,
+    ".pq": ParquetSource,
+    ".npy": NpySource,
+}
+
+
+def open_source(path, **kwargs):
+    """Pick the data source for ``path`` by file extension."""
+    suffix = Path(path).suffix.lower()
+    if suffix not in SOURCES:
+        supported = ", ".join(sorted(SOURCES))
+        raise ValueError(f"Unsupported data file {path} (expected {supported})")
+    return SOURCES[suffix](path, **kwargs)
+
+
+def row_uniforms(indices, seed):
+    """
+    Deterministic uniform [0, 1) value per global row index (splitmix64).
+
+    Used to assign rows to the train/test split independently of how the
+    file is chunked.
+    """
+    seed_offset = np.uint64((seed * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF)
+    z = np.asarray(indices, dtype=np.uint64) + seed_offset
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def split_chunks(source, test_size=0.2, seed=42):
+    """
+    Yield ``(X_train, y_train, X_test, y_test, n_dropped)`` per chunk.
+
+    Rows with missing or non-finite values are dropped and counted.
+    """
+    offset = 0
+    for X, y in source:
+        is_test = row_uniforms(np.arange(offset, offset + len(y)), seed) < test_size
+        offset += len(y)
+        finite = np.isfinite(X).all(axis=1) & np.isfinite(y)
+        train, test = finite & ~is_test, finite & is_test
+        yield X[train], y[train], X[test], y[test], int((~finite).sum())
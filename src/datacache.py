@@ -0,0 +1,296 @@
+"""
+Content-addressed on-disk cache for training data, splits and transforms.
+
+Entries are directories of ``.npy`` files under ``DATA_CACHE_DIR``, named by
+a SHA-256 key. The dataset entry is keyed by a hash of the bundled diabetes
+files. A split entry adds the seed, the test size and the scikit-learn
+version, because ``train_test_split`` output may change between releases. A
+split entry holds the train/test arrays, the fitted ``StandardScaler``
+statistics and the scaled matrices. Hits are served as read-only memory maps.
+
+Changed data, seed or test size produce a new key, so stale entries are
+never read. Entries that fail to load are dropped and rebuilt. The cache is
+bounded by ``DATA_CACHE_MAX_MB``, and the least recently used entries are
+evicted first.
+
+    python -m src.datacache --list
+    python -m src.datacache --clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+
+from src.features import FEATURE_NAMES
+
+# Where cached arrays live; DATA_CACHE_ENABLED=0 always rebuilds in memory
+DATA_CACHE_DIR = Path(os.getenv("DATA_CACHE_DIR", ".cache/data"))
+DATA_CACHE_ENABLED = os.getenv("DATA_CACHE_ENABLED", "1") == "1"
+
+# Total size above which least recently used entries are evicted
+DATA_CACHE_MAX_MB = float(os.getenv("DATA_CACHE_MAX_MB", "512"))
+
+# Bump when the layout of cached entries changes
+CACHE_FORMAT = 1
+
+META_NAME = "meta.json"
+DIABETES_FILES = ("diabetes_data_raw.csv.gz", "diabetes_target.csv.gz")
+
+
+class DataCache:
+    """Directory of content-addressed entries, each a set of named arrays."""
+
+    def __init__(self, root=DATA_CACHE_DIR, max_bytes=DATA_CACHE_MAX_MB * 2**20):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(**parts):
+        """Stable SHA-256 key for the given JSON-able parts."""
+        blob = json.dumps({"format": CACHE_FORMAT, **parts}, sort_keys=True)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Arrays of entry ``key`` as read-only memory maps, or None on a miss."""
+        entry = self.root / key
+        try:
+            meta = json.loads((entry / META_NAME).read_text())
+            arrays = {
+                name: np.load(entry / f"{name}.npy", mmap_mode="r")
+                for name in meta["arrays"]
+            }
+        except (OSError, ValueError, KeyError):
+            if entry.exists():
+                self.invalidate(key)
+            self.misses += 1
+            return None
+        # The meta file's mtime records the last use for LRU eviction
+        os.utime(entry / META_NAME)
+        self.hits += 1
+        return arrays
+
+    def put(self, key, arrays):
+        """Store ``arrays`` under ``key`` atomically, then enforce the size bound."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".tmp-{key}-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        for name, array in arrays.items():
+            np.save(tmp / f"{name}.npy", np.ascontiguousarray(array))
+        meta = {"arrays": sorted(arrays), "created": time.time()}
+        (tmp / META_NAME).write_text(json.dumps(meta))
+        try:
+            os.rename(tmp, self.root / key)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict(keep=key)
+
+    def get_or_build(self, key, build):
+        """Cached arrays for ``key``, calling ``build() -> {name: array}`` on a miss."""
+        arrays = self.get(key)
+        if arrays is None:
+            arrays = build()
+            try:
+                self.put(key, arrays)
+            except OSError as e:
+                print(f"Warning: could not write data cache entry: {e}")
+        return arrays
+
+    def entries(self):
+        """``[(key, size_bytes, last_used)]``, least recently used first."""
+        if not self.root.is_dir():
+            return []
+        found = []
+        for entry in self.root.iterdir():
+            meta = entry / META_NAME
+            if entry.name.startswith(".") or not meta.exists():
+                continue
+            size = sum(p.stat().st_size for p in entry.iterdir())
+            found.append((entry.name, size, meta.stat().st_mtime))
+        return sorted(found, key=lambda e: e[2])
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the total fits ``max_bytes``."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self.invalidate(key)
+            total -= size
+            removed.append(key)
+        return removed
+
+    def invalidate(self, key):
+        """Drop one entry."""
+        shutil.rmtree(self.root / key, ignore_errors=True)
+
+    def clear(self):
+        """Drop every entry."""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def diabetes_data_hash():
+    """SHA-256 of scikit-learn's bundled diabetes files."""
+    digest = hashlib.sha256()
+    # Located without importing sklearn.datasets, which a cache hit never needs
+    package_dir = Path(importlib.util.find_spec("sklearn").origin).parent
+    data_dir = package_dir / "datasets" / "data"
+    for name in DIABETES_FILES:
+        digest.update((data_dir / name).read_bytes())
+    return digest.hexdigest()
+
+
+def dataset_hash(dataset):
+    """SHA-256 of a ``{"X", "y"}`` dataset's shapes, dtypes and values."""
+    digest = hashlib.sha256()
+    for name in ("X", "y"):
+        array = np.ascontiguousarray(dataset[name])
+        digest.update(f"{name}{array.shape}{array.dtype.str}".encode("utf-8"))
+        digest.update(array.data)
+    return digest.hexdigest()
+
+
+def _build_dataset():
+    from sklearn.datasets import load_diabetes
+
+    frame = load_diabetes(as_frame=True).frame
+    return {
+        "X": frame[FEATURE_NAMES].to_numpy(dtype=np.float64),
+        "y": frame["target"].to_numpy(dtype=np.float64),
+    }
+
+
+def _build_split(X, y, test_size, seed):
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        np.asarray(X), np.asarray(y), test_size=test_size, random_state=seed
+    )
+    scaler = StandardScaler().fit(X_train)
+    return {
+        "X_train": X_train,
+        "X_test": X_test,
+        "y_train": y_train,
+        "y_test": y_test,
+        "scaler_mean": scaler.mean_,
+        "scaler_var": scaler.var_,
+        "scaler_scale": scaler.scale_,
+        "X_train_scaled": scaler.transform(X_train),
+        "X_test_scaled": scaler.transform(X_test),
+    }
+
+
+def rebuild_scaler(mean, var, scale, n_samples, feature_names=FEATURE_NAMES):
+    """A fitted ``StandardScaler`` from cached statistics."""
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler()
+    scaler.mean_ = np.array(mean)
+    scaler.var_ = np.array(var)
+    scaler.scale_ = np.array(scale)
+    scaler.n_samples_seen_ = np.int64(n_samples)
+    scaler.n_features_in_ = len(feature_names)
+    scaler.feature_names_in_ = np.asarray(feature_names, dtype=object)
+    return scaler
+
+
+def _active_cache(cache):
+    if cache is not None:
+        return cache
+    return DataCache() if DATA_CACHE_ENABLED else None
+
+
+def load_dataset(cache=None):
+    """The diabetes dataset as ``{"X", "y"}`` float64 arrays (memory maps on a hit)."""
+    cache = _active_cache(cache)
+    if cache is None:
+        return _build_dataset()
+    key = cache.key(kind="diabetes", data=diabetes_data_hash())
+    return cache.get_or_build(key, _build_dataset)
+
+
+def load_split(test_size=0.2, seed=42, cache=None, dataset=None):
+    """
+    Train/test split of the diabetes dataset plus the train-fitted scaler.
+
+    Returns a dict with ``X``, ``y``, ``X_train``, ``X_test``, ``y_train``,
+    ``y_test``, ``X_train_scaled``, ``X_test_scaled`` and ``scaler``. Arrays
+    are memory maps when served from the cache. The split is identical to
+    ``train_test_split(X, y, test_size=test_size, random_state=seed)``.
+    ``dataset`` is a ``{"X", "y"}`` dataset to split instead; its values
+    are hashed into the cache key.
+    """
+    import sklearn
+
+    cache = _active_cache(cache)
+    supplied = dataset is not None
+    if not supplied:
+        dataset = load_dataset(cache)
+    if cache is None:
+        arrays = _build_split(dataset["X"], dataset["y"], test_size, seed)
+    else:
+        data = dataset_hash(dataset) if supplied else diabetes_data_hash()
+        key = cache.key(
+            kind="diabetes-split",
+            data=data,
+            seed=seed,
+            test_size=test_size,
+            sklearn=sklearn.__version__,
+        )
+        arrays = cache.get_or_build(
+            key, lambda: _build_split(dataset["X"], dataset["y"], test_size, seed)
+        )
+
+    split = dict(dataset, **arrays)
+    split["scaler"] = rebuild_scaler(
+        split.pop("scaler_mean"),
+        split.pop("scaler_var"),
+        split.pop("scaler_scale"),
+        len(split["y_train"]),
+    )
+    return split
+
+
+def main(argv=None):
+    """Command-line entry point: list or clear the cache."""
+    parser = argparse.ArgumentParser(description="Inspect the training data cache")
+    parser.add_argument("--dir", default=str(DATA_CACHE_DIR))
+    parser.add_argument("--list", action="store_true", help="List cached entries")
+    parser.add_argument("--clear", action="store_true", help="Remove every entry")
+    parser.add_argument(
+        "--evict", action="store_true", help="Evict down to DATA_CACHE_MAX_MB"
+    )
+    args = parser.parse_args(argv)
+
+    cache = DataCache(args.dir)
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {cache.root}")
+    if args.evict:
+        print(f"Evicted {len(cache.evict())} entries")
+    if args.list or not (args.clear or args.evict):
+        entries = cache.entries()
+        for key, size, last_used in entries:
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_used))
+            print(f"{key[:16]}  {size / 1024:9.1f} KiB  last used {stamp}")
+        total = sum(size for _, size, _ in entries)
+        print(f"{len(entries)} entries, {total / 2**20:.2f} MiB in {cache.root}")
+
+
+if __name__ == "__main__":
+    main()
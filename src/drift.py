@@ -0,0 +1,350 @@
+"""
+Online drift monitoring of served features and predictions.
+
+Each served model version keeps constant-memory statistics of the rows it
+scores. ``RunningMoments`` merges batch means and variances with Chan's
+parallel form of Welford's update. ``KLLSketch`` tracks quantiles of every
+feature and the prediction in one set of compactor levels: each level holds
+a column-wise sorted ``(items, columns)`` array, and all columns compact
+together. Rows are copied into a fixed buffer on the request path and folded
+into the statistics ``DRIFT_BUFFER_ROWS`` at a time. A request therefore
+pays for one small copy, and the vectorized update cost is amortized.
+
+Drift is measured against training. Means and spreads are compared with the
+scaler's ``mean_``/``scale_``. The population stability index (PSI) compares
+the live share of rows in each training decile bin with the training share.
+Training stores the decile edges of ``X_train`` with the artifact; older
+artifacts fall back to normal bins built from ``mean_``/``scale_``.
+Prediction bins come from the cohort scores. A PSI above about 0.2 is
+commonly read as a material shift.
+"""
+
+import os
+import threading
+from statistics import NormalDist
+
+import numpy as np
+
+from src.features import FEATURE_NAMES
+
+# Track feature and prediction distributions of served rows (0 to disable)
+DRIFT_ENABLED = os.getenv("DRIFT_ENABLED", "1") == "1"
+
+# Rows buffered per model version before they are folded into the statistics
+DRIFT_BUFFER_ROWS = int(os.getenv("DRIFT_BUFFER_ROWS", "1024"))
+
+# KLL sketch size: larger is more accurate (rank error about 1.7 / k)
+DRIFT_SKETCH_K = int(os.getenv("DRIFT_SKETCH_K", "200"))
+
+# PSI above which a feature or the prediction is reported as drifted
+DRIFT_PSI_ALERT = float(os.getenv("DRIFT_PSI_ALERT", "0.2"))
+
+# Reference bins per column (deciles) and the share floor used inside PSI
+DRIFT_BINS = 10
+PSI_FLOOR = 1e-4
+
+REPORT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+class RunningMoments:
+    """Count, mean and variance of each column, merged batch by batch."""
+
+    def __init__(self, n_columns):
+        self.count = 0
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+
+    def update(self, X):
+        """Fold an (n, n_columns) batch in (Chan et al. pairwise merge)."""
+        n = len(X)
+        if n == 0:
+            return
+        batch_mean = X.mean(axis=0)
+        batch_m2 = ((X - batch_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self.m2 = self.m2 + batch_m2 + delta**2 * (self.count * n / total)
+        self.count = total
+
+    @property
+    def std(self):
+        """Sample standard deviation of each column (NaN below two rows)."""
+        if self.count < 2:
+            return np.full_like(self.mean, np.nan)
+        return np.sqrt(self.m2 / (self.count - 1))
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch of several columns that share compaction decisions.
+
+    Level ``h`` items stand for ``2**h`` rows. A level over its capacity
+    (``k * (2/3)**depth``) is sorted per column, and every other item moves
+    up a level from a random offset, so memory stays ``O(k)`` per column.
+    """
+
+    def __init__(self, n_columns, k=DRIFT_SKETCH_K, seed=0):
+        self.k = k
+        self.n_columns = n_columns
+        self.count = 0
+        self.levels = [np.empty((0, n_columns))]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def update(self, X):
+        """Add an (n, n_columns) batch."""
+        self.levels[0] = np.concatenate([self.levels[0], X])
+        self.count += len(X)
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items, axis=0)
+                # An odd item stays behind; the rest are halved into the next level
+                keep = len(items) % 2
+                start = keep + int(self._rng.integers(2))
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty((0, self.n_columns)))
+                self.levels[level + 1] = np.concatenate(
+                    [self.levels[level + 1], items[start::2]]
+                )
+                self.levels[level] = items[:keep]
+            level += 1
+
+    @property
+    def size(self):
+        """Items retained across all levels (per column)."""
+        return sum(len(items) for items in self.levels)
+
+    def _weighted(self):
+        """Column-wise sorted items and cumulative weights."""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate(
+            [np.full(len(level), 2.0**h) for h, level in enumerate(self.levels)]
+        )
+        order = np.argsort(items, axis=0)
+        sorted_items = np.take_along_axis(items, order, axis=0)
+        return sorted_items, np.cumsum(weights[order], axis=0)
+
+    def cdf(self, points):
+        """
+        Estimated share of rows ``<= points`` for a (p, columns) array.
+
+        ``points`` may cover only the first columns of the sketch.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if self.count == 0:
+            return np.full(points.shape, np.nan)
+        items, cumulative = self._weighted()
+        out = np.empty(points.shape)
+        for j in range(points.shape[1]):
+            index = np.searchsorted(items[:, j], points[:, j], side="right")
+            out[:, j] = np.where(
+                index > 0, cumulative[np.maximum(index - 1, 0), j], 0.0
+            )
+        return out / cumulative[-1, : points.shape[1]]
+
+    def quantiles(self, qs):
+        """(len(qs), n_columns) estimated quantiles."""
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.count == 0:
+            return np.full((len(qs), self.n_columns), np.nan)
+        items, cumulative = self._weighted()
+        out = np.empty((len(qs), self.n_columns))
+        for j in range(self.n_columns):
+            index = np.searchsorted(cumulative[:, j], qs * cumulative[-1, j])
+            out[:, j] = items[np.minimum(index, len(items) - 1), j]
+        return out
+
+
+def _bin_shares(cdf_at_edges):
+    """Per-bin shares from the cumulative share at each inner edge."""
+    n_columns = cdf_at_edges.shape[1]
+    bounds = np.vstack([np.zeros(n_columns), cdf_at_edges, np.ones(n_columns)])
+    return np.diff(bounds, axis=0)
+
+
+def reference_bins(X, n_bins=DRIFT_BINS):
+    """
+    Training decile edges and bin shares of each column of ``X``.
+
+    Returns ``(edges, shares)`` of shapes ``(n_bins - 1, n_columns)`` and
+    ``(n_bins, n_columns)``. Ties (e.g. a binary feature) give empty bins,
+    so shares are exact rather than assumed equal.
+    """
+    X = np.asarray(X, dtype=np.float64).reshape(len(X), -1)
+    edges = np.quantile(X, np.arange(1, n_bins) / n_bins, axis=0)
+    cdf = (X[None, :, :] <= edges[:, None, :]).mean(axis=1)
+    return edges, _bin_shares(cdf)
+
+
+def normal_bins(mean, scale, n_bins=DRIFT_BINS):
+    """Equal-share bins of a normal with the scaler's mean and scale."""
+    z = np.array([NormalDist().inv_cdf(i / n_bins) for i in range(1, n_bins)])
+    edges = np.asarray(mean)[None, :] + z[:, None] * np.asarray(scale)[None, :]
+    return edges, np.full((n_bins, edges.shape[1]), 1.0 / n_bins)
+
+
+def psi(expected, actual, floor=PSI_FLOOR):
+    """Population stability index of each column from (bins, columns) shares."""
+    expected = np.maximum(expected, floor)
+    actual = np.maximum(actual, floor)
+    return ((actual - expected) * np.log(actual / expected)).sum(axis=0)
+
+
+class DriftReference:
+    """Training statistics served rows are compared against."""
+
+    def __init__(self, mean, scale, feature_bins=None, cohort_scores=None):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        if feature_bins is None:
+            self.feature_edges, self.feature_shares = normal_bins(self.mean, self.scale)
+            self.kind = "normal"
+        else:
+            self.feature_edges, self.feature_shares = (
+                np.asarray(a, dtype=np.float64) for a in feature_bins
+            )
+            self.kind = "training"
+        self.score_bins = self.score_mean = self.score_std = None
+        if cohort_scores is not None and len(cohort_scores) > 1:
+            scores = np.asarray(cohort_scores, dtype=np.float64)
+            self.score_bins = reference_bins(scores)
+            self.score_mean, self.score_std = float(scores.mean()), float(scores.std())
+
+    @classmethod
+    def from_arrays(cls, mean, scale, source):
+        """Reference from scaler statistics plus drift/cohort arrays in ``source``."""
+        edges, shares = source.get("drift_edges"), source.get("drift_shares")
+        bins = None if edges is None or shares is None else (edges, shares)
+        return cls(mean, scale, bins, source.get("cohort_scores"))
+
+
+def _number(value):
+    """JSON-safe float (NaN becomes None)."""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def _quantile_dict(values):
+    return {f"p{round(q * 100)}": _number(v) for q, v in zip(REPORT_QUANTILES, values)}
+
+
+class DriftMonitor:
+    """Streaming feature and prediction statistics of one model version."""
+
+    def __init__(
+        self,
+        reference,
+        features=FEATURE_NAMES,
+        buffer_rows=DRIFT_BUFFER_ROWS,
+        k=DRIFT_SKETCH_K,
+    ):
+        self.reference = reference
+        self.features = list(features)
+        n_columns = len(self.features) + 1
+        self.moments = RunningMoments(n_columns)
+        self.sketch = KLLSketch(n_columns, k)
+        self._buffer = np.empty((buffer_rows, n_columns))
+        self._buffered = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def _fold(self, rows):
+        self.moments.update(rows)
+        self.sketch.update(rows)
+
+    def observe(self, X, predictions):
+        """
+        Record scored rows; statistics update once the buffer fills.
+
+        Rows with a non-finite feature or prediction are counted in
+        ``skipped`` and left out, since one NaN would poison every statistic.
+        """
+        predictions = np.asarray(predictions, dtype=np.float64).reshape(-1)
+        finite = np.isfinite(X).all(axis=1) & np.isfinite(predictions)
+        if not finite.all():
+            X, predictions = X[finite], predictions[finite]
+        n = len(predictions)
+        with self._lock:
+            self.skipped += len(finite) - n
+            if self._buffered + n > len(self._buffer):
+                self._fold(self._buffer[: self._buffered])
+                self._buffered = 0
+            if n >= len(self._buffer):
+                self._fold(np.column_stack([X, predictions]))
+                return
+            start, stop = self._buffered, self._buffered + n
+            self._buffer[start:stop, :-1] = X
+            self._buffer[start:stop, -1] = predictions
+            self._buffered = stop
+
+    def flush(self):
+        """Fold buffered rows into the statistics."""
+        with self._lock:
+            self._fold(self._buffer[: self._buffered])
+            self._buffered = 0
+
+    def psi(self):
+        """``(feature_psi, prediction_psi or None)`` against the reference bins."""
+        self.flush()
+        with self._lock:
+            return self._psi()
+
+    def _psi(self):
+        ref = self.reference
+        n = len(self.features)
+        edges = ref.feature_edges
+        if ref.score_bins is not None:
+            edges = np.column_stack([edges, ref.score_bins[0]])
+        live = _bin_shares(self.sketch.cdf(edges))
+        feature_psi = psi(ref.feature_shares, live[:, :n])
+        if ref.score_bins is None:
+            return feature_psi, None
+        return feature_psi, float(psi(ref.score_bins[1], live[:, n:])[0])
+
+    def report(self, alert=DRIFT_PSI_ALERT):
+        """JSON-ready statistics and drift scores of everything observed so far."""
+        self.flush()
+        ref = self.reference
+        with self._lock:
+            count = self.moments.count
+            mean, std = self.moments.mean, self.moments.std
+            quantiles = self.sketch.quantiles(REPORT_QUANTILES)
+            feature_psi, prediction_psi = self._psi()
+
+        features = {}
+        for j, name in enumerate(self.features):
+            features[name] = {
+                "mean": _number(mean[j]),
+                "std": _number(std[j]),
+                "train_mean": float(ref.mean[j]),
+                "train_std": float(ref.scale[j]),
+                "mean_shift": _number((mean[j] - ref.mean[j]) / ref.scale[j]),
+                "std_ratio": _number(std[j] / ref.scale[j]),
+                "psi": _number(feature_psi[j]),
+                "quantiles": _quantile_dict(quantiles[:, j]),
+            }
+        prediction = {
+            "mean": _number(mean[-1]),
+            "std": _number(std[-1]),
+            "train_mean": ref.score_mean,
+            "train_std": ref.score_std,
+            "psi": None if prediction_psi is None else _number(prediction_psi),
+            "quantiles": _quantile_dict(quantiles[:, -1]),
+        }
+        scores = {name: stats["psi"] for name, stats in features.items()}
+        scores["prediction"] = prediction["psi"]
+        return {
+            "rows": count,
+            "skipped_rows": self.skipped,
+            "reference": ref.kind,
+            "psi_alert": alert,
+            "drifted": [k for k, v in scores.items() if v is not None and v > alert],
+            "features": features,
+            "prediction": prediction,
+        }
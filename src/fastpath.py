@@ -0,0 +1,99 @@
+"""
+Trusted-client fast path: JSON request bodies straight to NumPy.
+
+The regular endpoints validate bodies through pydantic models (every field
+of a /predict row) and then read the features back out in Python. Trusted
+clients, such as internal ETL jobs that validate upstream, skip that. The
+body is decoded by pydantic-core's JSON parser without model validation.
+Features are pulled out with one ``operator.itemgetter`` call per row, or
+one array conversion per column. The matrix is then checked in one
+vectorized pass (``src.features.valid_rows``). Malformed payloads raise
+FastPathError. Bad values only reject their own row, which is reported by
+index.
+"""
+
+import operator
+
+from pydantic_core import from_json
+
+from src.features import FEATURE_NAMES, N_FEATURES, rows_to_matrix, to_float_matrix
+
+_FEATURES = operator.itemgetter(*FEATURE_NAMES)
+
+
+class FastPathError(ValueError):
+    """Raised when a trusted request body does not have the expected shape."""
+
+
+def _load(body):
+    try:
+        payload = from_json(body)
+    except ValueError as e:
+        raise FastPathError(f"Invalid JSON body: {e}") from None
+    if not isinstance(payload, dict):
+        raise FastPathError("Body must be a JSON object")
+    return payload
+
+
+def parse_row(body):
+    """The (1, n_features) matrix of a single-row body (non-numbers become NaN)."""
+    payload = _load(body)
+    try:
+        values = _FEATURES(payload)
+    except KeyError as e:
+        raise FastPathError(f"Missing feature: {e.args[0]}") from None
+    return to_float_matrix([values]).reshape(1, N_FEATURES)
+
+
+def _instances_matrix(instances):
+    if not isinstance(instances, list):
+        raise FastPathError("'instances' must be a list of objects")
+    try:
+        values = list(map(_FEATURES, instances))
+    except (KeyError, TypeError):
+        # Some row lacks a feature or is not an object; those become NaN
+        rows = [row if isinstance(row, dict) else {} for row in instances]
+        return rows_to_matrix(rows)
+    return to_float_matrix(values).reshape(len(instances), N_FEATURES)
+
+
+def _columns_matrix(columns):
+    if not isinstance(columns, dict):
+        raise FastPathError("'columns' must be an object of feature lists")
+    missing = [f for f in FEATURE_NAMES if not isinstance(columns.get(f), list)]
+    if missing:
+        raise FastPathError(f"Missing feature columns: {', '.join(missing)}")
+    lengths = {len(columns[f]) for f in FEATURE_NAMES}
+    if len(lengths) > 1:
+        raise FastPathError("Feature columns differ in length")
+    values = [columns[f] for f in FEATURE_NAMES]
+    return to_float_matrix(values).reshape(N_FEATURES, lengths.pop()).T
+
+
+def parse_batch(body):
+    """
+    ``(X, row_ids)`` of a batch body in the ``/predict/batch`` layout.
+
+    Accepts ``instances`` (rows, optionally with an ``id``) or ``columns``,
+    plus optional ``ids``. Missing or non-numeric values become NaN.
+    """
+    payload = _load(body)
+    instances, columns = payload.get("instances"), payload.get("columns")
+    if (instances is None) == (columns is None):
+        raise FastPathError("Provide exactly one of 'instances' or 'columns'")
+
+    if instances is not None:
+        X = _instances_matrix(instances)
+        row_ids = [
+            row.get("id") if isinstance(row, dict) else None for row in instances
+        ]
+    else:
+        X = _columns_matrix(columns)
+        row_ids = [None] * X.shape[0]
+
+    ids = payload.get("ids")
+    if ids is not None:
+        if not isinstance(ids, list) or len(ids) != X.shape[0]:
+            raise FastPathError("'ids' must have one entry per row")
+        row_ids = ids
+    return X, [None if i is None else str(i) for i in row_ids]
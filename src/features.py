@@ -0,0 +1,69 @@
+"""
+Feature layout and array conversion shared by the API and bulk scoring paths.
+"""
+
+import os
+
+import numpy as np
+
+# Feature order expected by the scaler and model
+FEATURE_NAMES = ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
+N_FEATURES = len(FEATURE_NAMES)
+
+# Largest absolute feature value accepted by range checks. The standardized
+# features stay within about +/-0.2, so raw (unstandardized) rows fail it
+FEATURE_ABS_LIMIT = float(os.getenv("FEATURE_ABS_LIMIT", "1.0"))
+
+
+def _coerce(value):
+    """Convert one value to float, mapping anything unusable to NaN."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def to_float_matrix(values):
+    """
+    Convert nested values to a float64 matrix.
+
+    Unconvertible entries (missing, null, non-numeric) become NaN so they are
+    caught by the per-row finiteness check instead of failing the batch.
+    """
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([[_coerce(v) for v in row] for row in values], dtype=np.float64)
+
+
+def rows_to_matrix(rows):
+    """Build an (n, 10) feature matrix from feature dicts."""
+    values = [[row.get(f) for f in FEATURE_NAMES] for row in rows]
+    return to_float_matrix(values).reshape(len(rows), N_FEATURES)
+
+
+def valid_rows(X, limit=FEATURE_ABS_LIMIT):
+    """Mask of rows whose features are all finite and within ``+/-limit``."""
+    magnitude = np.abs(X)
+    # Capped so one comparison also rejects infinities (and NaN) at any limit
+    limit = min(limit, np.finfo(np.float64).max)
+    # One whole-array reduction settles the common all-valid batch (NaN fails it)
+    if magnitude.size == 0 or magnitude.max() <= limit:
+        return np.ones(X.shape[0], dtype=bool)
+    with np.errstate(invalid="ignore"):
+        return (magnitude <= limit).all(axis=1)
+
+
+def row_error(X_row, limit=None):
+    """Describe which features of an invalid row could not be used."""
+    bad = [f for f, v in zip(FEATURE_NAMES, X_row) if not np.isfinite(v)]
+    problems = []
+    if bad:
+        problems.append(f"Missing or non-numeric value for: {', '.join(bad)}")
+    if limit is not None:
+        far = [
+            f for f, v in zip(FEATURE_NAMES, X_row) if np.isfinite(v) and abs(v) > limit
+        ]
+        if far:
+            problems.append(f"Out of range (|value| > {limit:g}) for: {', '.join(far)}")
+    return "; ".join(problems)
@@ -0,0 +1,164 @@
+"""
+One-pass training of linear models from chunked data.
+
+Each chunk updates a ``StandardScaler`` (``partial_fit``) and a set of
+sufficient statistics: row count, feature and target means, and the
+centered cross-products ``(X - mean)^T (X - mean)`` and
+``(X - mean)^T (y - y_mean)``. Chunks are merged with Chan et al.'s pairwise
+update, which stays numerically stable where raw ``X^T X`` sums would not.
+Memory is O(n_features^2) whatever the number of rows. OLS and Ridge are then
+solved from the statistics alone. Held-out test error is computed from the
+test rows' own statistics, so training and evaluation share a single pass.
+Optional ``ReservoirSample``s keep a fixed-size uniform sample of the train
+and test rows from the same pass, for the artifact's reference arrays.
+"""
+
+import numpy as np
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.preprocessing import StandardScaler
+
+from src.data import split_chunks
+
+
+class SufficientStats:
+    """Mergeable moments of ``(X, y)`` for least-squares problems."""
+
+    def __init__(self, n_features):
+        self.n = 0
+        self.x_mean = np.zeros(n_features)
+        self.y_mean = 0.0
+        self.xx = np.zeros((n_features, n_features))
+        self.xy = np.zeros(n_features)
+        self.yy = 0.0
+
+    def update(self, X, y):
+        """Merge one chunk into the running statistics."""
+        n_b = len(y)
+        if n_b == 0:
+            return
+        x_mean_b, y_mean_b = X.mean(axis=0), y.mean()
+        Xc, yc = X - x_mean_b, y - y_mean_b
+
+        n_a, n = self.n, self.n + n_b
+        dx, dy = x_mean_b - self.x_mean, y_mean_b - self.y_mean
+        weight = n_a * n_b / n
+
+        self.xx += Xc.T @ Xc + weight * np.outer(dx, dx)
+        self.xy += Xc.T @ yc + weight * dx * dy
+        self.yy += float(yc @ yc) + weight * dy * dy
+        self.x_mean += dx * n_b / n
+        self.y_mean += dy * n_b / n
+        self.n = n
+
+    def sse(self, weights, bias):
+        """Sum of squared residuals of ``X @ weights + bias`` on these rows."""
+        offset = self.y_mean - self.x_mean @ weights - bias
+        return float(
+            self.yy
+            - 2 * weights @ self.xy
+            + weights @ self.xx @ weights
+            + self.n * offset**2
+        )
+
+
+class ReservoirSample:
+    """Uniform sample of at most ``size`` rows from a stream (algorithm R)."""
+
+    def __init__(self, size, n_features, seed=0):
+        self.size = size
+        self.seen = 0
+        self.rows = np.empty((size, n_features))
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, X):
+        """Offer one chunk of rows to the sample."""
+        fill = min(max(self.size - self.seen, 0), len(X))
+        start, stop = self.seen, self.seen + fill
+        self.rows[start:stop] = X[:fill]
+        # Row i of the stream (0-based) replaces a random slot with chance size/(i+1)
+        positions = self.seen + np.arange(fill, len(X))
+        slots = self._rng.integers(0, positions + 1)
+        replace = np.flatnonzero(slots < self.size)
+        # Later rows win when several pick the same slot, as in the sequential form
+        last = len(replace) - 1 - np.unique(slots[replace][::-1], return_index=True)[1]
+        self.rows[slots[replace[last]]] = X[fill + replace[last]]
+        self.seen += len(X)
+
+    @property
+    def sample(self):
+        """The sampled rows (fewer than ``size`` if fewer were seen)."""
+        return self.rows[: min(self.seen, self.size)]
+
+
+def solve_standardized(stats, scale, alpha=0.0):
+    """
+    Coefficients on standardized features and the intercept.
+
+    Equivalent to fitting ``Ridge(alpha)`` (or OLS for ``alpha=0``) with an
+    intercept on ``(X - mean) / scale``.
+    """
+    gram = stats.xx / np.outer(scale, scale)
+    rhs = stats.xy / scale
+    if alpha > 0:
+        coef = np.linalg.solve(gram + alpha * np.eye(len(scale)), rhs)
+    else:
+        coef = np.linalg.lstsq(gram, rhs, rcond=None)[0]
+    return coef, stats.y_mean
+
+
+def _estimator(coef, intercept, alpha, n_features):
+    """An sklearn estimator carrying the solved coefficients."""
+    model = Ridge(alpha=alpha) if alpha > 0 else LinearRegression()
+    model.coef_ = coef
+    model.intercept_ = float(intercept)
+    model.n_features_in_ = n_features
+    return model
+
+
+def train_incremental(
+    source, alpha=0.0, test_size=0.2, seed=42, train_sample=None, test_sample=None
+):
+    """
+    Train scaler + OLS/Ridge over ``source`` in one pass.
+
+    Returns ``(pipeline, metrics)``; the pipeline has the same
+    ``{"scaler", "model"}`` layout as the in-memory training path.
+    ``train_sample``/``test_sample`` (ReservoirSample) are fed the split's
+    rows as they stream past.
+    """
+    n_features = len(source.features)
+    scaler = StandardScaler()
+    train, test = SufficientStats(n_features), SufficientStats(n_features)
+    n_dropped = 0
+
+    for X_train, y_train, X_test, y_test, dropped in split_chunks(
+        source, test_size, seed
+    ):
+        if len(y_train):
+            scaler.partial_fit(X_train)
+        train.update(X_train, y_train)
+        test.update(X_test, y_test)
+        for sample, X in ((train_sample, X_train), (test_sample, X_test)):
+            if sample is not None:
+                sample.update(X)
+        n_dropped += dropped
+
+    if train.n < 2:
+        raise ValueError(f"Not enough training rows in {source.path}")
+
+    scaler.feature_names_in_ = np.asarray(source.features, dtype=object)
+    coef, intercept = solve_standardized(train, scaler.scale_, alpha)
+    model = _estimator(coef, intercept, alpha, n_features)
+
+    metrics = {"n_train": train.n, "n_test": test.n, "n_dropped": n_dropped}
+    if test.n:
+        weights = coef / scaler.scale_
+        bias = intercept - scaler.mean_ @ weights
+        sse = test.sse(weights, bias)
+        metrics["rmse"] = float(np.sqrt(sse / test.n))
+        metrics["r2"] = float(1 - sse / test.yy) if test.yy > 0 else 0.0
+
+    pipeline = {"scaler": scaler, "model": model}
+    if alpha > 0:
+        pipeline["type"] = "ridge"
+    return pipeline, metrics
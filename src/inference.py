@@ -0,0 +1,267 @@
+"""
+Inference engines for serving predictions without per-call sklearn overhead.
+
+Linear pipelines (a StandardScaler followed by a linear model) reduce to
+``X @ weights + bias`` once the scaler's mean/scale are folded into the model
+coefficients. Tree ensembles are flattened into node arrays and evaluated by
+``src.trees.TreeEnsembleEngine``. Other pipelines are served through the
+original sklearn objects instead.
+
+A folded engine can also score float32 rows in single precision. It is only
+enabled if its predictions stay within ``PRECISION_TOLERANCE`` of float64 on
+the artifact's reference rows (the training test split).
+"""
+
+import os
+
+import numpy as np
+
+from src.artifact import linear_pipeline_arrays
+from src.telemetry import current_timer, timed
+from src.trees import TreeEnsembleEngine
+
+# Maximum absolute deviation from sklearn tolerated by a folded engine
+DEFAULT_TOLERANCE = 1e-6
+
+# Number of synthetic rows used to check a folded engine against sklearn
+N_PROBE_ROWS = 64
+
+# Precisions a folded engine can run at, most precise first
+PRECISIONS = ("float64", "float32")
+
+# Largest prediction deviation from float64 (progression score units) a
+# reduced-precision engine may show on the reference rows
+PRECISION_TOLERANCE = float(os.getenv("PRECISION_TOLERANCE", "0.5"))
+
+
+class FusedLinearEngine:
+    """Scaler and linear model folded into one weight vector and bias."""
+
+    kind = "fused-linear"
+
+    def __init__(self, weights, bias):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """Fold a scaler + linear model pipeline into a fused engine."""
+        return cls(*fold_linear_pipeline(pipeline))
+
+    def predict(self, X):
+        """Score an (n, n_features) matrix with a single dot product."""
+        if current_timer() is None:
+            return X @ self.weights + self.bias
+        # The scaler transform is folded into the weights, so there is one stage
+        with timed("predict"):
+            return X @ self.weights + self.bias
+
+
+class ReducedPrecisionEngine:
+    """
+    Folded linear engine with float32 weights for rows stored as float32.
+
+    Float32 inputs (``application/x-triage-f32`` bodies) are scored in single
+    precision without a copy, at half the input memory of float64. Float64
+    inputs are scored with the float64 weights: casting them to float32 first
+    costs more than the whole dot product.
+    """
+
+    def __init__(self, weights, bias, precision="float32"):
+        if precision not in PRECISIONS[1:]:
+            raise ValueError(f"Unknown reduced precision {precision!r}")
+        self.kind = f"fused-linear-{precision}"
+        self.precision = precision
+        self.dtype = np.dtype(precision)
+        self.deviation = None
+        self.reference = FusedLinearEngine(weights, bias)
+        self.weights = self.reference.weights.astype(self.dtype)
+        self.bias = self.reference.bias
+
+    def _predict(self, X):
+        if X.dtype != self.dtype:
+            return self.reference.predict(X)
+        # The bias is added in float64, which also widens the scores
+        return np.add(X @ self.weights, self.bias, dtype=np.float64)
+
+    def predict(self, X):
+        """Score an (n, n_features) matrix, in float32 if it is stored as such."""
+        if current_timer() is None:
+            return self._predict(X)
+        with timed("predict"):
+            return self._predict(X)
+
+
+class SklearnEngine:
+    """Fallback engine calling the pipeline's scaler and model directly."""
+
+    kind = "sklearn"
+
+    def __init__(self, pipeline):
+        self.scaler = pipeline["scaler"]
+        self.model = pipeline["model"]
+
+    def predict(self, X):
+        """Score an (n, n_features) matrix through sklearn."""
+        with timed("transform"):
+            X_scaled = self.scaler.transform(X)
+        with timed("predict"):
+            return self.model.predict(X_scaled)
+
+
+def fold_linear(scaler_mean, scaler_scale, coef, intercept):
+    """Fold standardization into linear coefficients, returning ``(weights, bias)``."""
+    coef = np.asarray(coef, dtype=np.float64)
+    intercept = np.asarray(intercept, dtype=np.float64)
+    if coef.ndim != 1 or intercept.size != 1:
+        raise ValueError("Only single-output linear models can be folded")
+
+    weights = coef / np.asarray(scaler_scale, dtype=np.float64)
+    bias = float(intercept.reshape(-1)[0]) - float(np.asarray(scaler_mean) @ weights)
+    return weights, bias
+
+
+def fold_linear_pipeline(pipeline):
+    """
+    Return ``(weights, bias)`` equivalent to ``model.predict(scaler.transform(X))``.
+
+    Raises ValueError if the pipeline is not a StandardScaler followed by a
+    single-output linear model.
+    """
+    if not hasattr(pipeline.get("model"), "intercept_"):
+        raise ValueError("Model does not expose coef_/intercept_")
+    return fold_linear(**linear_pipeline_arrays(pipeline))
+
+
+def engine_from_artifact(artifact):
+    """Build an engine directly from a binary artifact's arrays."""
+    if artifact.model_type == "tree_ensemble":
+        return TreeEnsembleEngine(artifact.arrays)
+    if artifact.model_type != "linear":
+        raise ValueError(f"No array engine for model type {artifact.model_type!r}")
+    arrays = artifact.arrays
+    return FusedLinearEngine(
+        *fold_linear(
+            arrays["scaler_mean"],
+            arrays["scaler_scale"],
+            arrays["coef"],
+            arrays["intercept"],
+        )
+    )
+
+
+def probe_matrix(pipeline, n_rows=N_PROBE_ROWS, seed=0):
+    """Generate synthetic rows around the scaler's training distribution."""
+    scaler = pipeline["scaler"]
+    n_features = scaler.n_features_in_
+    mean = np.zeros(n_features) if scaler.mean_ is None else scaler.mean_
+    scale = np.ones(n_features) if scaler.scale_ is None else scaler.scale_
+    return probe_rows(mean, scale, n_rows, seed)
+
+
+def probe_rows(mean, scale, n_rows=N_PROBE_ROWS, seed=0):
+    """Synthetic rows drawn around ``mean`` with per-feature ``scale``."""
+    rng = np.random.default_rng(seed)
+    return mean + scale * rng.standard_normal((n_rows, len(mean)))
+
+
+def max_deviation(engine, reference, X):
+    """Largest absolute difference between two engines on ``X``."""
+    return float(np.max(np.abs(engine.predict(X) - reference.predict(X))))
+
+
+def stored_deviation(engine, reference, X):
+    """Largest difference when ``engine`` scores ``X`` stored at its precision."""
+    stored = np.asarray(X, dtype=engine.dtype)
+    return float(np.max(np.abs(engine.predict(stored) - reference.predict(X))))
+
+
+def array_engine(pipeline):
+    """Fused linear or flattened tree engine for ``pipeline`` (ValueError otherwise)."""
+    if hasattr(pipeline.get("model"), "estimators_"):
+        return TreeEnsembleEngine.from_pipeline(pipeline)
+    return FusedLinearEngine.from_pipeline(pipeline)
+
+
+def build_engine(pipeline, mode="auto", tolerance=DEFAULT_TOLERANCE):
+    """
+    Build the fastest engine that reproduces the pipeline's predictions.
+
+    ``mode="sklearn"`` forces the fallback path. In ``"auto"`` mode an array
+    engine is only used if it matches sklearn within ``tolerance`` on a set
+    of probe rows.
+    """
+    reference = SklearnEngine(pipeline)
+    if mode == "sklearn":
+        return reference
+
+    try:
+        engine = array_engine(pipeline)
+        deviation = max_deviation(engine, reference, probe_matrix(pipeline))
+    except (ValueError, AttributeError) as e:
+        print(f"Using sklearn inference: {e}")
+        return reference
+
+    if deviation > tolerance:
+        print(
+            f"Using sklearn inference: {engine.kind} deviation "
+            f"{deviation:.3g} > {tolerance:.3g}"
+        )
+        return reference
+    return engine
+
+
+def parse_precision_spec(spec):
+    """
+    Parse ``"float64,v0.2:float32"`` into ``{None: "float64", "v0.2": "float32"}``.
+
+    A bare precision sets the default for every version; ``version:precision``
+    pairs override it.
+    """
+    choices = {None: "float64"}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        version, _, precision = part.rpartition(":")
+        if precision not in PRECISIONS:
+            raise ValueError(
+                f"Unknown precision {precision!r}; choose from {', '.join(PRECISIONS)}"
+            )
+        choices[version or None] = precision
+    return choices
+
+
+def precision_for(spec, version):
+    """Precision configured for ``version`` by a precision spec."""
+    choices = parse_precision_spec(spec)
+    return choices.get(version, choices[None])
+
+
+def select_precision(
+    engine, arrays, precision, X_reference=None, tolerance=PRECISION_TOLERANCE
+):
+    """
+    Swap a folded ``engine`` for a ``precision`` one if it is accurate enough.
+
+    ``arrays`` are the linear model arrays (``scaler_mean``/``scaler_scale``
+    place the probe rows). The candidate scores ``X_reference`` (probe rows
+    if None) stored at its precision; if the maximum deviation from
+    ``engine`` exceeds ``tolerance`` the float64 engine is kept.
+    """
+    if precision == "float64":
+        return engine
+    if not isinstance(engine, FusedLinearEngine):
+        print(f"Keeping {engine.kind} inference: {precision} needs a folded engine")
+        return engine
+
+    mean, scale = arrays["scaler_mean"], arrays["scaler_scale"]
+    candidate = ReducedPrecisionEngine(engine.weights, engine.bias, precision)
+    source = "reference rows"
+    if X_reference is None:
+        X_reference, source = probe_rows(mean, scale), "probe rows"
+    X_reference = np.asarray(X_reference, dtype=np.float64)
+    candidate.deviation = stored_deviation(candidate, engine, X_reference)
+    summary = f"max deviation {candidate.deviation:.3g} on {len(X_reference)} {source}"
+    if candidate.deviation > tolerance:
+        print(f"Refusing {precision} inference: {summary} > {tolerance:.3g}")
+        return engine
+    print(f"Using {precision} inference: {summary}")
+    return candidate
@@ -0,0 +1,453 @@
+"""
+Asynchronous bulk scoring jobs backed by SQLite and local worker processes.
+
+A job is an NDJSON or CSV file, either uploaded to ``POST /jobs`` or
+referenced by path under ``JOBS_DATA_ROOT``. It is recorded in
+``JOBS_DIR/jobs.db``. Worker processes claim queued jobs with an atomic
+update. A claimed job is read chunk by chunk and scored with the model
+version pinned at submission, through the same ``ChunkedScorer`` as
+``/predict/stream``. NDJSON results are appended to
+``JOBS_DIR/<id>/results.ndjson``.
+
+After every chunk the worker commits the input byte offset, the result file
+size and the row counts together. If a worker dies, or the service
+restarts, the job's heartbeat goes stale and another worker reclaims it. The
+new worker truncates the results to the last committed size and resumes at
+the committed offset. Rows are therefore neither lost nor duplicated. With
+``AUDIT_ENABLED=1`` each chunk is also written to the audit log before its
+checkpoint; a chunk scored again after a crash is audited again. There
+is no external broker: several API processes (or ``python -m src.jobs``)
+can share one store. Workers are opt-in (``JOBS_WORKERS``); under the
+``src.serve`` supervisor one pool is started by the supervisor itself.
+
+    python -m src.jobs --workers 4          # run workers without the API
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from src.audit import AUDIT_ENABLED, AuditLog
+from src.registry import load_version
+from src.streaming import DEFAULT_CHUNK_SIZE, ChunkedScorer, UnreadableLine, decode_line
+
+# Job database, uploaded inputs and results
+JOBS_DIR = Path(os.getenv("JOBS_DIR", "jobs"))
+
+# Worker processes started with the API, or once by the ``src.serve``
+# supervisor (0: run ``python -m src.jobs`` instead)
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "0"))
+
+# Rows scored per chunk; progress is committed after every chunk
+JOBS_CHUNK_SIZE = int(os.getenv("JOBS_CHUNK_SIZE", str(DEFAULT_CHUNK_SIZE)))
+
+# Directory that ``source`` dataset references must live under
+JOBS_DATA_ROOT = Path(os.getenv("JOBS_DATA_ROOT", "data"))
+
+# Seconds without a heartbeat after which a running job is reclaimed
+JOBS_STALE_SECONDS = float(os.getenv("JOBS_STALE_SECONDS", "30"))
+
+POLL_SECONDS = 0.5
+FINISHED = ("done", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    format TEXT NOT NULL,
+    model_version TEXT,
+    chunk_size INTEGER NOT NULL,
+    total_bytes INTEGER NOT NULL,
+    offset_bytes INTEGER NOT NULL DEFAULT 0,
+    result_bytes INTEGER NOT NULL DEFAULT 0,
+    rows_done INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    heartbeat REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    error TEXT
+)
+"""
+
+
+class JobNotFoundError(KeyError):
+    """Raised when a job ID is unknown."""
+
+
+class JobStore:
+    """SQLite table of jobs; safe to share between threads and processes."""
+
+    def __init__(self, root=JOBS_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.path = self.root / "jobs.db"
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(_SCHEMA)
+
+    def _connect(self):
+        """Per-thread connection (sqlite3 connections are not thread-safe)."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            self._local.db = db
+        return _Transaction(db)
+
+    def job_dir(self, job_id):
+        return self.root / job_id
+
+    def result_path(self, job_id):
+        return self.job_dir(job_id) / "results.ndjson"
+
+    def create(self, input_path, fmt, model_version, chunk_size, job_id=None):
+        """Queue a job for ``input_path`` and return its record."""
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, status, input_path, format, model_version,"
+                " chunk_size, total_bytes, created, updated)"
+                " VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    str(input_path),
+                    fmt,
+                    model_version,
+                    chunk_size,
+                    Path(input_path).stat().st_size,
+                    now,
+                    now,
+                ),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id):
+        """The job's record as a dict."""
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFoundError(job_id)
+        return dict(row)
+
+    def list(self, limit=50):
+        """Most recently created jobs first."""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def claim(self, worker, stale_after=JOBS_STALE_SECONDS):
+        """
+        Atomically take the oldest queued job, or a running one whose worker
+        stopped sending heartbeats. Returns the record or None.
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT id FROM jobs WHERE status = 'queued'"
+                " OR (status = 'running' AND heartbeat < ?)"
+                " ORDER BY created LIMIT 1",
+                (now - stale_after,),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, heartbeat = ?,"
+                " updated = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker, now, now, row["id"]),
+            )
+        return self.get(row["id"])
+
+    def checkpoint(self, job_id, worker, offset, result_bytes, rows_done, errors):
+        """
+        Commit progress after a chunk. Returns False if the job was cancelled
+        or reclaimed by another worker, which must then stop.
+        """
+        now = time.time()
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET offset_bytes = ?, result_bytes = ?, rows_done = ?,"
+                " errors = ?, heartbeat = ?, updated = ?"
+                " WHERE id = ? AND worker = ? AND status = 'running'",
+                (offset, result_bytes, rows_done, errors, now, now, job_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def finish(self, job_id, worker, status, error=None):
+        """
+        Mark a job done or failed (only by the worker that holds it). Returns
+        False if it was cancelled or reclaimed meanwhile and was left as is.
+        """
+        now = time.time()
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated = ?, heartbeat = NULL"
+                " WHERE id = ? AND worker = ? AND status = 'running'",
+                (status, error, now, job_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns its record."""
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'cancelled', updated = ?"
+                " WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id),
+            )
+        return self.get(job_id)
+
+
+class _Transaction:
+    """Context manager wrapping a connection in BEGIN/COMMIT (or ROLLBACK)."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.db.in_transaction:
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def job_status(job):
+    """Public view of a job record for the API."""
+    total = job["total_bytes"]
+    progress = job["offset_bytes"] / total if total else 1.0
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "format": job["format"],
+        "model_version": job["model_version"],
+        "chunk_size": job["chunk_size"],
+        "rows_done": job["rows_done"],
+        "errors": job["errors"],
+        "progress": 1.0 if job["status"] == "done" else round(progress, 4),
+        "attempts": job["attempts"],
+        "created": job["created"],
+        "updated": job["updated"],
+        "error": job["error"],
+    }
+
+
+def _load_model(version, model_root):
+    """Load ``version`` from ``model_root`` (None means the default version)."""
+    return load_version(
+        model_root,
+        version,
+        fmt=os.getenv("MODEL_FORMAT", "auto"),
+        engine_mode=os.getenv("INFERENCE_ENGINE", "auto"),
+        precision=os.getenv("INFERENCE_PRECISION", "float64"),
+    )
+
+
+def _read_chunks(f, chunk_size):
+    """Yield ``(lines, end_offset)`` for chunks of ``chunk_size`` non-empty lines."""
+    lines = []
+    while True:
+        raw = f.readline()
+        if not raw:
+            break
+        line = decode_line(raw)
+        if not isinstance(line, UnreadableLine):
+            line = line.rstrip("\r\n")
+        if line:
+            lines.append(line)
+        if len(lines) >= chunk_size:
+            yield lines, f.tell()
+            lines = []
+    if lines:
+        yield lines, f.tell()
+
+
+def _open_input(job):
+    """Open the job's input at its committed offset; returns ``(file, header)``."""
+    f = open(job["input_path"], "rb")
+    header = None
+    if job["format"] == "csv":
+        # Undecodable header bytes only cost the columns they fall in
+        header = f.readline().decode("utf-8", errors="replace").rstrip("\r\n")
+    if job["offset_bytes"]:
+        f.seek(job["offset_bytes"])
+    return f, header
+
+
+def _audited_predict(model, audit_log):
+    """``model.engine.predict``, also writing each scored chunk to ``audit_log``."""
+    if audit_log is None:
+        return model.engine.predict
+
+    def predict(X):
+        predictions = model.engine.predict(X)
+        # Written before the chunk's checkpoint, so a resumed job misses no rows
+        audit_log.record_sync(model.version, X, predictions)
+        return predictions
+
+    return predict
+
+
+def process_job(store, job, worker, model_root=Path("models"), audit_log=None):
+    """
+    Score ``job`` from its last checkpoint; returns the final status.
+
+    With an ``audit_log``, every scored chunk is on disk in the audit log
+    before its progress is committed.
+    """
+    model = _load_model(job["model_version"], model_root)
+    scorer = ChunkedScorer(
+        _audited_predict(model, audit_log),
+        fmt=job["format"],
+        chunk_size=job["chunk_size"],
+    )
+    scorer.n_rows, scorer.n_errors = job["rows_done"], job["errors"]
+
+    result_path = store.result_path(job["id"])
+    result_path.parent.mkdir(parents=True, exist_ok=True)
+    f, header = _open_input(job)
+    with f, open(result_path, "ab") as out:
+        # Drop output written after the last checkpoint of a dead worker
+        out.truncate(job["result_bytes"])
+        for lines, offset in _read_chunks(f, job["chunk_size"]):
+            if header is not None:
+                # The scorer reads the CSV header from its first chunk
+                lines = [header] + lines
+                header = None
+            out.write(scorer.score_chunk(lines))
+            out.flush()
+            os.fsync(out.fileno())
+            if not store.checkpoint(
+                job["id"], worker, offset, out.tell(), scorer.n_rows, scorer.n_errors
+            ):
+                return store.get(job["id"])["status"]
+    if not store.finish(job["id"], worker, "done"):
+        # Cancelled after the last checkpoint; the cancellation stands
+        return store.get(job["id"])["status"]
+    return "done"
+
+
+def run_once(store, worker, model_root=Path("models"), audit_log=None):
+    """Claim and process one job; returns its ID, or None if none was waiting."""
+    job = store.claim(worker)
+    if job is None:
+        return None
+    try:
+        process_job(store, job, worker, model_root, audit_log)
+    except Exception as e:
+        print(f"Job {job['id']} failed: {e}")
+        store.finish(job["id"], worker, "failed", error=str(e))
+    return job["id"]
+
+
+def _watch(store, worker, parent, stop):
+    """Heartbeat this worker's jobs; exit at once if the API process died."""
+    last_beat = time.monotonic()
+    while not stop.wait(1.0):
+        if os.getppid() != parent:
+            # The next worker resumes the job from its last checkpoint
+            os._exit(1)
+        if time.monotonic() - last_beat >= JOBS_STALE_SECONDS / 3:
+            last_beat = time.monotonic()
+            with store._connect() as db:
+                db.execute(
+                    "UPDATE jobs SET heartbeat = ? WHERE worker = ? AND status = 'running'",
+                    (time.time(), worker),
+                )
+
+
+def run_worker(root, model_root, stop):
+    """Worker process: claim and score jobs until ``stop`` is set."""
+    store = JobStore(root)
+    worker = f"{os.uname().nodename}:{os.getpid()}"
+    # Each worker process writes its own audit files, as API workers do
+    audit_log = AuditLog() if AUDIT_ENABLED else None
+    watch_stop = threading.Event()
+    threading.Thread(
+        target=_watch, args=(store, worker, os.getppid(), watch_stop), daemon=True
+    ).start()
+    try:
+        while not stop.is_set():
+            if run_once(store, worker, model_root, audit_log) is None:
+                stop.wait(POLL_SECONDS)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watch_stop.set()
+        if audit_log is not None:
+            audit_log.close()
+
+
+class JobWorkerPool:
+    """Fixed-size pool of worker processes sharing one job store."""
+
+    def __init__(self, n_workers=JOBS_WORKERS, root=JOBS_DIR, model_root="models"):
+        self.n_workers = n_workers
+        self.root = Path(root)
+        self.model_root = Path(model_root)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._stop = self._ctx.Event()
+        self.processes = []
+
+    def start(self):
+        for i in range(self.n_workers):
+            process = self._ctx.Process(
+                target=run_worker,
+                args=(self.root, self.model_root, self._stop),
+                name=f"job-worker-{i}",
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+        return self
+
+    def stop(self, timeout=10.0):
+        """Let workers finish their current chunk, then exit."""
+        self._stop.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+
+
+def main(argv=None):
+    """Run job workers without the API."""
+    parser = argparse.ArgumentParser(description="Run bulk scoring job workers")
+    parser.add_argument("--workers", type=int, default=max(JOBS_WORKERS, 1))
+    parser.add_argument("--jobs-dir", default=str(JOBS_DIR))
+    parser.add_argument("--models", default="models")
+    parser.add_argument("--list", action="store_true", help="List jobs and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for job in JobStore(args.jobs_dir).list():
+            print(json.dumps(job_status(job)))
+        return
+
+    pool = JobWorkerPool(args.workers, args.jobs_dir, args.models).start()
+    print(f"Running {args.workers} job workers on {args.jobs_dir}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
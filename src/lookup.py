@@ -0,0 +1,181 @@
+"""
+Per-feature score lookup tables for scaler + linear models.
+
+A linear model's score is ``intercept + sum_j coef_j * (x_j - mean_j) / scale_j``.
+Each term depends on one feature only, so for a feature with few distinct
+values (``sex`` has two) it can be precomputed for every value seen in
+training. ``build_lookup_tables`` stores those terms as sorted keys and
+values. ``LookupEngine`` scores tabulated features with a binary search and
+a gather, and the remaining features with one dot product. A value missing
+from a table falls back to its linear term, so scores never depend on
+whether a value was tabulated.
+
+Whether tables beat the fused dot product depends on the hardware and the
+number of tabulated features. Training times both once with
+``tables_are_faster`` and saves the verdict with the tables as
+``lookup_preferred``. ``choose_engine`` serves what the artifact records, so
+loading does no timing and every worker serves the same engine.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from src.inference import FusedLinearEngine, fold_linear
+from src.telemetry import current_timer, timed
+
+# Features with at most this many distinct training values get a lookup table
+LOOKUP_MAX_VALUES = int(os.getenv("LOOKUP_MAX_VALUES", "64"))
+
+# "auto" serves lookup tables only if training measured them faster than the
+# dot product; "table" always serves them and "dot" never does
+LOOKUP_SCORING = os.getenv("LOOKUP_SCORING", "auto")
+
+# Rows (tiled from the training rows) and repeats used to time each engine
+LOOKUP_PROBE_ROWS = 1024
+LOOKUP_PROBE_REPEATS = 20
+
+LOOKUP_ARRAYS = ("lookup_features", "lookup_offsets", "lookup_keys", "lookup_values")
+
+
+def build_lookup_tables(linear_arrays, X_train, max_values=LOOKUP_MAX_VALUES):
+    """
+    Lookup arrays for the low-cardinality features of ``X_train``.
+
+    ``linear_arrays`` holds the scaler/model arrays of
+    ``src.artifact.linear_pipeline_arrays``. Returns a dict of the
+    ``LOOKUP_ARRAYS``, with keys and values concatenated per feature and
+    delimited by ``lookup_offsets``.
+    """
+    X_train = np.asarray(X_train, dtype=np.float64)
+    mean = np.asarray(linear_arrays["scaler_mean"], dtype=np.float64)
+    scale = np.asarray(linear_arrays["scaler_scale"], dtype=np.float64)
+    coef = np.asarray(linear_arrays["coef"], dtype=np.float64).reshape(-1)
+
+    features, keys, values, offsets = [], [], [], [0]
+    for j in range(X_train.shape[1]):
+        distinct = np.unique(X_train[:, j])
+        if distinct.size > max_values:
+            continue
+        features.append(j)
+        keys.append(distinct)
+        values.append(coef[j] * (distinct - mean[j]) / scale[j])
+        offsets.append(offsets[-1] + distinct.size)
+    return {
+        "lookup_features": np.asarray(features, dtype=np.int32),
+        "lookup_offsets": np.asarray(offsets, dtype=np.int64),
+        "lookup_keys": np.concatenate(keys) if keys else np.empty(0),
+        "lookup_values": np.concatenate(values) if values else np.empty(0),
+    }
+
+
+class LookupEngine:
+    """Linear scores from per-feature lookup tables plus a residual dot product."""
+
+    kind = "lookup-table"
+
+    def __init__(self, arrays):
+        weights, bias = fold_linear(
+            arrays["scaler_mean"],
+            arrays["scaler_scale"],
+            arrays["coef"],
+            arrays["intercept"],
+        )
+        mean = np.asarray(arrays["scaler_mean"], dtype=np.float64)
+        offsets = np.asarray(arrays["lookup_offsets"])
+        keys = np.asarray(arrays["lookup_keys"], dtype=np.float64)
+        values = np.asarray(arrays["lookup_values"], dtype=np.float64)
+
+        self.weights = np.array(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.tables = []
+        for n, j in enumerate(np.asarray(arrays["lookup_features"]).tolist()):
+            start, stop = int(offsets[n]), int(offsets[n + 1])
+            # Tabulated terms are centred, so their mean term leaves the bias
+            self.bias += self.weights[j] * mean[j]
+            self.tables.append(
+                (j, keys[start:stop], values[start:stop], self.weights[j], mean[j])
+            )
+            self.weights[j] = 0.0
+
+    @property
+    def n_tables(self):
+        return len(self.tables)
+
+    def _predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        out = X @ self.weights + self.bias
+        for j, keys, values, weight, mean in self.tables:
+            column = X[:, j]
+            index = np.searchsorted(keys, column)
+            np.minimum(index, keys.size - 1, out=index)
+            hit = keys[index] == column
+            out += np.where(hit, values[index], (column - mean) * weight)
+        return out
+
+    def predict(self, X):
+        """Score an (n, n_features) matrix."""
+        if current_timer() is None:
+            return self._predict(X)
+        with timed("predict"):
+            return self._predict(X)
+
+
+def has_lookup_tables(arrays):
+    """Whether ``arrays`` holds a non-empty set of lookup tables."""
+    return all(name in arrays for name in LOOKUP_ARRAYS) and len(
+        arrays["lookup_features"]
+    )
+
+
+def _best_time(engine, X, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        engine.predict(X)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def tables_are_faster(arrays, X):
+    """
+    Time lookup-table and dot-product scoring of rows tiled from ``X``.
+
+    Returns whether the tables were faster. Training calls this once and
+    stores the result, so the timing never runs at load.
+    """
+    table = LookupEngine(arrays)
+    dot = FusedLinearEngine(
+        *fold_linear(
+            arrays["scaler_mean"],
+            arrays["scaler_scale"],
+            arrays["coef"],
+            arrays["intercept"],
+        )
+    )
+    X = np.resize(np.asarray(X, dtype=np.float64), (LOOKUP_PROBE_ROWS, X.shape[1]))
+    dot_time = _best_time(dot, X, LOOKUP_PROBE_REPEATS)
+    table_time = _best_time(table, X, LOOKUP_PROBE_REPEATS)
+    scale = 1e6 / LOOKUP_PROBE_ROWS
+    print(
+        f"Lookup timing: {table_time * scale:.3f} vs {dot_time * scale:.3f} us/row "
+        f"for {table.n_tables} tables vs dot product"
+    )
+    return table_time < dot_time
+
+
+def choose_engine(engine, arrays, mode=LOOKUP_SCORING):
+    """
+    ``engine`` or a LookupEngine over ``arrays``, whichever ``mode`` selects.
+
+    In ``"auto"`` mode the tables are served only if the artifact's
+    ``lookup_preferred`` flag (set at training) is on.
+    """
+    if mode == "dot" or engine.kind != "fused-linear" or not has_lookup_tables(arrays):
+        return engine
+    if mode == "auto" and not np.asarray(arrays.get("lookup_preferred", 0)).any():
+        return engine
+    table = LookupEngine(arrays)
+    print(f"Using lookup-table inference ({table.n_tables} tabulated features)")
+    return table
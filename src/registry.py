@@ -0,0 +1,473 @@
+"""
+Registry of loaded model versions with atomic hot reload.
+
+Artifacts are discovered under the model directory:
+
+    models/model.bin|model.pkl + metrics.json   default version
+    models/<version>/model.bin|model.pkl        additional versions
+
+Requests lease a version for as long as they use it. Reloading swaps the new
+model in atomically; the replaced one is kept draining until its last lease
+is returned and is then released.
+"""
+
+import json
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.artifact import ArtifactError, linear_pipeline_arrays, load_artifact
+from src.drift import DriftReference
+from src.explain import LinearExplainer
+from src.inference import (
+    build_engine,
+    engine_from_artifact,
+    precision_for,
+    select_precision,
+)
+from src.lookup import choose_engine
+from src.triage import CohortIndex
+
+PICKLE_NAME = "model.pkl"
+BINARY_NAME = "model.bin"
+METRICS_NAME = "metrics.json"
+
+
+class ModelNotFoundError(KeyError):
+    """Raised when a requested model version is not loaded."""
+
+
+class LoadedModel:
+    """One servable model version and its in-flight lease count."""
+
+    def __init__(
+        self,
+        version,
+        engine,
+        metadata,
+        pipeline=None,
+        source=None,
+        signature=None,
+        cohort=None,
+        explainer=None,
+        drift_reference=None,
+        skipped=None,
+    ):
+        self.version = version
+        self.engine = engine
+        self.metadata = metadata
+        self.pipeline = pipeline
+        self.source = source
+        self.signature = signature
+        self.cohort = cohort
+        self.explainer = explainer
+        self.drift_reference = drift_reference
+        # Signature of the preferred artifact that failed to load, if any
+        self.skipped = skipped
+        self.loaded_at = time.time()
+        self.refs = 0
+
+    def close(self):
+        """Drop references to the engine, pipeline and any mapped artifact."""
+        self.engine = None
+        self.pipeline = None
+
+    def info(self):
+        """Summary used by the listing endpoint."""
+        return {
+            "version": self.version,
+            "engine": self.engine.kind if self.engine is not None else None,
+            "precision_deviation": getattr(self.engine, "deviation", None),
+            "cohort_size": len(self.cohort) if self.cohort is not None else 0,
+            "source": str(self.source),
+            "loaded_at": self.loaded_at,
+            "in_flight": self.refs,
+        }
+
+
+def _signature(path):
+    """Identify an artifact file by path, size and modification time."""
+    stat = path.stat()
+    return (str(path), stat.st_size, stat.st_mtime_ns)
+
+
+def _unchanged(model, path):
+    """
+    Whether loading ``path`` would give back ``model`` unchanged.
+
+    A model that fell back from ``path`` to another artifact is unchanged
+    while both the file it was loaded from and the skipped one are.
+    """
+    if model.source is None:
+        return False
+    try:
+        if model.signature != _signature(Path(model.source)):
+            return False
+        if Path(model.source) == path:
+            return True
+        return model.skipped == _signature(path)
+    except OSError:
+        return False
+
+
+def _artifact_path(directory, fmt, engine_mode):
+    """Pick the artifact file to serve from ``directory``, or None."""
+    binary, pickled = directory / BINARY_NAME, directory / PICKLE_NAME
+    if fmt == "pickle" or engine_mode == "sklearn":
+        candidates = [pickled]
+    elif fmt == "binary":
+        candidates = [binary]
+    else:
+        candidates = [binary, pickled]
+    return next((p for p in candidates if p.exists()), None)
+
+
+def _read_metadata(directory):
+    """Read metrics.json from ``directory`` if present."""
+    path = directory / METRICS_NAME
+    if not path.exists():
+        return {"version": "unknown"}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _cohort_index(scores):
+    """CohortIndex over saved cohort scores, or None for older artifacts."""
+    return CohortIndex(scores) if scores is not None else None
+
+
+def _pipeline_drift_reference(pipeline):
+    """DriftReference from a pickled pipeline's scaler, or None without one."""
+    scaler = pipeline.get("scaler")
+    if getattr(scaler, "scale_", None) is None:
+        return None
+    return DriftReference.from_arrays(scaler.mean_, scaler.scale_, pipeline)
+
+
+def _pipeline_explainer(pipeline):
+    """LinearExplainer for a pickled pipeline, or None if it is not linear."""
+    features = getattr(pipeline.get("scaler"), "feature_names_in_", None)
+    try:
+        return LinearExplainer.from_pipeline(
+            pipeline, None if features is None else list(features)
+        )
+    except (ValueError, AttributeError):
+        return None
+
+
+def _pipeline_precision(engine, pipeline, precision):
+    """Apply ``precision`` to a pickled pipeline's engine (see select_precision)."""
+    if precision == "float64":
+        return engine
+    try:
+        arrays = linear_pipeline_arrays(pipeline)
+    except ArtifactError as e:
+        print(f"Keeping {engine.kind} inference: {e}")
+        return engine
+    return select_precision(engine, arrays, precision, pipeline.get("reference_X"))
+
+
+def _pipeline_lookup(engine, pipeline):
+    """Swap in lookup-table scoring for a pickled pipeline (see choose_engine)."""
+    tables = pipeline.get("lookup_tables")
+    if tables is None or engine.kind != "fused-linear":
+        return engine
+    arrays = dict(linear_pipeline_arrays(pipeline), **tables)
+    return choose_engine(engine, arrays)
+
+
+def load_model_dir(
+    directory, fmt="auto", engine_mode="auto", version=None, precision="float64"
+):
+    """
+    Load the model stored in ``directory``.
+
+    ``fmt="auto"`` prefers the binary artifact and falls back to the pickle
+    if the binary one is missing or cannot be loaded. ``precision`` is a
+    precision spec (see ``src.inference.parse_precision_spec``) resolved for
+    this version.
+    """
+    directory = Path(directory)
+    path = _artifact_path(directory, fmt, engine_mode)
+    if path is None:
+        raise FileNotFoundError(f"Model not found in {directory}")
+
+    metadata = _read_metadata(directory)
+    version = version or metadata.get("version", "unknown")
+    precision = precision_for(precision, version)
+    skipped = None
+
+    if path.name == BINARY_NAME:
+        try:
+            artifact = load_artifact(path)
+            arrays = artifact.arrays
+            engine = select_precision(
+                engine_from_artifact(artifact),
+                arrays,
+                precision,
+                arrays.get("reference_X"),
+            )
+            engine = choose_engine(engine, arrays)
+            cohort = _cohort_index(arrays.get("cohort_scores"))
+            explainer = None
+            if artifact.model_type == "linear":
+                explainer = LinearExplainer(
+                    arrays["scaler_mean"],
+                    arrays["scaler_scale"],
+                    arrays["coef"],
+                    arrays["intercept"],
+                    features=artifact.feature_names,
+                )
+            return LoadedModel(
+                version,
+                engine,
+                metadata,
+                None,
+                path,
+                _signature(path),
+                cohort,
+                explainer,
+                DriftReference.from_arrays(
+                    arrays["scaler_mean"], arrays["scaler_scale"], arrays
+                ),
+            )
+        except (ArtifactError, ValueError) as e:
+            if fmt == "binary" or not (directory / PICKLE_NAME).exists():
+                raise
+            print(
+                f"Binary artifact unavailable ({e}); loading {directory / PICKLE_NAME}"
+            )
+            skipped = _signature(path)
+            path = directory / PICKLE_NAME
+
+    with open(path, "rb") as f:
+        pipeline = pickle.load(f)
+    engine = _pipeline_precision(
+        build_engine(pipeline, mode=engine_mode), pipeline, precision
+    )
+    engine = _pipeline_lookup(engine, pipeline)
+    cohort = _cohort_index(pipeline.get("cohort_scores"))
+    return LoadedModel(
+        version,
+        engine,
+        metadata,
+        pipeline,
+        path,
+        _signature(path),
+        cohort,
+        _pipeline_explainer(pipeline),
+        _pipeline_drift_reference(pipeline),
+        skipped,
+    )
+
+
+def discover_model_dirs(root):
+    """Return ``{version_or_None: directory}``; None marks the default directory."""
+    root = Path(root)
+    found = {}
+    if _artifact_path(root, "auto", "auto") is not None:
+        found[None] = root
+    if root.is_dir():
+        for child in sorted(root.iterdir()):
+            if child.is_dir() and _artifact_path(child, "auto", "auto") is not None:
+                found[child.name] = child
+    return found
+
+
+def load_version(root, version=None, **options):
+    """
+    Load ``version`` from a model root (None means the default version).
+
+    ``options`` are passed to ``load_model_dir``. Raises FileNotFoundError
+    if the version is not there.
+    """
+    dirs = discover_model_dirs(root)
+    directory = dirs.get(version) or dirs.get(None)
+    if directory is None:
+        raise FileNotFoundError(f"Model version {version!r} not found")
+    model = load_model_dir(directory, **options)
+    if version is not None and model.version != version:
+        model.close()
+        raise FileNotFoundError(f"Model version {version!r} not found")
+    return model
+
+
+class ModelRegistry:
+    """Thread-safe map of version -> LoadedModel with lease-based draining."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._models = {}
+        self._draining = []
+        self._listeners = []
+        self.default_version = None
+
+    def add_listener(self, callback):
+        """Call ``callback(version)`` whenever a version is swapped or removed."""
+        self._listeners.append(callback)
+
+    def _notify(self, version):
+        for callback in self._listeners:
+            callback(version)
+
+    def register(self, model, default=False):
+        """Atomically make ``model`` the live instance of its version."""
+        with self._lock:
+            old = self._models.get(model.version)
+            self._models[model.version] = model
+            if default or self.default_version is None:
+                self.default_version = model.version
+            if old is not None and old is not model:
+                self._retire(old)
+        self._notify(model.version)
+
+    def unregister(self, version):
+        """Stop serving ``version``; in-flight requests finish on it."""
+        with self._lock:
+            old = self._models.pop(version, None)
+            if old is not None:
+                self._retire(old)
+            if self.default_version == version:
+                self.default_version = next(iter(self._models), None)
+        self._notify(version)
+
+    def _retire(self, model):
+        """Release ``model`` now if unused, otherwise once its leases drain."""
+        if model.refs == 0:
+            self._release(model)
+        else:
+            self._draining.append(model)
+
+    def _release(self, model):
+        model.close()
+        print(f"Released model {model.version} ({model.source})")
+
+    def acquire(self, version=None):
+        """Lease a model version (the default one if ``version`` is None)."""
+        with self._lock:
+            key = version or self.default_version
+            model = self._models.get(key)
+            if model is None:
+                raise ModelNotFoundError(key)
+            model.refs += 1
+            return model
+
+    def release(self, model):
+        """Return a lease obtained from ``acquire``."""
+        with self._lock:
+            model.refs -= 1
+            if model.refs == 0 and model in self._draining:
+                self._draining.remove(model)
+                self._release(model)
+
+    @contextmanager
+    def lease(self, version=None):
+        """Context manager around ``acquire``/``release``."""
+        model = self.acquire(version)
+        try:
+            yield model
+        finally:
+            self.release(model)
+
+    def get(self, version=None):
+        """Return the live model for ``version`` without leasing it."""
+        with self._lock:
+            key = version or self.default_version
+            if key not in self._models:
+                raise ModelNotFoundError(key)
+            return self._models[key]
+
+    def versions(self):
+        """Currently served versions."""
+        with self._lock:
+            return list(self._models)
+
+    def info(self):
+        """Describe served and draining models."""
+        with self._lock:
+            return {
+                "default_version": self.default_version,
+                "models": [m.info() for m in self._models.values()],
+                "draining": [m.info() for m in self._draining],
+            }
+
+    def refresh(
+        self,
+        root,
+        fmt="auto",
+        engine_mode="auto",
+        default_version=None,
+        precision="float64",
+    ):
+        """
+        Load new or changed artifacts under ``root`` and drop removed ones.
+
+        Returns the list of versions that were (re)loaded. A version whose
+        artifact fails to load keeps serving its previous instance.
+        """
+        with self._refresh_lock:
+            return self._refresh(root, fmt, engine_mode, default_version, precision)
+
+    def _refresh(self, root, fmt, engine_mode, default_version, precision):
+        dirs = discover_model_dirs(root)
+        root_version = None
+        if None in dirs:
+            root_version = _read_metadata(dirs[None]).get("version", "unknown")
+
+        reloaded, seen = [], set()
+        for name, directory in dirs.items():
+            if name is not None and name == root_version:
+                # The default directory already serves this version
+                continue
+            version = name or root_version
+            if self._refresh_one(
+                version, directory, fmt, engine_mode, precision, name is None
+            ):
+                reloaded.append(version)
+            if version in self._models:
+                seen.add(version)
+
+        for version in set(self.versions()) - seen:
+            self.unregister(version)
+        if default_version and default_version in seen:
+            self.default_version = default_version
+        return reloaded
+
+    def _refresh_one(self, version, directory, fmt, engine_mode, precision, default):
+        """Reload one directory if its artifact changed; return True if reloaded."""
+        path = _artifact_path(directory, fmt, engine_mode)
+        current = self._models.get(version)
+        if current is not None and path is not None and _unchanged(current, path):
+            return False
+        try:
+            model = load_model_dir(directory, fmt, engine_mode, version, precision)
+        except Exception as e:
+            print(f"Failed to load model {version} from {directory}: {e}")
+            return False
+        self.register(model, default=default)
+        return True
+
+
+class ModelWatcher(threading.Thread):
+    """Background thread polling the model directory for new artifacts."""
+
+    def __init__(self, registry, root, interval, **refresh_kwargs):
+        super().__init__(name="model-watcher", daemon=True)
+        self.registry = registry
+        self.root = root
+        self.interval = interval
+        self.refresh_kwargs = refresh_kwargs
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            reloaded = self.registry.refresh(self.root, **self.refresh_kwargs)
+            if reloaded:
+                print(f"Reloaded model versions: {', '.join(reloaded)}")
+
+    def stop(self):
+        """Stop polling."""
+        self._stop_event.set()
@@ -0,0 +1,229 @@
+"""
+Cross-validated hyperparameter search over model families.
+
+Linear families are scored along a whole regularization path per fold:
+Ridge in closed form from a single SVD, Lasso and ElasticNet with sklearn's
+warm-started coordinate descent paths. Scanning hundreds of alphas therefore
+costs about as much as a few fits. Fold x family tasks (and, optionally, tree
+ensemble configurations) run in a process pool.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import ElasticNet, Lasso, Ridge, enet_path, lasso_path
+from sklearn.model_selection import KFold
+from sklearn.preprocessing import StandardScaler
+
+DEFAULT_FOLDS = 5
+DEFAULT_N_ALPHAS = 200
+L1_RATIOS = (0.2, 0.5, 0.8)
+
+# Ridge alphas are searched on a fixed log grid; Lasso/ElasticNet grids start
+# at the smallest alpha that zeroes every coefficient and span this ratio
+RIDGE_ALPHA_RANGE = (1e-3, 1e4)
+L1_ALPHA_RATIO = 1e-4
+
+TREE_GRIDS = {
+    "random_forest": [
+        {"n_estimators": n, "max_depth": d, "min_samples_leaf": 5}
+        for n in (100, 300)
+        for d in (4, 8, None)
+    ],
+    "gradient_boosting": [
+        {"n_estimators": n, "learning_rate": lr, "max_depth": d}
+        for n in (100, 300)
+        for lr in (0.05, 0.1)
+        for d in (2, 3)
+    ],
+}
+
+ESTIMATORS = {
+    "ridge": Ridge,
+    "lasso": Lasso,
+    "elasticnet": ElasticNet,
+    "random_forest": RandomForestRegressor,
+    "gradient_boosting": GradientBoostingRegressor,
+}
+
+
+def standardize(X_train, X_val):
+    """Scale both matrices with the training mean and std (as StandardScaler)."""
+    mean = X_train.mean(axis=0)
+    scale = X_train.std(axis=0)
+    scale[scale == 0] = 1.0
+    return (X_train - mean) / scale, (X_val - mean) / scale
+
+
+def ridge_path_mse(X_train, y_train, X_val, y_val, alphas):
+    """
+    Validation MSE of Ridge for every alpha, from one SVD of the training fold.
+
+    With centered data ``X = U S V^T`` the Ridge solution is
+    ``V diag(s / (s^2 + alpha)) U^T y``, so each extra alpha is a rescale.
+    """
+    x_mean, y_mean = X_train.mean(axis=0), y_train.mean()
+    U, s, Vt = np.linalg.svd(X_train - x_mean, full_matrices=False)
+    Uty = U.T @ (y_train - y_mean)
+    shrink = s[:, None] / (s[:, None] ** 2 + alphas[None, :])
+    coefs = Vt.T @ (shrink * Uty[:, None])
+    predictions = (X_val - x_mean) @ coefs + y_mean
+    return ((predictions - y_val[:, None]) ** 2).mean(axis=0)
+
+
+def l1_path_mse(X_train, y_train, X_val, y_val, alphas, l1_ratio=1.0):
+    """Validation MSE along a warm-started Lasso/ElasticNet path."""
+    x_mean, y_mean = X_train.mean(axis=0), y_train.mean()
+    Xc, yc = X_train - x_mean, y_train - y_mean
+    if l1_ratio == 1.0:
+        path_alphas, coefs, _ = lasso_path(Xc, yc, alphas=alphas)
+    else:
+        path_alphas, coefs, _ = enet_path(Xc, yc, l1_ratio=l1_ratio, alphas=alphas)
+    predictions = (X_val - x_mean) @ coefs + y_mean
+    mse = ((predictions - y_val[:, None]) ** 2).mean(axis=0)
+    # Paths are computed from the largest alpha down; report in grid order
+    order = {a: i for i, a in enumerate(path_alphas)}
+    return mse[[order[a] for a in alphas]]
+
+
+def alpha_grids(X, y, n_alphas=DEFAULT_N_ALPHAS):
+    """Alpha grids per linear family (descending), shared by all folds."""
+    Xs, _ = standardize(X, X)
+    correlation = np.abs(Xs.T @ (y - y.mean())).max() / len(y)
+    grids = {"ridge": np.geomspace(*RIDGE_ALPHA_RANGE[::-1], n_alphas)}
+    for l1_ratio in (1.0,) + L1_RATIOS:
+        top = correlation / l1_ratio
+        grids[l1_ratio] = np.geomspace(top, top * L1_ALPHA_RATIO, n_alphas)
+    return grids
+
+
+def _fold_task(task):
+    """Score one (family, fold) task; returns ``[(family, params, mse), ...]``."""
+    family, options, X_train, y_train, X_val, y_val = task
+    X_train, X_val = standardize(X_train, X_val)
+
+    if family == "ridge":
+        alphas = options["alphas"]
+        mse = ridge_path_mse(X_train, y_train, X_val, y_val, alphas)
+        return [("ridge", {"alpha": float(a)}, m) for a, m in zip(alphas, mse)]
+
+    if family in ("lasso", "elasticnet"):
+        alphas, l1_ratio = options["alphas"], options["l1_ratio"]
+        mse = l1_path_mse(X_train, y_train, X_val, y_val, alphas, l1_ratio)
+        params = [{"alpha": float(a)} for a in alphas]
+        if family == "elasticnet":
+            params = [dict(p, l1_ratio=l1_ratio) for p in params]
+        return [(family, p, m) for p, m in zip(params, mse)]
+
+    model = make_estimator(family, options["params"], options["seed"])
+    model.fit(X_train, y_train)
+    mse = float(np.mean((model.predict(X_val) - y_val) ** 2))
+    return [(family, options["params"], mse)]
+
+
+def build_tasks(X, y, folds, n_alphas, include_trees, seed):
+    """One task per (fold, family/path or tree configuration)."""
+    grids = alpha_grids(X, y, n_alphas)
+    families = [("ridge", {"alphas": grids["ridge"]})]
+    families.append(("lasso", {"alphas": grids[1.0], "l1_ratio": 1.0}))
+    families += [("elasticnet", {"alphas": grids[r], "l1_ratio": r}) for r in L1_RATIOS]
+    if include_trees:
+        families += [
+            (family, {"params": params, "seed": seed})
+            for family, grid in TREE_GRIDS.items()
+            for params in grid
+        ]
+
+    splitter = KFold(n_splits=folds, shuffle=True, random_state=seed)
+    return [
+        (family, options, X[train], y[train], X[val], y[val])
+        for train, val in splitter.split(X)
+        for family, options in families
+    ]
+
+
+def _run_tasks(tasks, workers):
+    """Run tasks in a process pool (in-process when ``workers`` is 1)."""
+    if workers == 1:
+        return [_fold_task(t) for t in tasks]
+    chunksize = max(1, len(tasks) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_fold_task, tasks, chunksize=chunksize))
+
+
+def _leaderboard(task_results, folds):
+    """Mean CV RMSE per candidate, best first."""
+    totals = {}
+    for results in task_results:
+        for family, params, mse in results:
+            key = (family, tuple(sorted(params.items())))
+            entry = totals.setdefault(key, [0.0, 0])
+            entry[0] += float(mse)
+            entry[1] += 1
+
+    board = [
+        {"family": family, "params": dict(params), "cv_rmse": float(np.sqrt(s / n))}
+        for (family, params), (s, n) in totals.items()
+        if n == folds
+    ]
+    return sorted(board, key=lambda c: c["cv_rmse"])
+
+
+def search(
+    X,
+    y,
+    folds=DEFAULT_FOLDS,
+    workers=0,
+    n_alphas=DEFAULT_N_ALPHAS,
+    include_trees=False,
+    seed=42,
+):
+    """
+    Cross-validate every candidate and return a summary with the winner.
+
+    ``workers=0`` uses all cores. The summary holds the best configuration,
+    the best candidate of each family, and timing and size of the search.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    workers = workers or os.cpu_count() or 1
+
+    started = time.perf_counter()
+    tasks = build_tasks(X, y, folds, n_alphas, include_trees, seed)
+    board = _leaderboard(_run_tasks(tasks, workers), folds)
+    elapsed = time.perf_counter() - started
+
+    best_per_family = {}
+    for candidate in board:
+        best_per_family.setdefault(candidate["family"], candidate)
+
+    return {
+        "best": board[0],
+        "best_per_family": best_per_family,
+        "n_candidates": len(board),
+        "n_tasks": len(tasks),
+        "folds": folds,
+        "workers": workers,
+        "search_time_s": round(elapsed, 3),
+    }
+
+
+def make_estimator(family, params, seed=42):
+    """Instantiate the sklearn estimator for a search candidate."""
+    estimator = ESTIMATORS[family]
+    if family in ("lasso", "elasticnet"):
+        return estimator(**params, random_state=seed, max_iter=10000)
+    return estimator(**params, random_state=seed)
+
+
+def fit_best(X, y, summary, seed=42):
+    """Fit a scaler + the winning estimator on the full training set."""
+    best = summary["best"]
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    model = make_estimator(best["family"], best["params"], seed)
+    model.fit(X_scaled, y)
+    return {"scaler": scaler, "model": model, "type": best["family"]}
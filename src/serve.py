@@ -0,0 +1,273 @@
+"""
+Multi-process serving: a supervisor running N uvicorn workers on one socket.
+
+    python -m src.serve --workers 4 --host 0.0.0.0 --port 8000
+
+The supervisor binds the listening socket once and spawns workers that all
+accept on it. Workers serve ``models/model.bin`` through a read-only memory
+map, so the weights live once in the OS page cache, not once per process,
+and workers never unpickle or import scikit-learn.
+
+Reloads are coordinated through a generation counter in shared memory. On
+SIGHUP, on ``POST /admin/reload`` to any worker, or when the artifact watcher
+sees a change, the supervisor first loads the new artifacts itself. A broken
+artifact therefore never reaches the workers. It then bumps the generation.
+Every worker reloads its registry and acknowledges the new generation, and
+the supervisor logs once all workers have switched. Acknowledgements are
+checked from the monitor loop, so workers that exit unexpectedly are still
+restarted while a reload is in progress. With ``JOBS_WORKERS`` set, the supervisor runs
+the single bulk job worker pool, rather than one pool per API worker.
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import uvicorn  # noqa: E402
+
+from src.jobs import JOBS_DIR, JOBS_WORKERS, JobWorkerPool  # noqa: E402
+from src.registry import BINARY_NAME, discover_model_dirs, load_model_dir  # noqa: E402
+
+MODEL_DIR = Path("models")
+
+# Seconds between supervisor checks for changed artifacts (0 disables)
+SERVE_WATCH_INTERVAL = float(os.getenv("SERVE_WATCH_INTERVAL", "2"))
+
+# How often workers poll the shared generation counter
+GENERATION_POLL_SECONDS = 0.1
+
+# How long the supervisor waits for every worker to acknowledge a reload
+RELOAD_ACK_TIMEOUT = 30.0
+
+
+def default_workers():
+    """Number of CPUs this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def artifact_signature(root=MODEL_DIR):
+    """Fingerprint of every servable artifact under ``root``."""
+    signature = []
+    for directory in discover_model_dirs(root).values():
+        for path in sorted(directory.iterdir()):
+            if path.is_file():
+                stat = path.stat()
+                signature.append((str(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+def validate_artifacts(root=MODEL_DIR):
+    """Load every artifact under ``root`` once; raises if any is unusable."""
+    fmt = os.getenv("MODEL_FORMAT", "auto")
+    engine_mode = os.getenv("INFERENCE_ENGINE", "auto")
+    precision = os.getenv("INFERENCE_PRECISION", "float64")
+    for directory in discover_model_dirs(root).values():
+        load_model_dir(
+            directory, fmt=fmt, engine_mode=engine_mode, precision=precision
+        ).close()
+
+
+def _follow_generation(slot, generation, acks):
+    """Worker thread: reload the registry whenever the generation changes."""
+    from src import api
+
+    seen = generation.value
+    acks[slot] = seen
+    while True:
+        time.sleep(GENERATION_POLL_SECONDS)
+        current = generation.value
+        if current == seen:
+            continue
+        reloaded = api.reload_models()
+        print(f"Worker {os.getpid()} at generation {current}; reloaded {reloaded}")
+        seen = current
+        acks[slot] = current
+
+
+def run_worker(config, sockets, slot, generation, acks):
+    """Entry point of a worker process."""
+    config.configure_logging()
+    threading.Thread(
+        target=_follow_generation,
+        args=(slot, generation, acks),
+        name="generation-follower",
+        daemon=True,
+    ).start()
+    try:
+        uvicorn.Server(config).run(sockets=sockets)
+    except KeyboardInterrupt:
+        pass
+
+
+class Supervisor:
+    """Start, watch, restart and reload a fixed-size pool of workers."""
+
+    def __init__(
+        self,
+        config,
+        n_workers,
+        watch_interval=SERVE_WATCH_INTERVAL,
+        job_workers=JOBS_WORKERS,
+    ):
+        self.config = config
+        self.n_workers = n_workers
+        self.watch_interval = watch_interval
+        self.job_workers = job_workers
+        self.job_pool = None
+        self._ctx = multiprocessing.get_context("spawn")
+        self.generation = self._ctx.Value("q", 0, lock=False)
+        self.acks = self._ctx.Array("q", n_workers, lock=False)
+        self.workers = [None] * n_workers
+        self._reload_requested = threading.Event()
+        # Generation awaiting acknowledgement and its deadline, if any
+        self._pending = None
+        self._stop = threading.Event()
+        self._socket = None
+        self._signature = None
+
+    def _spawn(self, slot):
+        process = self._ctx.Process(
+            target=run_worker,
+            args=(self.config, [self._socket], slot, self.generation, self.acks),
+            name=f"worker-{slot}",
+        )
+        process.start()
+        self.workers[slot] = process
+        print(f"Started worker {slot} (pid {process.pid})")
+
+    def reload(self):
+        """
+        Validate artifacts, then move every worker to a new generation.
+
+        Returns without waiting; ``_check_acks`` reports from the monitor
+        loop once every worker has acknowledged or the timeout has passed.
+        """
+        try:
+            validate_artifacts()
+        except Exception as e:
+            print(f"Reload aborted, workers keep their models: {e}")
+            return False
+
+        self.generation.value += 1
+        self._pending = (self.generation.value, time.monotonic() + RELOAD_ACK_TIMEOUT)
+        return True
+
+    def _check_acks(self):
+        """Log a pending generation once all workers run it, or once it times out."""
+        if self._pending is None:
+            return
+        target, deadline = self._pending
+        lagging = [i for i in range(self.n_workers) if self.acks[i] < target]
+        if not lagging:
+            print(f"Generation {target} active on all {self.n_workers} workers")
+        elif time.monotonic() >= deadline:
+            print(f"Generation {target} not acknowledged by workers {lagging}")
+        else:
+            return
+        self._pending = None
+
+    def _check_artifacts(self):
+        signature = artifact_signature()
+        if signature != self._signature:
+            self._signature = signature
+            self._reload_requested.set()
+
+    def _restart_dead_workers(self):
+        for slot, process in enumerate(self.workers):
+            if not process.is_alive():
+                print(f"Worker {slot} (pid {process.pid}) exited; restarting")
+                process.join()
+                self._spawn(slot)
+
+    def run(self):
+        """Serve until SIGINT/SIGTERM."""
+        self._socket = self.config.bind_socket()
+        self._signature = artifact_signature()
+        signal.signal(signal.SIGHUP, lambda *_: self._reload_requested.set())
+        signal.signal(signal.SIGTERM, lambda *_: self._stop.set())
+        signal.signal(signal.SIGINT, lambda *_: self._stop.set())
+
+        for slot in range(self.n_workers):
+            self._spawn(slot)
+        if self.job_workers > 0:
+            self.job_pool = JobWorkerPool(self.job_workers, JOBS_DIR, MODEL_DIR).start()
+
+        last_check = time.monotonic()
+        while not self._stop.wait(0.5):
+            if (
+                self.watch_interval
+                and time.monotonic() - last_check >= self.watch_interval
+            ):
+                last_check = time.monotonic()
+                self._check_artifacts()
+            if self._reload_requested.is_set():
+                self._reload_requested.clear()
+                self.reload()
+            self._check_acks()
+            self._restart_dead_workers()
+        self.shutdown()
+
+    def shutdown(self):
+        """Ask workers to finish in-flight requests, then exit."""
+        if self.job_pool is not None:
+            self.job_pool.stop()
+        for process in self.workers:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self.workers:
+            if process is not None:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.kill()
+        self._socket.close()
+        print("Supervisor stopped")
+
+
+def configure_worker_environment():
+    """Environment inherited by workers before they are spawned."""
+    # Serve the shared memory-mapped artifact unless a format was chosen
+    if "MODEL_FORMAT" not in os.environ and (MODEL_DIR / BINARY_NAME).exists():
+        os.environ["MODEL_FORMAT"] = "binary"
+    # The supervisor owns artifact watching; workers follow its generations
+    os.environ["MODEL_WATCH_INTERVAL"] = "0"
+    # The supervisor runs the one job worker pool; API workers start none
+    os.environ["JOBS_WORKERS"] = "0"
+    os.environ["SERVE_SUPERVISOR_PID"] = str(os.getpid())
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Run the API with N workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("SERVE_WORKERS", "1")) or default_workers(),
+        help="Worker processes (default: SERVE_WORKERS, 1; 0 means one per CPU)",
+    )
+    parser.add_argument("--watch-interval", type=float, default=SERVE_WATCH_INTERVAL)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    configure_worker_environment()
+    config = uvicorn.Config(
+        "src.api:app", host=args.host, port=args.port, log_level=args.log_level
+    )
+    print(f"Serving on {args.host}:{args.port} with {args.workers} workers")
+    Supervisor(config, args.workers, args.watch_interval).run()
+
+
+if __name__ == "__main__":
+    main()
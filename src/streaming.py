@@ -0,0 +1,299 @@
+"""
+Chunked NDJSON/CSV bulk scoring with bounded memory.
+
+Input is consumed line by line and grouped into fixed-size chunks; each chunk
+is parsed into one NumPy block, scored with a single engine call and emitted
+as NDJSON result lines before the next chunk is read. The same engine backs
+the ``/predict/stream`` endpoint and the command-line mode, which loads the
+model through the registry exactly as the API serves it:
+
+    python -m src.streaming patients.ndjson -o scores.ndjson
+    python -m src.streaming extract.csv --chunk-size 50000 > scores.ndjson
+    python -m src.streaming extract.csv --version v0.2 > scores.ndjson
+
+Request bodies are split into lines with a bounded buffer: a line longer
+than ``STREAM_MAX_LINE_BYTES`` is discarded and reported as that row's
+error instead of being buffered whole. A line that is not valid UTF-8 is
+reported the same way.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from src.features import FEATURE_NAMES, N_FEATURES, row_error, to_float_matrix
+
+DEFAULT_CHUNK_SIZE = 10000
+FORMATS = ("ndjson", "csv")
+
+# Longest streamed input line kept in memory; longer lines become row errors
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", "65536"))
+
+
+class UnreadableLine:
+    """Stands in for an input line that could not be read; ``reason`` is its error."""
+
+    __slots__ = ("reason",)
+
+    def __init__(self, reason):
+        self.reason = reason
+
+
+def decode_line(raw):
+    """Decode one raw input line, or an UnreadableLine if it is not UTF-8."""
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError as e:
+        return UnreadableLine(f"Invalid UTF-8 at byte {e.start}")
+
+
+def _parse_ndjson(lines):
+    """Parse NDJSON lines into a feature matrix, row IDs and parse errors."""
+    values, ids, errors = [], [], {}
+    for i, line in enumerate(lines):
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            errors[i] = f"Invalid JSON: {e}"
+            record = {}
+        values.append([record.get(f) for f in FEATURE_NAMES])
+        ids.append(record.get("id"))
+    return to_float_matrix(values).reshape(len(lines), N_FEATURES), ids, errors
+
+
+class ChunkedScorer:
+    """
+    Score NDJSON or CSV input chunk by chunk.
+
+    ``score_fn`` takes an (n, 10) matrix and returns n predictions. For CSV the
+    first line is the header; an optional ``id`` column is echoed back.
+    """
+
+    def __init__(self, score_fn, fmt="ndjson", chunk_size=DEFAULT_CHUNK_SIZE):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format {fmt!r}; expected one of {FORMATS}")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.score_fn = score_fn
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.n_rows = 0
+        self.n_errors = 0
+        self._header = None
+
+    def _parse_csv(self, lines):
+        """Parse CSV lines using the header seen on the first line."""
+        if self._header is None:
+            self._header = next(csv.reader(lines[:1]))
+            lines = lines[1:]
+        positions = [
+            self._header.index(f) if f in self._header else None for f in FEATURE_NAMES
+        ]
+        id_pos = self._header.index("id") if "id" in self._header else None
+
+        values, ids, errors = [], [], {}
+        for i, row in enumerate(csv.reader(lines)):
+            values.append(
+                [row[p] if p is not None and p < len(row) else None for p in positions]
+            )
+            ids.append(
+                row[id_pos] if id_pos is not None and id_pos < len(row) else None
+            )
+            if len(row) != len(self._header):
+                errors[i] = f"Expected {len(self._header)} columns, got {len(row)}"
+        return to_float_matrix(values).reshape(len(values), N_FEATURES), ids, errors
+
+    def _unreadable_rows(self, lines):
+        """Blank out UnreadableLine markers; returns the cleaned lines and row errors."""
+        # A pending CSV header is the first line but not a row
+        first_row = 1 if self.fmt == "csv" and self._header is None else 0
+        errors = {
+            i - first_row: line.reason
+            for i, line in enumerate(lines)
+            if isinstance(line, UnreadableLine) and i >= first_row
+        }
+        if any(isinstance(line, UnreadableLine) for line in lines):
+            lines = ["" if isinstance(line, UnreadableLine) else line for line in lines]
+        return lines, errors
+
+    def score_chunk(self, lines):
+        """Score one chunk of input lines and return NDJSON result bytes."""
+        parse = self._parse_csv if self.fmt == "csv" else _parse_ndjson
+        lines, unreadable = self._unreadable_rows(lines)
+        X, ids, errors = parse(lines)
+        errors.update(unreadable)
+        valid = np.isfinite(X).all(axis=1)
+        valid[list(errors)] = False
+
+        predictions = np.full(X.shape[0], np.nan)
+        if valid.any():
+            predictions[valid] = self.score_fn(X[valid])
+
+        out = []
+        for i in range(X.shape[0]):
+            result = {"index": self.n_rows + i, "id": ids[i]}
+            if valid[i]:
+                result["prediction"] = float(predictions[i])
+            else:
+                result["error"] = errors.get(i) or row_error(X[i])
+            out.append(json.dumps(result))
+
+        self.n_rows += X.shape[0]
+        self.n_errors += int((~valid).sum())
+        return ("\n".join(out) + "\n").encode() if out else b""
+
+    def _is_full(self, chunk):
+        """Whether a chunk has reached ``chunk_size`` data lines."""
+        # The CSV header does not count towards the first chunk
+        header_pending = self.fmt == "csv" and self._header is None
+        return len(chunk) >= self.chunk_size + header_pending
+
+    def iter_chunks(self, lines):
+        """Group an iterable of text lines into lists of ``chunk_size`` lines."""
+        chunk = []
+        for line in lines:
+            if not isinstance(line, UnreadableLine):
+                line = line.rstrip("\r\n")
+                if not line:
+                    continue
+            chunk.append(line)
+            if self._is_full(chunk):
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def score_lines(self, lines):
+        """Score an iterable of text lines (or UnreadableLine markers), yielding NDJSON."""
+        for chunk in self.iter_chunks(lines):
+            yield self.score_chunk(chunk)
+
+    async def ascore_bytes(self, byte_chunks):
+        """
+        Score an async iterable of raw byte chunks (e.g. a request body).
+
+        Parsing and scoring run in a worker thread so the event loop keeps
+        serving other requests while a chunk is processed.
+        """
+        chunk = []
+        async for line in _aiter_lines(byte_chunks):
+            if not isinstance(line, UnreadableLine):
+                line = line.rstrip("\r\n")
+                if not line:
+                    continue
+            chunk.append(line)
+            if self._is_full(chunk):
+                yield await asyncio.to_thread(self.score_chunk, chunk)
+                chunk = []
+        if chunk:
+            yield await asyncio.to_thread(self.score_chunk, chunk)
+
+
+async def _aiter_lines(byte_chunks, max_line_bytes=STREAM_MAX_LINE_BYTES):
+    """
+    Split an async iterable of byte chunks into decoded text lines.
+
+    A line over ``max_line_bytes`` is yielded as an UnreadableLine, and its
+    bytes are dropped as they arrive, so the buffer stays bounded.
+    """
+    overlong = UnreadableLine(f"Line longer than {max_line_bytes} bytes")
+    buffer = b""
+    # Whether the buffer continues a line already reported as overlong
+    skipping = False
+    async for data in byte_chunks:
+        buffer += data
+        *complete, buffer = buffer.split(b"\n")
+        for line in complete:
+            if skipping:
+                skipping = False
+            elif len(line) > max_line_bytes:
+                yield overlong
+            else:
+                yield decode_line(line)
+        if len(buffer) > max_line_bytes:
+            if not skipping:
+                yield overlong
+                skipping = True
+            buffer = b""
+    if buffer and not skipping:
+        yield decode_line(buffer)
+
+
+def load_model(path, version=None):
+    """
+    Load the model the API would serve from ``path``.
+
+    ``path`` is a model root (``version`` picks a version under it) or one
+    artifact file. Format, engine and precision follow ``MODEL_FORMAT``,
+    ``INFERENCE_ENGINE`` and ``INFERENCE_PRECISION``.
+    """
+    from src.registry import load_model_dir, load_version
+
+    path = Path(path)
+    options = {
+        "fmt": os.getenv("MODEL_FORMAT", "auto"),
+        "engine_mode": os.getenv("INFERENCE_ENGINE", "auto"),
+        "precision": os.getenv("INFERENCE_PRECISION", "float64"),
+    }
+    if path.is_file():
+        options["fmt"] = "pickle" if path.suffix == ".pkl" else "binary"
+        return load_model_dir(path.parent, **options)
+    return load_version(path, version, **options)
+
+
+def _detect_format(path):
+    """Guess the input format from the file extension."""
+    return "csv" if Path(path).suffix.lower() == ".csv" else "ndjson"
+
+
+def main(argv=None):
+    """Score a local NDJSON/CSV file and write NDJSON results."""
+    parser = argparse.ArgumentParser(
+        description="Chunked bulk scoring of NDJSON/CSV files"
+    )
+    parser.add_argument("input", help="Input file, or '-' for stdin")
+    parser.add_argument(
+        "-o", "--output", default="-", help="Output file (default: stdout)"
+    )
+    parser.add_argument(
+        "--format", choices=FORMATS, help="Input format (default: by extension)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument(
+        "--model", default="models", help="Model root directory or artifact file"
+    )
+    parser.add_argument("--version", help="Model version under the model root")
+    args = parser.parse_args(argv)
+
+    model = load_model(args.model, args.version)
+    print(f"Scoring with {model.version} ({model.engine.kind} engine)", file=sys.stderr)
+    scorer = ChunkedScorer(
+        model.engine.predict,
+        fmt=args.format or _detect_format(args.input),
+        chunk_size=args.chunk_size,
+    )
+
+    src = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    dst = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for block in scorer.score_lines(decode_line(raw) for raw in src):
+            dst.write(block)
+    finally:
+        if src is not sys.stdin.buffer:
+            src.close()
+        if dst is not sys.stdout.buffer:
+            dst.close()
+
+    print(f"Scored {scorer.n_rows} rows ({scorer.n_errors} errors)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
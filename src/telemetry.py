@@ -0,0 +1,300 @@
+"""
+Prometheus-style metrics and per-stage request timing.
+
+``MetricsMiddleware`` counts requests and errors and records end-to-end
+latency per endpoint and model version. Within a request, code can record
+named stages (``build_array``, ``transform``, ``predict``...) on the active
+``StageTimer``; the middleware adds ``parse`` (request start until the
+handler runs: routing, body read and pydantic validation) and ``serialize``
+(handler return until the response starts, plus any ``serialize`` stage
+recorded inside the handler). Everything is plain counters
+and bisect-based histograms so it can stay enabled in production.
+"""
+
+import bisect
+import functools
+import inspect
+import threading
+from contextvars import ContextVar
+from time import perf_counter
+
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)  # fmt: skip
+STAGE_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4,
+    2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 0.1, 1.0,
+)  # fmt: skip
+
+_current_timer = ContextVar("stage_timer", default=None)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{v}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic counter family keyed by a tuple of label values."""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        """Add ``amount`` to the series identified by ``labels``."""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        """Yield exposition lines."""
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            label_str = _format_labels(self.labelnames, labels)
+            yield f"{self.name}{label_str} {_format_value(value)}"
+
+
+class Histogram:
+    """Bucketed histogram family keyed by a tuple of label values."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        """Record one observation for the series identified by ``labels``."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, labels=()):
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        """Yield exposition lines with cumulative buckets."""
+        with self._lock:
+            items = [(k, list(v[0]), v[1]) for k, v in self._series.items()]
+        bounds = [repr(b) for b in self.buckets] + ["+Inf"]
+        names = self.labelnames + ("le",)
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                label_str = _format_labels(names, labels + (bound,))
+                yield f"{self.name}_bucket{label_str} {cumulative}"
+            label_str = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_str} {total!r}"
+            yield f"{self.name}_count{label_str} {cumulative}"
+
+
+class MetricsRegistry:
+    """Collection of metric families plus callbacks for externally held stats."""
+
+    def __init__(self):
+        self._families = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        family = Counter(name, documentation, labelnames)
+        self._families.append(family)
+        return family
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        family = Histogram(name, documentation, labelnames, buckets)
+        self._families.append(family)
+        return family
+
+    def add_collector(self, collect):
+        """
+        Register ``collect() -> [(name, type, help, [(labels_dict, value)])]``.
+
+        Used for stats owned by other components (cache, batcher, registry).
+        """
+        self._collectors.append(collect)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for family in self._families:
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            lines.extend(family.samples())
+        for collect in self._collectors:
+            for name, metric_type, documentation, samples in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    label_str = _format_labels(tuple(labels), tuple(labels.values()))
+                    lines.append(f"{name}{label_str} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """Per-request record of stage durations (seconds)."""
+
+    __slots__ = ("started", "handler_started", "handler_finished", "stages")
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.handler_started = None
+        self.handler_finished = None
+        self.stages = {}
+
+    def add(self, stage, since):
+        """Record ``stage`` as having run from ``since`` until now."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + perf_counter() - since
+
+
+def current_timer():
+    """The StageTimer of the request being served, or None."""
+    return _current_timer.get()
+
+
+class timed:
+    """Context manager recording a stage on the active timer (no-op without one)."""
+
+    __slots__ = ("stage", "timer", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.timer = _current_timer.get()
+
+    def __enter__(self):
+        if self.timer is not None:
+            self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.timer is not None:
+            self.timer.add(self.stage, self.start)
+
+
+def instrumented(handler):
+    """Mark handler entry/exit so the middleware can derive parse/serialize time."""
+    if inspect.iscoroutinefunction(handler):
+
+        @functools.wraps(handler)
+        async def async_wrapper(*args, **kwargs):
+            timer = _current_timer.get()
+            if timer is not None:
+                timer.handler_started = perf_counter()
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                if timer is not None:
+                    timer.handler_finished = perf_counter()
+
+        return async_wrapper
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.handler_started = perf_counter()
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            if timer is not None:
+                timer.handler_finished = perf_counter()
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request, error, latency and stage metrics."""
+
+    def __init__(self, app, metrics, skip_paths=("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+        self.requests = metrics.counter(
+            "triage_requests_total",
+            "HTTP requests by endpoint, model version and status code.",
+            ("endpoint", "model_version", "status"),
+        )
+        self.errors = metrics.counter(
+            "triage_request_errors_total",
+            "HTTP requests that returned a 4xx/5xx status.",
+            ("endpoint", "model_version"),
+        )
+        self.latency = metrics.histogram(
+            "triage_request_duration_seconds",
+            "End-to-end request latency.",
+            ("endpoint", "model_version"),
+        )
+        self.stage_latency = metrics.histogram(
+            "triage_stage_duration_seconds",
+            "Time spent in each request stage.",
+            ("endpoint", "stage"),
+            buckets=STAGE_BUCKETS,
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        timer = StageTimer()
+        token = _current_timer.set(timer)
+        response = {"status": 500, "version": "none", "started": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["started"] = perf_counter()
+                for name, value in message.get("headers", ()):
+                    if name == b"x-model-version":
+                        response["version"] = value.decode("latin-1")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_timer.reset(token)
+            self._record(scope, timer, response)
+
+    def _record(self, scope, timer, response):
+        route = scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        version, status = response["version"], response["status"]
+
+        self.requests.inc((endpoint, version, str(status)))
+        if status >= 400:
+            self.errors.inc((endpoint, version))
+        self.latency.observe((endpoint, version), perf_counter() - timer.started)
+
+        stages = dict(timer.stages)
+        if timer.handler_started is not None:
+            routing = timer.handler_started - timer.started
+            stages["parse"] = stages.get("parse", 0.0) + routing
+        if timer.handler_finished is not None and response["started"] is not None:
+            rendering = response["started"] - timer.handler_finished
+            stages["serialize"] = stages.get("serialize", 0.0) + rendering
+        for stage, seconds in stages.items():
+            self.stage_latency.observe((endpoint, stage), seconds)
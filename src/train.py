@@ -3,16 +3,35 @@ Training script for diabetes progression prediction model.
 """
 
 import os
+import sys
 import pickle
 import json
 from pathlib import Path
 import numpy as np
-from sklearn.datasets import load_diabetes
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LinearRegression, Ridge  # Added Ridge
+from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.metrics import mean_squared_error, r2_score
 
+if __package__ in (None, ""):
+    # Allow running as ``python src/train.py`` from the repository root
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.artifact import (  # noqa: E402
+    ArtifactError,
+    linear_pipeline_arrays,
+    save_artifact,
+)
+from src.data import DEFAULT_CHUNK_SIZE, open_source  # noqa: E402
+from src.datacache import load_dataset, load_split  # noqa: E402
+from src.drift import reference_bins  # noqa: E402
+from src.features import FEATURE_NAMES  # noqa: E402
+from src.incremental import ReservoirSample, train_incremental  # noqa: E402
+from src.lookup import build_lookup_tables, tables_are_faster  # noqa: E402
+from src.search import fit_best, search  # noqa: E402
+from src.trees import tree_ensemble_arrays  # noqa: E402
+from src.triage import cohort_scores  # noqa: E402
+
 # Set random seed for reproducibility
 RANDOM_SEED = 42
 np.random.seed(RANDOM_SEED)
@@ -21,22 +40,65 @@ MODEL_VERSION = os.getenv("MODEL_VERSION", "v0.1")
 MODEL_DIR = Path("models")
 MODEL_DIR.mkdir(exist_ok=True)
 
+# "fixed" trains the model defined for MODEL_VERSION; "search" cross-validates
+# Ridge/Lasso/ElasticNet (and, with SEARCH_TREES=1, tree ensembles) and keeps
+# the configuration with the lowest CV RMSE
+TRAIN_MODE = os.getenv("TRAIN_MODE", "fixed")
+
+# Search settings: worker processes (0 = all cores), CV folds, alphas per path
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "0"))
+SEARCH_FOLDS = int(os.getenv("SEARCH_FOLDS", "5"))
+SEARCH_N_ALPHAS = int(os.getenv("SEARCH_N_ALPHAS", "200"))
+SEARCH_TREES = os.getenv("SEARCH_TREES", "0") == "1"
+
+# Train out of core from a CSV/Parquet/.npy extract instead of sklearn's
+# bundled dataset; the file is streamed in TRAIN_CHUNK_SIZE row chunks
+TRAIN_DATA = os.getenv("TRAIN_DATA")
+TRAIN_CHUNK_SIZE = int(os.getenv("TRAIN_CHUNK_SIZE", str(DEFAULT_CHUNK_SIZE)))
+TRAIN_TARGET = os.getenv("TRAIN_TARGET", "target")
+
+# Rows of each split sampled while streaming for the cohort, drift, lookup
+# and reference arrays stored with the artifact
+TRAIN_SAMPLE_ROWS = int(os.getenv("TRAIN_SAMPLE_ROWS", "10000"))
+
+# Regularization used by the v0.2 Ridge model
+RIDGE_ALPHA = 10.0
+
+# Boosting settings of the v0.3 model: shallow trees suit the array engine
+GBT_PARAMS = {"n_estimators": 300, "learning_rate": 0.05, "max_depth": 3}
+
+
+def load_data(as_frame=True):
+    """
+    Load the diabetes dataset (from the data cache when it is enabled).
+
+    Returns a DataFrame and Series, or with ``as_frame=False`` the cached
+    ``{"X", "y"}`` arrays themselves.
+    """
+    import pandas as pd
 
-def load_data():
-    """Load the diabetes dataset."""
     print("Loading diabetes dataset...")
-    diabetes = load_diabetes(as_frame=True)
-    X = diabetes.frame.drop(columns=["target"])
-    y = diabetes.frame["target"]
+    dataset = load_dataset()
+    if not as_frame:
+        return dataset
+    X = pd.DataFrame(dataset["X"], columns=FEATURE_NAMES)
+    y = pd.Series(dataset["y"], name="target")
     return X, y
 
 
-def train_model_v01(X_train, y_train):
+def _fit_scaler(X_train, scaled):
+    """Fit a StandardScaler, or reuse a cached ``(scaler, X_train_scaled)``."""
+    if scaled is not None:
+        return scaled
+    scaler = StandardScaler()
+    return scaler, scaler.fit_transform(X_train)
+
+
+def train_model_v01(X_train, y_train, scaled=None):
     """Train baseline model: StandardScaler + LinearRegression."""
     print("Training v0.1 model: StandardScaler + LinearRegression")
 
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
+    scaler, X_train_scaled = _fit_scaler(X_train, scaled)
 
     model = LinearRegression()
     model.fit(X_train_scaled, y_train)
@@ -44,26 +106,109 @@ def train_model_v01(X_train, y_train):
     return {"scaler": scaler, "model": model}
 
 
-def train_model_v02(X_train, y_train):
-    """
-    Train improved model: StandardScaler + Ridge with optimized alpha.
-    Also includes RandomForest as alternative.
-    """
-    print("Training v0.2 model: StandardScaler + Ridge (alpha=10)")
+def train_model_v02(X_train, y_train, scaled=None):
+    """Train improved model: StandardScaler + Ridge with optimized alpha."""
+    print(f"Training v0.2 model: StandardScaler + Ridge (alpha={RIDGE_ALPHA:g})")
 
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
+    scaler, X_train_scaled = _fit_scaler(X_train, scaled)
 
     # Use Ridge regression with regularization
-    model = Ridge(alpha=10.0, random_state=RANDOM_SEED)
+    model = Ridge(alpha=RIDGE_ALPHA, random_state=RANDOM_SEED)
     model.fit(X_train_scaled, y_train)
 
     return {"scaler": scaler, "model": model, "type": "ridge"}
 
 
-def evaluate_model(pipeline, X_test, y_test):
-    """Evaluate model performance."""
-    X_test_scaled = pipeline["scaler"].transform(X_test)
+def train_model_v03(X_train, y_train, scaled=None):
+    """Train tree model: StandardScaler + GradientBoostingRegressor."""
+    print(f"Training v0.3 model: StandardScaler + GradientBoosting {GBT_PARAMS}")
+
+    scaler, X_train_scaled = _fit_scaler(X_train, scaled)
+
+    model = GradientBoostingRegressor(**GBT_PARAMS, random_state=RANDOM_SEED)
+    model.fit(X_train_scaled, y_train)
+
+    return {"scaler": scaler, "model": model, "type": "gradient_boosting"}
+
+
+def train_model_search(X_train, y_train):
+    """
+    Cross-validated search over model families; fit the winner on all of X_train.
+
+    Returns the pipeline and the search summary stored in metrics.json.
+    """
+    print(
+        f"Searching models with {SEARCH_FOLDS}-fold CV "
+        f"({SEARCH_N_ALPHAS} alphas per path, trees={'on' if SEARCH_TREES else 'off'})"
+    )
+    summary = search(
+        X_train,
+        y_train,
+        folds=SEARCH_FOLDS,
+        workers=SEARCH_WORKERS,
+        n_alphas=SEARCH_N_ALPHAS,
+        include_trees=SEARCH_TREES,
+        seed=RANDOM_SEED,
+    )
+    best = summary["best"]
+    print(
+        f"Searched {summary['n_candidates']} candidates in "
+        f"{summary['search_time_s']:.2f}s on {summary['workers']} workers"
+    )
+    print(f"Best: {best['family']} {best['params']} (CV RMSE {best['cv_rmse']:.2f})")
+    return fit_best(X_train, y_train, summary, seed=RANDOM_SEED), summary
+
+
+def train_model_streaming(path, version=None):
+    """
+    Train the ``version`` (default MODEL_VERSION) model in one pass over a file.
+
+    v0.2 solves Ridge and every other linear version OLS from sufficient
+    statistics; v0.3 (trees) raises ValueError. Rows are split into
+    train/test by a hash of their position. Reference arrays are built from
+    ``TRAIN_SAMPLE_ROWS``-row uniform samples of each split taken in the same
+    pass. Returns the pipeline and its held-out metrics.
+    """
+    version = version or MODEL_VERSION
+    if version == "v0.3":
+        raise ValueError(
+            "Streaming training fits linear models only; v0.3 (gradient-boosted "
+            "trees) needs in-memory data: unset TRAIN_DATA or pick v0.1/v0.2"
+        )
+    alpha = RIDGE_ALPHA if version == "v0.2" else 0.0
+    if TRAIN_MODE == "search":
+        print("Warning: TRAIN_MODE=search needs in-memory data; training fixed model")
+    print(
+        f"Streaming {path} in chunks of {TRAIN_CHUNK_SIZE} rows "
+        f"({'Ridge' if alpha else 'LinearRegression'})"
+    )
+    source = open_source(path, target=TRAIN_TARGET, chunk_size=TRAIN_CHUNK_SIZE)
+    n_features = len(source.features)
+    train_sample = ReservoirSample(TRAIN_SAMPLE_ROWS, n_features, seed=RANDOM_SEED)
+    test_sample = ReservoirSample(TRAIN_SAMPLE_ROWS, n_features, seed=RANDOM_SEED + 1)
+    pipeline, metrics = train_incremental(
+        source,
+        alpha=alpha,
+        test_size=0.2,
+        seed=RANDOM_SEED,
+        train_sample=train_sample,
+        test_sample=test_sample,
+    )
+    print(
+        f"Train size: {metrics['n_train']}, Test size: {metrics['n_test']}, "
+        f"dropped: {metrics['n_dropped']}"
+    )
+    if "rmse" in metrics:
+        print(f"RMSE: {metrics['rmse']:.2f}")
+        print(f"R²: {metrics['r2']:.3f}")
+    attach_references(pipeline, train_sample.sample, test_sample.sample)
+    return pipeline, metrics
+
+
+def evaluate_model(pipeline, X_test, y_test, X_test_scaled=None):
+    """Evaluate model performance (``X_test_scaled`` may come from the data cache)."""
+    if X_test_scaled is None:
+        X_test_scaled = pipeline["scaler"].transform(X_test)
     y_pred = pipeline["model"].predict(X_test_scaled)
 
     rmse = np.sqrt(mean_squared_error(y_test, y_pred))
@@ -77,54 +222,180 @@ def evaluate_model(pipeline, X_test, y_test):
     return metrics
 
 
-def save_artifacts(pipeline, metrics):
-    """Save model, scaler, and metrics."""
-    model_path = MODEL_DIR / "model.pkl"
-    metrics_path = MODEL_DIR / "metrics.json"
+def attach_cohort(pipeline, X_scaled):
+    """Store the sorted reference-cohort scores used for triage percentiles."""
+    pipeline["cohort_scores"] = cohort_scores(pipeline["model"].predict, X_scaled)
+    print(f"Cohort index: {len(pipeline['cohort_scores'])} reference scores")
+
+
+def attach_drift_reference(pipeline, X_train):
+    """Store training decile bins of each feature for drift monitoring."""
+    pipeline["drift_edges"], pipeline["drift_shares"] = reference_bins(X_train)
+
+
+def attach_lookup_tables(pipeline, X_train):
+    """
+    Store per-feature score lookup tables for a linear pipeline.
+
+    The tables are timed against the dot product once, here, and the
+    verdict is saved as ``lookup_preferred`` for ``LOOKUP_SCORING=auto``.
+    """
+    try:
+        arrays = linear_pipeline_arrays(pipeline)
+    except ArtifactError as e:
+        print(f"Skipping lookup tables: {e}")
+        return
+    tables = build_lookup_tables(arrays, X_train)
+    preferred = len(tables["lookup_features"]) > 0 and tables_are_faster(
+        dict(arrays, **tables), np.asarray(X_train)
+    )
+    tables["lookup_preferred"] = np.array([preferred], dtype=np.int8)
+    pipeline["lookup_tables"] = tables
+    print(
+        f"Lookup tables: {len(tables['lookup_features'])} features, "
+        f"{len(tables['lookup_keys'])} entries, "
+        f"{'tables' if preferred else 'dot product'} preferred"
+    )
 
-    with open(model_path, "wb") as f:
-        pickle.dump(pipeline, f)
 
+def attach_references(pipeline, X_train, X_test, X_train_scaled=None):
+    """
+    Store every post-fit reference array of a fitted pipeline.
+
+    ``X_train``/``X_test`` may be the full splits or samples of them.
+    ``X_train_scaled`` skips the scaler transform when already known.
+    """
+    if X_train_scaled is None:
+        scaler = pipeline["scaler"]
+        X_train_scaled = (np.asarray(X_train) - scaler.mean_) / scaler.scale_
+
+    # The training patients are the reference cohort for triage percentiles
+    attach_cohort(pipeline, X_train_scaled)
+
+    # Served feature distributions are compared with these training bins
+    attach_drift_reference(pipeline, X_train)
+
+    # Low-cardinality features get precomputed per-value score terms
+    attach_lookup_tables(pipeline, X_train)
+
+    # Reduced-precision engines are checked against float64 on the test split
+    if len(X_test):
+        pipeline["reference_X"] = np.asarray(X_test, dtype=np.float64)
+
+
+def save_binary_artifact(pipeline, path, feature_names):
+    """
+    Save the pipeline as a memory-mappable binary artifact.
+
+    Returns False (and writes nothing) if the pipeline has no array form.
+    """
+    try:
+        arrays, model_type = linear_pipeline_arrays(pipeline), "linear"
+    except ArtifactError as e:
+        try:
+            arrays, model_type = tree_ensemble_arrays(pipeline), "tree_ensemble"
+        except ValueError:
+            print(f"Skipping binary artifact: {e}")
+            return False
+    for name in ("cohort_scores", "reference_X", "drift_edges", "drift_shares"):
+        if name in pipeline:
+            arrays[name] = pipeline[name]
+    if model_type == "linear":
+        arrays.update(pipeline.get("lookup_tables", {}))
+
+    metadata = {"version": MODEL_VERSION, "random_seed": RANDOM_SEED}
+    save_artifact(path, arrays, model_type, feature_names, metadata=metadata)
+    return True
+
+
+def _replace_atomically(path, data):
+    """Write ``data`` to ``path`` so readers never see a partial file."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_artifact_dir(pipeline, metrics_with_version, directory):
+    """Write model.pkl, model.bin (if possible) and metrics.json to ``directory``."""
+    directory.mkdir(parents=True, exist_ok=True)
+
+    _replace_atomically(directory / "model.pkl", pickle.dumps(pipeline))
+
+    feature_names = list(
+        getattr(pipeline["scaler"], "feature_names_in_", FEATURE_NAMES)
+    )
+    save_binary_artifact(pipeline, directory / "model.bin", feature_names)
+
+    metrics_json = json.dumps(metrics_with_version, indent=2).encode("utf-8")
+    _replace_atomically(directory / "metrics.json", metrics_json)
+
+
+def save_artifacts(pipeline, metrics, search_summary=None):
+    """
+    Save model, scaler, and metrics.
+
+    Artifacts go to ``models/<version>/`` (kept for multi-version serving)
+    and to ``models/`` itself, which holds the default version.
+    """
     metrics_with_version = {
         "version": MODEL_VERSION,
         "metrics": metrics,
         "random_seed": RANDOM_SEED,
     }
+    if search_summary is not None:
+        metrics_with_version["search"] = search_summary
 
-    with open(metrics_path, "w") as f:
-        json.dump(metrics_with_version, f, indent=2)
+    version_dir = MODEL_DIR / MODEL_VERSION
+    write_artifact_dir(pipeline, metrics_with_version, version_dir)
+    write_artifact_dir(pipeline, metrics_with_version, MODEL_DIR)
 
-    print(f"Model saved to {model_path}")
-    print(f"Metrics saved to {metrics_path}")
+    print(f"Model saved to {MODEL_DIR / 'model.pkl'} and {version_dir}/")
+    print(f"Metrics saved to {MODEL_DIR / 'metrics.json'}")
 
 
 def main():
     """Main training pipeline."""
-    # Load data
-    X, y = load_data()
-
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=RANDOM_SEED
+    if TRAIN_DATA:
+        pipeline, metrics = train_model_streaming(TRAIN_DATA)
+        save_artifacts(pipeline, metrics)
+        print("Training complete!")
+        return
+
+    # Load and split data, reusing cached arrays and scaler from earlier runs
+    split = load_split(
+        test_size=0.2, seed=RANDOM_SEED, dataset=load_data(as_frame=False)
     )
+    X_train, X_test = split["X_train"], split["X_test"]
+    y_train, y_test = split["y_train"], split["y_test"]
+    scaled = (split["scaler"], split["X_train_scaled"])
 
     print(f"Train size: {len(X_train)}, Test size: {len(X_test)}")
 
     # Train model
-    if MODEL_VERSION == "v0.1":
-        pipeline = train_model_v01(X_train, y_train)
+    search_summary = None
+    if TRAIN_MODE == "search":
+        pipeline, search_summary = train_model_search(X_train, y_train)
+        pipeline["scaler"].feature_names_in_ = split["scaler"].feature_names_in_
+    elif MODEL_VERSION == "v0.1":
+        pipeline = train_model_v01(X_train, y_train, scaled)
     elif MODEL_VERSION == "v0.2":
-        pipeline = train_model_v02(X_train, y_train)
+        pipeline = train_model_v02(X_train, y_train, scaled)
+    elif MODEL_VERSION == "v0.3":
+        pipeline = train_model_v03(X_train, y_train, scaled)
     else:
         # Fallback for unknown versions
         print(f"Warning: Unknown model version {MODEL_VERSION}. Defaulting to v0.1.")
-        pipeline = train_model_v01(X_train, y_train)
+        pipeline = train_model_v01(X_train, y_train, scaled)
 
     # Evaluate
-    metrics = evaluate_model(pipeline, X_test, y_test)
+    # Every pipeline's scaler is fitted on X_train, so the cached transform applies
+    metrics = evaluate_model(pipeline, X_test, y_test, split["X_test_scaled"])
+
+    attach_references(pipeline, X_train, X_test, split["X_train_scaled"])
 
     # Save
-    save_artifacts(pipeline, metrics)
+    save_artifacts(pipeline, metrics, search_summary)
 
     print("Training complete!")
 
@@ -0,0 +1,221 @@
+"""
+Array-backed predictor for tree ensembles (gradient boosting, random forests).
+
+Every tree of a fitted ensemble is flattened into shared contiguous arrays:
+split feature, threshold, child pairs and leaf value. Leaf values are
+pre-multiplied by the tree's weight: the learning rate for gradient
+boosting, or ``1 / n_trees`` for a forest. A leaf is stored as a split with
+an infinite threshold whose children are the leaf itself, so every tree can
+be walked for exactly ``max_depth`` levels.
+
+Prediction advances all rows through all trees one level at a time, with no
+per-tree or per-row Python loop:
+
+- Batches of shallow ensembles (``max_depth <= DENSE_MAX_DEPTH``, e.g.
+  boosting) are evaluated as complete trees. Each level evaluates every split of that level
+  for a block of rows with contiguous comparisons and turns them into
+  boolean leaf indicators. One matrix-vector product with the leaf values
+  then sums the ensemble.
+- Deeper ensembles (forests) and small batches follow each row's path: a ``(rows, trees)``
+  matrix of node indices is advanced by gathering split features,
+  thresholds and children.
+
+As in scikit-learn, inputs are standardized in float64 and compared as
+float32. Thresholds are rounded down to float32, which keeps every
+comparison exact, so predictions match ``model.predict``.
+"""
+
+import numpy as np
+
+from src.telemetry import current_timer, timed
+
+# Deepest ensemble scored by dense per-level split evaluation; deeper trees
+# are walked path by path (dense work doubles with every level)
+DENSE_MAX_DEPTH = 4
+
+# Batches smaller than this are walked path by path even when shallow
+DENSE_MIN_ROWS = 16
+
+# Rows scored together by the dense evaluator
+DENSE_CHUNK_ROWS = 256
+
+# Node indices held at once by the path walker (rows x trees)
+PATH_CHUNK_CELLS = 1 << 18
+
+_TREE_LEAF = -1
+
+
+def _ensemble_trees(model):
+    """``(trees, per_tree_weight, base_value)`` of a fitted sklearn ensemble."""
+    estimators = getattr(model, "estimators_", None)
+    if estimators is None:
+        raise ValueError("Model is not a fitted tree ensemble")
+    trees = [est.tree_ for est in np.asarray(estimators, dtype=object).reshape(-1)]
+    if any(tree.value.shape[1:] != (1, 1) for tree in trees):
+        raise ValueError("Only single-output regression trees can be flattened")
+
+    if hasattr(model, "learning_rate"):
+        # Gradient boosting: init prediction plus learning_rate * each tree
+        if isinstance(model.init_, str):
+            base = 0.0
+        else:
+            n_features = model.n_features_in_
+            base = float(model.init_.predict(np.zeros((1, n_features)))[0])
+        return trees, float(model.learning_rate), base
+    return trees, 1.0 / len(trees), 0.0
+
+
+def tree_ensemble_arrays(pipeline):
+    """
+    Flatten a StandardScaler + tree ensemble pipeline into named arrays.
+
+    Raises ValueError if the pipeline is not a scaler followed by a fitted
+    single-output gradient boosting or random forest regressor.
+    """
+    scaler = pipeline.get("scaler")
+    if not hasattr(scaler, "mean_"):
+        raise ValueError("Pipeline has no fitted StandardScaler")
+    trees, weight, base = _ensemble_trees(pipeline.get("model"))
+
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        index = np.arange(tree.node_count) + offset
+        leaf = tree.children_left == _TREE_LEAF
+        features.append(np.where(leaf, 0, tree.feature))
+        thresholds.append(np.where(leaf, np.inf, tree.threshold))
+        left = np.where(leaf, index, tree.children_left + offset)
+        right = np.where(leaf, index, tree.children_right + offset)
+        children.append(np.column_stack([left, right]).reshape(-1))
+        values.append(tree.value[:, 0, 0] * weight)
+        roots.append(offset)
+        offset += tree.node_count
+
+    n_features = len(scaler.mean_)
+    return {
+        "scaler_mean": np.asarray(scaler.mean_, dtype=np.float64),
+        "scaler_scale": np.asarray(
+            np.ones(n_features) if scaler.scale_ is None else scaler.scale_,
+            dtype=np.float64,
+        ),
+        "tree_feature": np.concatenate(features).astype(np.int32),
+        "tree_threshold": np.concatenate(thresholds).astype(np.float64),
+        "tree_children": np.concatenate(children).astype(np.int32),
+        "tree_value": np.concatenate(values).astype(np.float64),
+        "tree_roots": np.asarray(roots, dtype=np.int32),
+        "tree_base": np.asarray([base], dtype=np.float64),
+        "tree_depth": np.asarray([max(t.max_depth for t in trees)], dtype=np.int32),
+    }
+
+
+def float32_thresholds(thresholds):
+    """
+    Largest float32 not above each threshold.
+
+    For any float32 ``x``, ``x > t32`` exactly when ``x > threshold``, so
+    float32 inputs can be compared without widening them to float64.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    rounded = thresholds.astype(np.float32)
+    above = rounded.astype(np.float64) > thresholds
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+class TreeEnsembleEngine:
+    """Tree ensemble evaluated level by level over flattened node arrays."""
+
+    kind = "tree-ensemble"
+
+    def __init__(self, arrays):
+        self.mean = np.asarray(arrays["scaler_mean"], dtype=np.float64)
+        self.scale = np.asarray(arrays["scaler_scale"], dtype=np.float64)
+        # Indices are widened once so traversal never converts them
+        self.feature = np.asarray(arrays["tree_feature"], dtype=np.intp)
+        self.threshold = float32_thresholds(arrays["tree_threshold"])
+        self.children = np.asarray(arrays["tree_children"], dtype=np.intp)
+        self.value = np.asarray(arrays["tree_value"], dtype=np.float64)
+        self.roots = np.asarray(arrays["tree_roots"], dtype=np.intp)
+        self.base = float(np.asarray(arrays["tree_base"]).reshape(-1)[0])
+        self.depth = int(np.asarray(arrays["tree_depth"]).reshape(-1)[0])
+        self.dense = self.depth <= DENSE_MAX_DEPTH
+        if self.dense:
+            self._build_levels()
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """Flatten a scaler + tree ensemble pipeline into an engine."""
+        return cls(tree_ensemble_arrays(pipeline))
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _build_levels(self):
+        """Per-level split tables of the trees padded to complete depth."""
+        nodes = self.roots[:, None]
+        self.levels = []
+        for _ in range(self.depth):
+            self.levels.append(
+                (self.feature[nodes].reshape(-1), self.threshold[nodes].reshape(-1, 1))
+            )
+            # Left children first, then right children: the indicator layout
+            nodes = np.concatenate(
+                [self.children[2 * nodes], self.children[2 * nodes + 1]], axis=1
+            )
+        self.leaf_values = self.value[nodes].reshape(-1)
+
+    def _dense(self, XT):
+        """Ensemble sum for the columns of a transposed float32 block ``XT``."""
+        n_rows = XT.shape[1]
+        reached = np.ones((self.n_trees, 1, n_rows), dtype=bool)
+        for level, (features, thresholds) in enumerate(self.levels):
+            width = 1 << level
+            right = (XT[features] > thresholds).reshape(self.n_trees, width, n_rows)
+            # The last level is written as float64, ready for the product
+            last = level == self.depth - 1
+            nxt = np.empty(
+                (self.n_trees, 2 * width, n_rows), dtype=np.float64 if last else bool
+            )
+            np.greater(reached, right, out=nxt[:, :width])  # reached and not right
+            np.logical_and(reached, right, out=nxt[:, width:])
+            reached = nxt
+        indicators = reached.reshape(-1, n_rows).astype(np.float64, copy=False)
+        return self.leaf_values @ indicators
+
+    def _paths(self, X32):
+        """Ensemble sum for the rows of ``X32``, walking each row's path."""
+        n_rows, n_features = X32.shape
+        flat = X32.reshape(-1)
+        row_start = (np.arange(n_rows) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        for _ in range(self.depth):
+            right = flat[row_start + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.children[2 * nodes + right]
+        return self.value[nodes].sum(axis=1)
+
+    def _predict(self, X):
+        # Same operations as StandardScaler.transform, then sklearn's float32 cast
+        scaled = np.asarray(X, dtype=np.float64) - self.mean
+        scaled /= self.scale
+        out = np.empty(len(scaled), dtype=np.float64)
+        if self.dense and len(out) >= DENSE_MIN_ROWS:
+            XT = scaled.T.astype(np.float32, order="C")
+            for start in range(0, len(out), DENSE_CHUNK_ROWS):
+                stop = start + DENSE_CHUNK_ROWS
+                out[start:stop] = self._dense(XT[:, start:stop])
+        else:
+            X32 = scaled.astype(np.float32)
+            chunk = max(1, PATH_CHUNK_CELLS // self.n_trees)
+            for start in range(0, len(out), chunk):
+                stop = start + chunk
+                out[start:stop] = self._paths(X32[start:stop])
+        out += self.base
+        return out
+
+    def predict(self, X):
+        """Score an (n, n_features) matrix."""
+        if current_timer() is None:
+            return self._predict(X)
+        with timed("predict"):
+            return self._predict(X)
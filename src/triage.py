@@ -0,0 +1,87 @@
+"""
+Risk triage against a reference cohort.
+
+At training time the model scores a reference cohort, and the sorted scores
+are saved with the artifact (``cohort_scores``). At serving time a score's
+percentile is the share of the cohort scoring at or below it. It is found
+with one binary search (``np.searchsorted``, vectorized for batches). The
+percentile is then mapped to a risk tier through fixed cutoffs.
+"""
+
+import os
+
+import numpy as np
+
+# Risk tiers as ``name:upper_percentile`` pairs; the last tier has no bound
+TRIAGE_TIERS = os.getenv("TRIAGE_TIERS", "low:50,moderate:75,high:90,very_high")
+
+
+def parse_tiers(spec):
+    """Parse ``"low:50,moderate:75,high"`` into ``(names, upper_cutoffs)``."""
+    names, cutoffs = [], []
+    for part in spec.split(","):
+        name, _, bound = part.strip().partition(":")
+        names.append(name)
+        if bound:
+            cutoffs.append(float(bound))
+    if len(cutoffs) != len(names) - 1 or cutoffs != sorted(cutoffs):
+        raise ValueError(
+            f"Invalid tier spec {spec!r}: every tier but the last needs an "
+            "increasing percentile bound"
+        )
+    return tuple(names), np.asarray(cutoffs, dtype=np.float64)
+
+
+def cohort_scores(predict, X):
+    """Sorted scores of the reference cohort ``X`` under ``predict``."""
+    return np.sort(np.asarray(predict(X), dtype=np.float64).reshape(-1))
+
+
+class CohortIndex:
+    """Sorted cohort scores answering percentile and tier lookups."""
+
+    def __init__(self, scores, tiers=TRIAGE_TIERS):
+        scores = np.asarray(scores, dtype=np.float64)
+        if scores.ndim != 1 or scores.size == 0:
+            raise ValueError("Cohort scores must be a non-empty 1-D array")
+        if np.any(scores[1:] < scores[:-1]):
+            raise ValueError("Cohort scores must be sorted")
+        self.scores = scores
+        self.tier_names, self.cutoffs = parse_tiers(tiers)
+
+    def __len__(self):
+        return self.scores.size
+
+    def percentile(self, predictions):
+        """Percent of the cohort scoring at or below each prediction."""
+        ranks = np.searchsorted(self.scores, predictions, side="right")
+        return ranks * (100.0 / self.scores.size)
+
+    def tier(self, percentiles):
+        """Tier index of each percentile (``tier_names[index]`` is its name)."""
+        return np.searchsorted(self.cutoffs, percentiles, side="left")
+
+    def triage(self, predictions):
+        """``(percentiles, tier_names)`` lists for a vector of predictions."""
+        percentiles = self.percentile(np.asarray(predictions, dtype=np.float64))
+        tiers = self.tier(percentiles)
+        return percentiles.tolist(), [self.tier_names[t] for t in tiers.tolist()]
+
+
+def top_k(scores, k):
+    """
+    Indices of the ``k`` highest scores, highest first.
+
+    Only the selected ``k`` are sorted: ``argpartition`` finds them in O(n),
+    so ranking costs O(n + k log k) instead of O(n log n).
+    """
+    scores = np.asarray(scores)
+    k = min(k, scores.size)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < scores.size:
+        start = scores.size - k
+        candidates = np.argpartition(scores, start)[start:]
+    else:
+        candidates = np.arange(scores.size)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
@@ -2,6 +2,8 @@
 Tests for the API endpoints.
 """
 
+import json
+import warnings
 from fastapi.testclient import TestClient
 from src.api import app
 
@@ -57,3 +59,427 @@ def test_predict_missing_field():
     }
     response = client.post("/predict", json=payload)
     assert response.status_code == 422  # Validation error
+
+
+def test_predict_rejects_non_finite_values():
+    """Test NaN/Infinity features get a 422 naming the fields, not a 500."""
+    payload = {
+        "age": 0.02,
+        "sex": -0.044,
+        "bmi": 0.06,
+        "bp": -0.03,
+        "s1": -0.02,
+        "s2": 0.03,
+        "s3": -0.02,
+        "s4": 0.02,
+        "s5": 0.02,
+        "s6": -0.001,
+    }
+    body = json.dumps(payload).replace("0.02,", "NaN,", 1).replace("-0.001", "Infinity")
+    response = client.post(
+        "/predict", content=body, headers={"Content-Type": "application/json"}
+    )
+    assert response.status_code == 422
+    assert "age" in response.json()["detail"]
+    assert "s6" in response.json()["detail"]
+
+
+def test_predict_batch_instances():
+    """Test batch prediction with row-oriented instances and IDs."""
+    row = {
+        "age": 0.02,
+        "sex": -0.044,
+        "bmi": 0.06,
+        "bp": -0.03,
+        "s1": -0.02,
+        "s2": 0.03,
+        "s3": -0.02,
+        "s4": 0.02,
+        "s5": 0.02,
+        "s6": -0.001,
+    }
+    payload = {"instances": [dict(row, id="p1"), dict(row, id="p2")]}
+    response = client.post("/predict/batch", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert [p["id"] for p in data["predictions"]] == ["p1", "p2"]
+    assert data["errors"] == []
+
+    single = client.post("/predict", json=row).json()["prediction"]
+    assert abs(data["predictions"][0]["prediction"] - single) < 1e-9
+
+
+def test_predict_batch_columns_with_row_errors():
+    """Test columnar batch where one bad row does not fail the others."""
+    columns = {f: [0.01, 0.02, 0.03] for f in ["age", "sex", "bp", "s1", "s2"]}
+    columns.update({f: [0.0, 0.0, 0.0] for f in ["s3", "s4", "s5", "s6"]})
+    columns["bmi"] = [0.05, "not-a-number", None]
+    payload = {"columns": columns, "ids": ["a", "b", "c"]}
+    response = client.post("/predict/batch", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert [p["index"] for p in data["predictions"]] == [0]
+    assert [e["id"] for e in data["errors"]] == ["b", "c"]
+    assert "bmi" in data["errors"][0]["detail"]
+
+
+def test_predict_batch_rejects_ambiguous_payload():
+    """Test that exactly one of instances or columns must be supplied."""
+    response = client.post("/predict/batch", json={})
+    assert response.status_code == 422
+
+
+def test_batching_stats():
+    """Test the micro-batching stats endpoint."""
+    response = client.get("/stats/batching")
+    assert response.status_code == 200
+    assert "enabled" in response.json()
+
+
+def test_predict_stream_ndjson():
+    """Test streaming NDJSON scoring."""
+    row = {
+        f: 0.01 for f in ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
+    }
+    body = "\n".join(json.dumps(dict(row, id=str(i))) for i in range(3)) + "\n"
+    response = client.post(
+        "/predict/stream?chunk_size=2",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == ["0", "1", "2"]
+    assert all("prediction" in line for line in lines)
+
+
+def test_predict_stream_csv():
+    """Test streaming CSV scoring."""
+    features = ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
+    body = ",".join(features) + "\n" + ",".join(["0.01"] * 10) + "\n"
+    response = client.post(
+        "/predict/stream", content=body, headers={"Content-Type": "text/csv"}
+    )
+    assert response.status_code == 200
+    assert "prediction" in json.loads(response.text.splitlines()[0])
+
+
+def test_list_models():
+    """Test the model listing endpoint."""
+    response = client.get("/models")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["default_version"] in [m["version"] for m in data["models"]]
+
+
+def test_predict_unknown_model_version():
+    """Test selecting a version that is not loaded returns 404."""
+    payload = {
+        f: 0.0 for f in ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
+    }
+    response = client.post(
+        "/predict", json=payload, headers={"X-Model-Version": "v404"}
+    )
+    assert response.status_code == 404
+    response = client.post("/models/v404/predict", json=payload)
+    assert response.status_code == 404
+
+
+def test_predict_by_path_version():
+    """Test selecting the default version explicitly by path."""
+    version = client.get("/health").json()["model_version"]
+    payload = {
+        f: 0.0 for f in ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
+    }
+    response = client.post(f"/models/{version}/predict", json=payload)
+    assert response.status_code == 200
+    assert response.json()["model_version"] == version
+
+
+def test_admin_reload():
+    """Test the reload endpoint reports the served versions."""
+    response = client.post("/admin/reload")
+    assert response.status_code == 200
+    assert "reloaded" in response.json()
+
+
+def test_health_reports_startup_timings():
+    """Test import and model load timings are exposed."""
+    startup = client.get("/health").json()["startup"]
+    assert startup["import_ms"] > 0
+    assert startup["model_load_ms"] >= 0
+    assert "sklearn_imported" in startup
+
+
+def test_predict_cache_hit_and_bypass():
+    """Test repeated vectors hit the cache unless bypassed."""
+    payload = {
+        f: 0.0123
+        for f in ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
+    }
+    first = client.post("/predict", json=payload)
+    second = client.post("/predict", json=payload)
+    bypass = client.post("/predict", json=payload, headers={"X-Cache-Bypass": "true"})
+
+    assert first.headers["X-Cache"] == "miss"
+    assert second.headers["X-Cache"] == "hit"
+    assert bypass.headers["X-Cache"] == "bypass"
+    assert first.json() == second.json() == bypass.json()
+    assert client.get("/stats/cache").json()["hits"] >= 1
+
+
+def test_metrics_endpoint_reports_requests_and_stages():
+    """Test /metrics exposes request counts and per-stage latency."""
+    payload = {
+        f: 0.0 for f in ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
+    }
+    response = client.post("/predict", json=payload, headers={"X-Cache-Bypass": "1"})
+    version = response.headers["X-Model-Version"]
+    client.post("/predict", json={"age": 1.0})
+
+    text = client.get("/metrics").text
+    assert (
+        f'triage_requests_total{{endpoint="/predict",model_version="{version}",'
+        'status="200"}' in text
+    )
+    errors = 'triage_request_errors_total{endpoint="/predict",model_version="none"}'
+    assert errors in text
+    for stage in ("parse", "build_array", "predict", "serialize"):
+        assert f'endpoint="/predict",stage="{stage}"' in text
+    assert "triage_cache_hits_total" in text
+
+
+def test_predict_binary_encodings_match_json():
+    """Test raw float64/float32 bodies are answered in kind and match JSON."""
+    import numpy as np
+
+    row = np.linspace(-0.05, 0.05, 10)
+    payload = dict(
+        zip(["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"], row)
+    )
+    expected = client.post("/predict", json=payload).json()["prediction"]
+
+    for media_type, dtype in [
+        ("application/x-triage-f64", "<f8"),
+        ("application/x-triage-f32", "<f4"),
+    ]:
+        response = client.post(
+            "/predict",
+            content=row.astype(dtype).tobytes(),
+            headers={"Content-Type": media_type},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == media_type
+        assert "X-Model-Version" in response.headers
+        (prediction,) = np.frombuffer(response.content, dtype=dtype)
+        assert abs(prediction - expected) < 1e-3 * max(1.0, abs(expected))
+
+
+def test_predict_batch_binary_marks_invalid_rows():
+    """Test binary batches decode in one go and NaN-fill invalid rows."""
+    import numpy as np
+
+    X = np.zeros((4, 10))
+    X[2, 3] = np.nan
+    response = client.post(
+        "/predict/batch",
+        content=X.tobytes(),
+        headers={"Content-Type": "application/x-triage-f64"},
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Invalid-Rows"] == "1"
+    predictions = np.frombuffer(response.content, dtype="<f8")
+    assert predictions.shape == (4,)
+    assert np.isnan(predictions[2])
+    assert np.isfinite(predictions[[0, 1, 3]]).all()
+    assert len(set(predictions[[0, 1, 3]])) == 1
+
+
+def test_binary_body_errors():
+    """Test malformed binary bodies are rejected with 422."""
+    headers = {"Content-Type": "application/x-triage-f64"}
+    truncated = client.post("/predict/batch", content=b"\0" * 12, headers=headers)
+    two_rows = client.post("/predict", content=b"\0" * 160, headers=headers)
+    assert truncated.status_code == 422
+    assert two_rows.status_code == 422
+
+
+def test_predict_triage_adds_percentile_and_tier():
+    """Test triage=true adds the cohort percentile and risk tier."""
+    payload = {
+        f: 0.05 for f in ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
+    }
+    plain = client.post("/predict", json=payload).json()
+    assert "percentile" not in plain
+
+    data = client.post("/predict?triage=true", json=payload).json()
+    assert 0.0 <= data["percentile"] <= 100.0
+    assert data["risk_tier"] in ("low", "moderate", "high", "very_high")
+    assert data["prediction"] == plain["prediction"]
+
+
+def test_predict_topk_ranks_highest_risk_first():
+    """Test /predict/topk returns the k highest predictions in order."""
+    import numpy as np
+
+    rows = np.random.default_rng(1).normal(0, 0.05, size=(50, 10)).tolist()
+    columns = dict(
+        zip(["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"], zip(*rows))
+    )
+    columns = {k: list(v) for k, v in columns.items()}
+    batch = client.post("/predict/batch", json={"columns": columns}).json()
+    expected = sorted(batch["predictions"], key=lambda p: -p["prediction"])[:5]
+
+    response = client.post("/predict/topk?k=5", json={"columns": columns})
+    assert response.status_code == 200
+    data = response.json()
+    assert [r["index"] for r in data["ranked"]] == [p["index"] for p in expected]
+    assert data["n_scored"] == 50
+    assert all("risk_tier" in r for r in data["ranked"])
+
+
+def test_predict_explain_contributions_sum_to_prediction():
+    """Test explain=true adds contributions summing to prediction - base_value."""
+    payload = {
+        f: 0.03 for f in ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
+    }
+    plain = client.post("/predict", json=payload).json()
+    assert "explanation" not in plain
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        data = client.post("/predict?explain=true", json=payload).json()
+    assert not [str(w.message) for w in caught]
+    explanation = data["explanation"]
+    total = explanation["base_value"] + sum(explanation["contributions"].values())
+    assert abs(total - data["prediction"]) < 1e-6
+    drivers = [abs(d["contribution"]) for d in explanation["top_drivers"]]
+    assert drivers == sorted(drivers, reverse=True)
+    assert max(drivers) == max(abs(c) for c in explanation["contributions"].values())
+
+
+def test_predict_batch_explain_skips_invalid_rows():
+    """Test batch explain=true explains every valid row and none of the errors."""
+    features = ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
+    instances = [{f: 0.01 * i for f in features} for i in range(3)]
+    instances[1]["bmi"] = None
+
+    response = client.post("/predict/batch?explain=true", json={"instances": instances})
+    assert response.status_code == 200
+    data = response.json()
+    assert [p["index"] for p in data["predictions"]] == [0, 2]
+    for item in data["predictions"]:
+        explanation = item["explanation"]
+        total = explanation["base_value"] + sum(explanation["contributions"].values())
+        assert abs(total - item["prediction"]) < 1e-6
+
+
+def test_jobs_submit_poll_and_download(tmp_path):
+    """Test a bulk job is queued, processed by a worker and downloadable."""
+    from src import api
+    from src.jobs import JobStore, run_once
+
+    saved, api.job_store = api.job_store, JobStore(tmp_path)
+    try:
+        features = ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
+        body = "".join(
+            json.dumps({"id": f"p{i}", **{f: 0.01 * i for f in features}}) + "\n"
+            for i in range(7)
+        )
+        response = client.post("/jobs?chunk_size=3", content=body)
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        assert client.get(f"/jobs/{job_id}").json()["status"] == "queued"
+        assert client.get(f"/jobs/{job_id}/result").status_code == 409
+
+        assert run_once(api.job_store, "test", api.MODEL_DIR) == job_id
+        status = client.get(f"/jobs/{job_id}").json()
+        assert status["status"] == "done" and status["rows_done"] == 7
+        lines = client.get(f"/jobs/{job_id}/result").text.splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [f"p{i}" for i in range(7)]
+        assert client.get("/jobs/unknown").status_code == 404
+        assert client.post("/jobs?source=../../etc/passwd").status_code == 400
+    finally:
+        api.job_store = saved
+
+
+def test_trusted_fast_path_matches_validated_path():
+    """Test trusted routes score like the regular ones and reject rows by index."""
+    from src import api
+
+    features = ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
+    instances = [{"id": f"p{i}", **{f: 0.01 * i for f in features}} for i in range(4)]
+    instances[1]["bmi"] = None
+    instances[2]["age"] = 59.0  # unstandardized value
+
+    regular = client.post("/predict", json=instances[0]).json()
+    trusted = client.post("/trusted/predict", json=instances[0]).json()
+    assert trusted["prediction"] == regular["prediction"]
+    response = client.post("/trusted/predict", json=instances[2])
+    assert response.status_code == 422 and "age" in response.json()["detail"]
+
+    response = client.post("/trusted/predict/batch", json={"instances": instances})
+    assert response.status_code == 200
+    data = response.json()
+    assert [p["id"] for p in data["predictions"]] == ["p0", "p3"]
+    assert [(e["index"], e["id"]) for e in data["errors"]] == [(1, "p1"), (2, "p2")]
+    assert "Out of range" in data["errors"][1]["detail"]
+    columns = {f: [row[f] for row in instances] for f in features}
+    columnar = client.post("/trusted/predict/batch", json={"columns": columns}).json()
+    assert (
+        columnar["predictions"][1]["prediction"] == data["predictions"][1]["prediction"]
+    )
+    assert client.post("/trusted/predict/batch", json={}).status_code == 422
+
+    saved, api.TRUSTED_API_KEYS = api.TRUSTED_API_KEYS, frozenset({"etl-key"})
+    try:
+        assert client.post("/trusted/predict", json=instances[0]).status_code == 403
+        response = client.post(
+            "/predict/batch",
+            json={"instances": instances},
+            headers={"X-API-Key": "etl-key"},
+        )
+        assert len(response.json()["errors"]) == 2
+    finally:
+        api.TRUSTED_API_KEYS = saved
+
+
+def test_audit_log_records_scored_rows(tmp_path):
+    """Test /predict and /predict/batch rows are written to the audit log."""
+    from src import api
+    from src.audit import AuditLog, scan
+
+    features = ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
+    instances = [{f: 0.01 * i for f in features} for i in range(3)]
+    instances[1]["bmi"] = None
+
+    saved, api.audit_log = api.audit_log, AuditLog(tmp_path, flush_interval=60)
+    try:
+        single = client.post("/predict", json=instances[0]).json()
+        batch = client.post("/predict/batch", json={"instances": instances}).json()
+        assert client.get("/stats/audit").json()["buffered"] == 3
+        api.audit_log.close()
+    finally:
+        api.audit_log = saved
+
+    predictions = [x for _, _, _, p in scan(tmp_path) for x in p.tolist()]
+    expected = [single["prediction"]] + [p["prediction"] for p in batch["predictions"]]
+    assert predictions == expected
+
+
+def test_drift_report_counts_served_rows():
+    """Test scored rows feed the version's drift statistics and PSI."""
+    features = ["age", "sex", "bmi", "bp", "s1", "s2", "s3", "s4", "s5", "s6"]
+    before = client.get("/drift").json()
+    assert before["enabled"] and before["reference"] == "training"
+
+    instances = [{f: 0.01 * (i % 5) for f in features} for i in range(20)]
+    client.post("/predict/batch", json={"instances": instances})
+    client.post("/predict", json=instances[0])
+
+    version = before["model_version"]
+    report = client.get(f"/models/{version}/drift").json()
+    assert report["rows"] == before["rows"] + 21
+    assert set(report["features"]) == set(features)
+    assert report["prediction"]["psi"] is not None
+    assert client.get("/models/v9.9/drift").status_code == 404
@@ -0,0 +1,70 @@
+"""
+Tests for the binary model artifact format.
+"""
+
+import numpy as np
+import pytest
+from src.artifact import (
+    ArtifactError,
+    linear_pipeline_arrays,
+    load_artifact,
+    save_artifact,
+)
+from src.features import FEATURE_NAMES
+from src.inference import SklearnEngine, engine_from_artifact
+from src.train import load_data, train_model_v02
+
+
+def _save_v02(path):
+    X, y = load_data()
+    pipeline = train_model_v02(X[:300], y[:300])
+    save_artifact(path, linear_pipeline_arrays(pipeline), "linear", FEATURE_NAMES)
+    return pipeline, X[300:].to_numpy()
+
+
+def test_artifact_round_trip(tmp_path):
+    """Test arrays and header survive a save/load cycle."""
+    arrays = {"a": np.arange(5, dtype=np.float64), "b": np.eye(3)}
+    path = tmp_path / "model.bin"
+    save_artifact(path, arrays, "linear", FEATURE_NAMES, metadata={"version": "v9"})
+
+    artifact = load_artifact(path)
+
+    assert artifact.model_type == "linear"
+    assert artifact.feature_names == FEATURE_NAMES
+    assert artifact.metadata["version"] == "v9"
+    assert np.array_equal(artifact.arrays["a"], arrays["a"])
+    assert np.array_equal(artifact.arrays["b"], arrays["b"])
+    assert not artifact.arrays["a"].flags.writeable
+
+
+def test_artifact_engine_matches_pickle(tmp_path):
+    """Test the engine built from the artifact matches the sklearn pipeline."""
+    path = tmp_path / "model.bin"
+    pipeline, X_test = _save_v02(path)
+
+    engine = engine_from_artifact(load_artifact(path))
+
+    expected = SklearnEngine(pipeline).predict(X_test)
+    assert np.allclose(engine.predict(X_test), expected, atol=1e-8)
+
+
+def test_corrupted_artifact_is_rejected(tmp_path):
+    """Test checksum verification catches modified weights."""
+    path = tmp_path / "model.bin"
+    _save_v02(path)
+    data = bytearray(path.read_bytes())
+    data[-64] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(ArtifactError, match="Checksum"):
+        load_artifact(path)
+
+
+def test_non_artifact_file_is_rejected(tmp_path):
+    """Test files without the magic prefix are rejected."""
+    path = tmp_path / "model.pkl"
+    path.write_bytes(b"\x80\x04not an artifact at all")
+
+    with pytest.raises(ArtifactError, match="magic"):
+        load_artifact(path)
@@ -0,0 +1,121 @@
+"""
+Tests for the prediction audit log: buffering, flushing, rotation and reading.
+"""
+
+import numpy as np
+import pytest
+
+from src.audit import AuditBackpressureError, AuditLog, log_files, main, read_file, scan
+from src.features import N_FEATURES
+
+
+class _Clock:
+    def __init__(self, now=1_800_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 0.05, size=(n, N_FEATURES)), rng.normal(150, 50, size=n)
+
+
+def _collect(blocks):
+    blocks = list(blocks)
+    if not blocks:
+        return np.empty(0), [], np.empty((0, N_FEATURES)), np.empty(0)
+    t, v, X, p = zip(*blocks)
+    return np.concatenate(t), [x for b in v for x in b], np.vstack(X), np.concatenate(p)
+
+
+def test_rows_round_trip_with_time_and_version_filters(tmp_path):
+    """Test recorded rows are read back exactly and filtered by time and version."""
+    clock = _Clock()
+    log = AuditLog(tmp_path, capacity=100, flush_interval=60, clock=clock)
+    X, p = _rows(6)
+    log.record("v0.1", X[:3], p[:3])
+    clock.now += 10
+    assert log.offer("v0.2", X[3:5], p[3:5])
+    log.flush()
+    clock.now += 10
+    log.record("v0.1", X[5:], p[5:])
+    log.close()
+
+    t, versions, X_read, p_read = _collect(scan(tmp_path))
+    np.testing.assert_array_equal(X_read, X)
+    np.testing.assert_array_equal(p_read, p)
+    assert versions == ["v0.1"] * 3 + ["v0.2"] * 2 + ["v0.1"]
+
+    t, versions, _, p_read = _collect(scan(tmp_path, start=clock.now - 15))
+    assert versions == ["v0.2", "v0.2", "v0.1"]
+    _, versions, _, p_read = _collect(scan(tmp_path, version="v0.1", end=clock.now))
+    np.testing.assert_array_equal(p_read, p[:3])
+
+
+def test_ring_wraps_and_files_rotate(tmp_path):
+    """Test a small ring and file size limit keep every row in order."""
+    log = AuditLog(tmp_path, capacity=8, flush_interval=60, max_file_bytes=1024)
+    X, p = _rows(50, seed=1)
+    for start in range(0, 50, 5):
+        stop = start + 5
+        log.record("v0.1", X[start:stop], p[start:stop])
+        log.flush()
+    log.close()
+
+    assert len(log_files(tmp_path)) > 1
+    _, _, X_read, p_read = _collect(scan(tmp_path))
+    np.testing.assert_array_equal(X_read, X)
+    np.testing.assert_array_equal(p_read, p)
+    assert log.stats()["rows_written"] == 50
+
+
+def test_full_buffer_applies_backpressure(tmp_path):
+    """Test recording fails once the writer cannot drain the buffer."""
+    blocked = tmp_path / "not-a-dir"
+    blocked.write_text("")
+    log = AuditLog(blocked, capacity=4, flush_interval=60, block_timeout=0.05)
+    X, p = _rows(6)
+    log.record("v0.1", X[:3], p[:3])
+    assert not log.offer("v0.1", X[3:5], p[3:5])
+    # Two rows do not fit, so neither is kept
+    with pytest.raises(AuditBackpressureError):
+        log.record("v0.1", X[3:5], p[3:5])
+    assert log.flush() == 0
+    stats = log.stats()
+    assert stats["buffered"] == 3 and stats["write_errors"] >= 1
+    assert stats["backpressure_waits"] >= 1
+    log.close()
+
+
+def test_batch_larger_than_buffer_is_written_in_order(tmp_path):
+    """Test an oversized batch is written as its own block after buffered rows."""
+    log = AuditLog(tmp_path, capacity=4, flush_interval=60)
+    X, p = _rows(12)
+    log.record("v0.1", X[:2], p[:2])
+    log.record("v0.2", X[2:], p[2:])
+    assert log.stats()["buffered"] == 0
+    log.close()
+
+    _, versions, X_read, p_read = _collect(scan(tmp_path))
+    np.testing.assert_array_equal(X_read, X)
+    np.testing.assert_array_equal(p_read, p)
+    assert versions == ["v0.1"] * 2 + ["v0.2"] * 10
+
+
+def test_truncated_block_and_count_cli(tmp_path, capsys):
+    """Test a block cut short by a crash is ignored and the CLI counts rows."""
+    log = AuditLog(tmp_path, capacity=16, flush_interval=60)
+    X, p = _rows(5)
+    log.record("v0.1", X[:3], p[:3])
+    log.flush()
+    log.record("v0.2", X[3:], p[3:])
+    log.close()
+    path = log_files(tmp_path)[0]
+    path.write_bytes(path.read_bytes()[:-7])
+
+    _, versions, _, _ = _collect(read_file(path))
+    assert versions == ["v0.1"] * 3
+    main(["--dir", str(tmp_path), "--count"])
+    assert capsys.readouterr().out.splitlines() == ["v0.1  3", "3 rows"]
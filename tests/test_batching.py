@@ -0,0 +1,86 @@
+"""
+Tests for the micro-batching scheduler.
+"""
+
+import asyncio
+import contextvars
+import numpy as np
+import pytest
+from src.batching import MicroBatcher
+
+
+def _run_concurrently(batcher, rows):
+    async def _main():
+        results = await asyncio.gather(*(batcher.submit(r) for r in rows))
+        await batcher.close()
+        return results
+
+    return asyncio.run(_main())
+
+
+def test_concurrent_requests_are_coalesced():
+    """Test concurrent rows are scored in one call and routed back in order."""
+    calls = []
+
+    def score(X):
+        calls.append(X.shape[0])
+        return X.sum(axis=1)
+
+    batcher = MicroBatcher(score, window_ms=50, max_batch_size=64)
+    rows = [np.full(10, i, dtype=float) for i in range(8)]
+
+    results = _run_concurrently(batcher, rows)
+
+    assert results == [10.0 * i for i in range(8)]
+    assert calls == [8]
+    assert batcher.stats()["batch_size_histogram"]["buckets"]["8"] == 1
+
+
+def test_worker_does_not_inherit_request_context():
+    """Test the worker task does not keep the first caller's context variables."""
+    request = contextvars.ContextVar("request", default=None)
+    seen = []
+
+    def score(X):
+        seen.append(request.get())
+        return X.sum(axis=1)
+
+    batcher = MicroBatcher(score, window_ms=1)
+
+    async def _main():
+        request.set("first")
+        await batcher.submit(np.zeros(10))
+        await batcher.close()
+
+    asyncio.run(_main())
+    assert seen == [None]
+
+
+def test_max_batch_size_splits_batches():
+    """Test a batch never exceeds the configured maximum size."""
+    calls = []
+
+    def score(X):
+        calls.append(X.shape[0])
+        return X[:, 0]
+
+    batcher = MicroBatcher(score, window_ms=50, max_batch_size=3)
+    rows = [np.full(10, i, dtype=float) for i in range(7)]
+
+    results = _run_concurrently(batcher, rows)
+
+    assert results == [float(i) for i in range(7)]
+    assert max(calls) <= 3
+    assert sum(calls) == 7
+
+
+def test_scoring_errors_propagate_to_callers():
+    """Test a failing model call raises in every waiting handler."""
+
+    def score(X):
+        raise RuntimeError("model exploded")
+
+    batcher = MicroBatcher(score, window_ms=1)
+
+    with pytest.raises(RuntimeError, match="model exploded"):
+        _run_concurrently(batcher, [np.zeros(10)])
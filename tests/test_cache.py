@@ -0,0 +1,87 @@
+"""
+Tests for the prediction cache.
+"""
+
+import numpy as np
+from src.cache import PredictionCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_and_miss_counters():
+    """Test repeated keys hit and new keys miss."""
+    cache = PredictionCache(maxsize=10)
+    key = cache.key("v0.1", np.zeros(10))
+
+    assert cache.get(key) is None
+    cache.put(key, 150.0)
+    assert cache.get(key) == 150.0
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_lru_eviction():
+    """Test the least recently used entry is evicted when full."""
+    cache = PredictionCache(maxsize=2)
+    a, b, c = (cache.key("v", np.full(10, i)) for i in range(3))
+    cache.put(a, 1.0)
+    cache.put(b, 2.0)
+    cache.get(a)
+    cache.put(c, 3.0)
+
+    assert cache.get(b) is None
+    assert cache.get(a) == 1.0
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    """Test entries expire after the TTL."""
+    clock = FakeClock()
+    cache = PredictionCache(ttl=10.0, clock=clock)
+    key = cache.key("v", np.zeros(10))
+    cache.put(key, 1.0)
+
+    clock.now = 11.0
+
+    assert cache.get(key) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_quantization_absorbs_float_noise():
+    """Test nearby vectors share a key when quantization is enabled."""
+    row = np.full(10, 0.0123456)
+    exact = PredictionCache()
+    quantized = PredictionCache(quantum=1e-6)
+
+    assert exact.key("v", row) != exact.key("v", row + 1e-12)
+    assert quantized.key("v", row) == quantized.key("v", row + 1e-12)
+
+
+def test_clear_by_version():
+    """Test clearing one version leaves other versions cached."""
+    cache = PredictionCache()
+    old, new = cache.key("v0.1", np.zeros(10)), cache.key("v0.2", np.zeros(10))
+    cache.put(old, 1.0)
+    cache.put(new, 2.0)
+
+    cache.clear("v0.1")
+
+    assert cache.get(old) is None
+    assert cache.get(new) == 2.0
+
+
+def test_replaced_instance_misses():
+    """Test a late write from a replaced model is not served by its successor."""
+    cache = PredictionCache()
+    row = np.zeros(10)
+    cache.clear("v0.1")
+    cache.put(cache.key("v0.1", row, instance=1.0), 1.0)
+
+    assert cache.get(cache.key("v0.1", row, instance=2.0)) is None
@@ -0,0 +1,94 @@
+"""
+Tests for the binary request/response encodings.
+"""
+
+import numpy as np
+import pytest
+
+from src.codec import (
+    F32_MEDIA_TYPE,
+    F64_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    CodecError,
+    binary_request_body,
+    negotiate,
+)
+
+
+def test_negotiate_by_content_type():
+    """Test Content-Type selects the codec and JSON falls through to None."""
+    assert negotiate(F64_MEDIA_TYPE).media_type == F64_MEDIA_TYPE
+    assert negotiate("Application/X-Triage-F32; charset=binary").media_type == (
+        F32_MEDIA_TYPE
+    )
+    assert negotiate("application/json") is None
+    assert negotiate(None) is None
+
+
+def test_raw_decode_is_zero_copy_view():
+    """Test raw bodies decode to an (n, 10) view of the request bytes."""
+    X = np.arange(30, dtype="<f8").reshape(3, 10)
+    body = X.tobytes()
+    decoded = negotiate(F64_MEDIA_TYPE).decode(body)
+    assert decoded.shape == (3, 10)
+    assert np.array_equal(decoded, X)
+    assert not decoded.flags.owndata
+
+
+def test_raw_roundtrip_keeps_request_dtype():
+    """Test responses are encoded in the dtype of the request."""
+    codec = negotiate(F32_MEDIA_TYPE)
+    body = codec.encode(np.array([1.5, np.nan]), [1], "v1")
+    assert len(body) == 8
+    decoded = np.frombuffer(body, dtype="<f4")
+    assert decoded[0] == 1.5 and np.isnan(decoded[1])
+
+
+def test_raw_decode_rejects_partial_rows():
+    """Test bodies that are not whole rows raise CodecError."""
+    with pytest.raises(CodecError):
+        negotiate(F64_MEDIA_TYPE).decode(b"\0" * 81)
+    with pytest.raises(CodecError):
+        negotiate(F32_MEDIA_TYPE).decode(b"")
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"data": "not bytes"},
+        {"data": [0.0] * 10},
+        {"rows": [[0.0] * 10, [0.0] * 9]},
+        {"rows": [[0.0] * 10, 5]},
+        {"rows": [["a"] * 10, {"x": 1}]},
+        {"rows": "abc"},
+    ],
+)
+def test_msgpack_malformed_payload_raises_codec_error(payload):
+    """Test malformed MessagePack maps raise CodecError (a 4xx), not a 500."""
+    with pytest.raises(CodecError):
+        negotiate(MSGPACK_MEDIA_TYPE).decode_payload(payload)
+
+
+def test_msgpack_non_numeric_rows_become_nan():
+    """Test well-shaped rows with unusable values are left to the finite check."""
+    X = negotiate(MSGPACK_MEDIA_TYPE).decode_payload({"rows": [["a"] + [0.0] * 9]})
+    assert X.shape == (1, 10) and np.isnan(X[0, 0])
+
+
+def test_msgpack_body_with_bad_rows_is_rejected():
+    """Test a packed body with ragged rows fails to decode cleanly."""
+    msgpack = pytest.importorskip("msgpack")
+    body = msgpack.packb({"rows": [[0.0] * 10, [0.0] * 3]})
+    with pytest.raises(CodecError):
+        negotiate(MSGPACK_MEDIA_TYPE).decode(body)
+
+
+def test_openapi_request_body_lists_every_encoding():
+    """Test the OpenAPI requestBody advertises JSON and the binary types."""
+    content = binary_request_body({"type": "object"})["requestBody"]["content"]
+    assert set(content) == {
+        "application/json",
+        "application/x-triage-f64",
+        "application/x-triage-f32",
+        "application/msgpack",
+    }
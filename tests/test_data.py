@@ -0,0 +1,68 @@
+"""
+Tests for chunked training data sources.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data import open_source, row_uniforms, split_chunks
+from src.features import FEATURE_NAMES
+
+
+def _frame(n_rows=25):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.normal(size=(n_rows, 10)), columns=FEATURE_NAMES)
+    frame["target"] = np.arange(n_rows, dtype=float)
+    return frame
+
+
+def test_csv_source_streams_chunks_in_feature_order(tmp_path):
+    """Test CSV chunks respect chunk_size and reorder columns."""
+    frame = _frame()
+    path = tmp_path / "data.csv"
+    frame[["target"] + FEATURE_NAMES[::-1]].to_csv(path, index=False)
+
+    chunks = list(open_source(path, chunk_size=10))
+    assert [len(y) for _, y in chunks] == [10, 10, 5]
+    X = np.vstack([X for X, _ in chunks])
+    np.testing.assert_allclose(X, frame[FEATURE_NAMES].to_numpy())
+
+
+def test_npy_source_memmaps_with_target_column(tmp_path):
+    """Test .npy matrices yield features and the trailing target column."""
+    frame = _frame()
+    path = tmp_path / "data.npy"
+    np.save(path, frame.to_numpy())
+
+    X, y = next(iter(open_source(path, chunk_size=100)))
+    assert X.shape == (25, 10)
+    np.testing.assert_array_equal(y, frame["target"].to_numpy())
+
+
+def test_unsupported_extension_and_missing_columns(tmp_path):
+    """Test unknown formats and incomplete CSVs are rejected."""
+    with pytest.raises(ValueError, match="Unsupported"):
+        open_source(tmp_path / "data.json")
+
+    path = tmp_path / "data.csv"
+    _frame().drop(columns=["bmi"]).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        list(open_source(path))
+
+
+def test_split_is_independent_of_chunking(tmp_path):
+    """Test rows land in the same split whatever the chunk size."""
+    path = tmp_path / "data.csv"
+    frame = _frame(200)
+    frame.loc[3, "bmi"] = np.nan
+    frame.to_csv(path, index=False)
+
+    def test_targets(chunk_size):
+        parts = list(split_chunks(open_source(path, chunk_size=chunk_size)))
+        return np.concatenate([p[3] for p in parts]), sum(p[4] for p in parts)
+
+    (small, dropped), (large, _) = test_targets(7), test_targets(1000)
+    np.testing.assert_array_equal(small, large)
+    assert dropped == 1
+    assert 0.1 < (row_uniforms(np.arange(10000), 42) < 0.2).mean() < 0.3
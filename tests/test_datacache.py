@@ -0,0 +1,91 @@
+"""
+Tests for the training data and transform cache.
+"""
+
+import os
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from src.datacache import DataCache, load_split
+from src.train import load_data
+
+
+def test_split_matches_train_test_split_and_hits_as_memmap(tmp_path):
+    """Test a cached split equals sklearn's and is served as memory maps."""
+    cache = DataCache(tmp_path)
+    first = load_split(test_size=0.2, seed=42, cache=cache)
+    second = load_split(test_size=0.2, seed=42, cache=cache)
+
+    X, y = load_data()
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+    assert np.array_equal(second["X_train"], X_train.to_numpy())
+    assert np.array_equal(second["y_test"], y_test.to_numpy())
+    assert isinstance(second["X_test"], np.memmap)
+    assert cache.hits == 2 and cache.misses == 2
+    assert np.array_equal(first["X_test_scaled"], second["X_test_scaled"])
+
+    scaler = StandardScaler().fit(X_train)
+    cached = second["scaler"]
+    assert np.allclose(cached.transform(X_test), scaler.transform(X_test))
+    assert np.allclose(second["X_test_scaled"], scaler.transform(X_test))
+    assert list(cached.feature_names_in_) == list(X.columns)
+
+
+def test_seed_and_test_size_change_the_key(tmp_path):
+    """Test different split parameters get their own entries."""
+    cache = DataCache(tmp_path)
+    a = load_split(test_size=0.2, seed=1, cache=cache)
+    b = load_split(test_size=0.2, seed=2, cache=cache)
+    c = load_split(test_size=0.3, seed=1, cache=cache)
+    assert not np.array_equal(a["X_train"], b["X_train"])
+    assert len(c["X_test"]) > len(a["X_test"])
+    # One dataset entry plus three splits
+    assert len(cache.entries()) == 4
+
+
+def test_supplied_dataset_gets_its_own_split(tmp_path):
+    """Test a split cached for one supplied dataset is not reused for another."""
+    cache = DataCache(tmp_path)
+    rng = np.random.default_rng(0)
+    first = {"X": rng.normal(size=(50, 10)), "y": rng.normal(size=50)}
+    second = {"X": first["X"] + 1.0, "y": first["y"]}
+
+    a = load_split(test_size=0.2, seed=1, cache=cache, dataset=first)
+    b = load_split(test_size=0.2, seed=1, cache=cache, dataset=second)
+    again = load_split(test_size=0.2, seed=1, cache=cache, dataset=first)
+
+    assert np.array_equal(b["X_train"], a["X_train"] + 1.0)
+    assert np.array_equal(again["X_train"], a["X_train"])
+    assert len(cache.entries()) == 2
+
+
+def test_corrupt_entry_is_rebuilt(tmp_path):
+    """Test an entry that no longer loads is dropped and rebuilt."""
+    cache = DataCache(tmp_path)
+    key = cache.key(kind="test")
+    cache.put(key, {"a": np.arange(5.0)})
+    (tmp_path / key / "a.npy").write_bytes(b"not an array")
+
+    assert cache.get(key) is None
+    assert not (tmp_path / key).exists()
+    arrays = cache.get_or_build(key, lambda: {"a": np.arange(3.0)})
+    assert list(arrays["a"]) == [0.0, 1.0, 2.0]
+    assert list(cache.get(key)["a"]) == [0.0, 1.0, 2.0]
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    """Test the size bound evicts the entry used longest ago."""
+    cache = DataCache(tmp_path, max_bytes=20_000)
+    keys = [cache.key(kind="test", i=i) for i in range(3)]
+    for i, key in enumerate(keys[:2]):
+        cache.put(key, {"a": np.zeros(1000)})
+        os.utime(tmp_path / key / "meta.json", (i, i))
+    cache.get(keys[0])
+
+    cache.put(keys[2], {"a": np.zeros(1000)})
+    remaining = {key for key, _, _ in cache.entries()}
+    assert remaining == {keys[0], keys[2]}
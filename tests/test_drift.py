@@ -0,0 +1,100 @@
+"""
+Tests for streaming drift statistics and PSI scoring.
+"""
+
+import numpy as np
+
+from src.drift import (
+    DriftMonitor,
+    DriftReference,
+    KLLSketch,
+    RunningMoments,
+    normal_bins,
+    psi,
+    reference_bins,
+)
+from src.features import FEATURE_NAMES
+
+
+def test_running_moments_match_numpy_across_batches():
+    """Test batch-merged mean and std equal a single pass over all rows."""
+    X = np.random.default_rng(0).normal(3.0, 2.0, size=(5000, 4))
+    moments = RunningMoments(4)
+    for start in range(0, 5000, 777):
+        stop = start + 777
+        moments.update(X[start:stop])
+    assert moments.count == 5000
+    np.testing.assert_allclose(moments.mean, X.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(moments.std, X.std(axis=0, ddof=1), rtol=1e-10)
+
+
+def test_kll_sketch_quantiles_within_rank_error():
+    """Test sketch quantiles stay close in rank while memory stays bounded."""
+    X = np.random.default_rng(1).normal(size=(200_000, 3))
+    sketch = KLLSketch(3, k=200)
+    for start in range(0, len(X), 1024):
+        stop = start + 1024
+        sketch.update(X[start:stop])
+    qs = np.array([0.05, 0.5, 0.95])
+    ranks = (X[None, :, :] <= sketch.quantiles(qs)[:, None, :]).mean(axis=1)
+    assert np.abs(ranks - qs[:, None]).max() < 0.02
+    assert sketch.size < 1000
+
+
+def test_psi_flags_shifted_feature_only():
+    """Test PSI against training bins is near zero until a feature shifts."""
+    rng = np.random.default_rng(2)
+    n = len(FEATURE_NAMES)
+    X_train = rng.normal(0, 0.05, size=(2000, n))
+    X_train[:, 1] = rng.choice([-0.04, 0.05], size=2000)
+    reference = DriftReference(
+        X_train.mean(axis=0), X_train.std(axis=0), reference_bins(X_train)
+    )
+    edges, shares = reference_bins(X_train)
+    assert np.allclose(shares.sum(axis=0), 1.0) and shares[:, 1].min() == 0.0
+
+    monitor = DriftMonitor(reference, buffer_rows=64)
+    X_live = rng.normal(0, 0.05, size=(3000, n))
+    X_live[:, 1] = rng.choice([-0.04, 0.05], size=3000)
+    X_live[:, 2] += 0.05
+    for start in range(0, 3000, 10):
+        stop = start + 10
+        monitor.observe(X_live[start:stop], np.zeros(10))
+    report = monitor.report()
+    assert report["rows"] == 3000 and report["drifted"] == ["bmi"]
+    assert report["features"]["bmi"]["mean_shift"] > 0.9
+    assert report["features"]["sex"]["psi"] < 0.05
+    assert report["prediction"]["psi"] is None
+
+
+def test_normal_bins_and_empty_monitor():
+    """Test the scaler-only fallback and a report before any traffic."""
+    edges, shares = normal_bins(np.zeros(2), np.ones(2))
+    assert np.allclose(edges[4], 0.0) and np.allclose(shares, 0.1)
+    assert psi(shares, shares).tolist() == [0.0, 0.0]
+
+    reference = DriftReference(
+        np.zeros(len(FEATURE_NAMES)),
+        np.ones(len(FEATURE_NAMES)),
+        cohort_scores=np.linspace(50, 300, 100),
+    )
+    report = DriftMonitor(reference).report()
+    assert report["rows"] == 0 and report["reference"] == "normal"
+    assert report["features"]["age"]["psi"] is None and report["drifted"] == []
+
+
+def test_non_finite_rows_are_skipped():
+    """Test a NaN row is left out instead of poisoning the statistics."""
+    n = len(FEATURE_NAMES)
+    reference = DriftReference(np.zeros(n), np.ones(n))
+    monitor = DriftMonitor(reference, buffer_rows=4)
+    X = np.random.default_rng(3).normal(size=(20, n))
+    X[5, 0] = np.nan
+    predictions = np.ones(20)
+    predictions[7] = np.inf
+    monitor.observe(X[:10], predictions[:10])
+    monitor.observe(X[10:], predictions[10:])
+    report = monitor.report()
+    assert report["rows"] == 18 and report["skipped_rows"] == 2
+    assert report["features"]["age"]["mean"] is not None
+    assert report["features"]["age"]["quantiles"]["p50"] is not None
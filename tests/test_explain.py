@@ -0,0 +1,62 @@
+"""
+Tests for per-feature contribution explanations.
+"""
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import StandardScaler
+
+from src.explain import LinearExplainer
+from src.features import FEATURE_NAMES
+
+
+def _pipeline(seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 0.05, size=(200, len(FEATURE_NAMES)))
+    y = X @ rng.normal(0, 100, size=len(FEATURE_NAMES)) + 150
+    scaler = StandardScaler().fit(X)
+    model = LinearRegression().fit(scaler.transform(X), y)
+    return {"scaler": scaler, "model": model}, X
+
+
+def test_contributions_sum_to_prediction():
+    """Test each row's contributions add up to prediction - base_value."""
+    pipeline, X = _pipeline()
+    explainer = LinearExplainer.from_pipeline(pipeline)
+    predictions = pipeline["model"].predict(pipeline["scaler"].transform(X))
+
+    contributions = explainer.contributions(X)
+    assert contributions.shape == X.shape
+    np.testing.assert_allclose(
+        explainer.base_value + contributions.sum(axis=1), predictions, atol=1e-9
+    )
+
+
+def test_top_drivers_match_full_sort():
+    """Test argpartition-based top drivers equal a full sort by magnitude."""
+    pipeline, X = _pipeline(1)
+    explainer = LinearExplainer.from_pipeline(pipeline)
+    contributions = explainer.contributions(X)
+
+    expected = np.argsort(-np.abs(contributions), axis=1)
+    for k in (1, 3, len(FEATURE_NAMES), 50):
+        top = explainer.top_drivers(contributions, k)
+        np.testing.assert_array_equal(top, expected[:, : min(k, len(FEATURE_NAMES))])
+
+
+def test_explain_uses_feature_names():
+    """Test explanations are keyed by feature name."""
+    pipeline, X = _pipeline()
+    (explanation,) = LinearExplainer.from_pipeline(pipeline).explain(X[:1], k=2)
+    assert list(explanation["contributions"]) == FEATURE_NAMES
+    assert len(explanation["top_drivers"]) == 2
+    assert explanation["top_drivers"][0]["feature"] in FEATURE_NAMES
+
+
+def test_non_linear_pipeline_is_rejected():
+    """Test from_pipeline raises ValueError for models without coefficients."""
+    pipeline, _ = _pipeline()
+    pipeline["model"] = object()
+    with pytest.raises((ValueError, AttributeError)):
+        LinearExplainer.from_pipeline(pipeline)
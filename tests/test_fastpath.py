@@ -0,0 +1,58 @@
+"""
+Tests for the trusted-client fast path parsers and vectorized row checks.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from src.fastpath import FastPathError, parse_batch, parse_row
+from src.features import FEATURE_NAMES, row_error, rows_to_matrix, valid_rows
+
+
+def _instances(n):
+    return [{f: 0.001 * (i + j) for j, f in enumerate(FEATURE_NAMES)} for i in range(n)]
+
+
+def test_parse_batch_matches_rows_to_matrix():
+    """Test both layouts parse to the matrix the validated path builds."""
+    instances = _instances(5)
+    instances[3]["s2"] = "n/a"
+    del instances[4]["bp"]
+    expected = rows_to_matrix(instances)
+
+    X, row_ids = parse_batch(json.dumps({"instances": instances}))
+    np.testing.assert_array_equal(X, expected)
+    assert row_ids == [None] * 5
+
+    columns = {f: expected[:, j].tolist() for j, f in enumerate(FEATURE_NAMES)}
+    body = json.dumps({"columns": columns, "ids": list(range(5))})
+    X, row_ids = parse_batch(body.replace("NaN", "null"))
+    np.testing.assert_array_equal(X, expected)
+    assert row_ids == ["0", "1", "2", "3", "4"]
+
+
+def test_parse_rejects_malformed_bodies():
+    """Test malformed payloads raise FastPathError."""
+    for body in ("{", "[]", "{}", '{"instances": 3}', '{"columns": {"age": [1]}}'):
+        with pytest.raises(FastPathError):
+            parse_batch(body)
+    with pytest.raises(FastPathError, match="ids"):
+        parse_batch(json.dumps({"instances": _instances(2), "ids": ["a"]}))
+    with pytest.raises(FastPathError, match="s6"):
+        parse_row(json.dumps({f: 0.0 for f in FEATURE_NAMES[:-1]}))
+    assert parse_row(json.dumps(_instances(1)[0])).shape == (1, len(FEATURE_NAMES))
+
+
+def test_valid_rows_flags_non_finite_and_out_of_range():
+    """Test the vectorized check and the per-row error messages."""
+    X = rows_to_matrix(_instances(4))
+    assert valid_rows(X).all()
+    X[1, 0] = np.nan
+    X[2, 2] = 27.3
+    X[3, 5] = -np.inf
+    assert valid_rows(X).tolist() == [True, False, False, False]
+    assert valid_rows(X, limit=np.inf).tolist() == [True, False, True, False]
+    assert row_error(X[2], 1.0) == "Out of range (|value| > 1) for: bmi"
+    assert row_error(X[1], 1.0).startswith("Missing or non-numeric value for: age")
@@ -0,0 +1,94 @@
+"""
+Tests for one-pass training from sufficient statistics.
+"""
+
+import numpy as np
+import pytest
+from sklearn.datasets import load_diabetes
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.preprocessing import StandardScaler
+
+from src.data import open_source, split_chunks
+from src.features import FEATURE_NAMES
+from src.incremental import ReservoirSample, SufficientStats, train_incremental
+from src.train import train_model_streaming
+
+
+def _diabetes_csv(tmp_path):
+    path = tmp_path / "diabetes.csv"
+    load_diabetes(as_frame=True).frame.to_csv(path, index=False)
+    return path
+
+
+def test_chunked_stats_match_full_matrix():
+    """Test merged chunk statistics equal the statistics of all rows."""
+    X, y = load_diabetes(return_X_y=True)
+    stats = SufficientStats(X.shape[1])
+    for X_chunk, y_chunk in zip(np.array_split(X, 9), np.array_split(y, 9)):
+        stats.update(X_chunk, y_chunk)
+
+    Xc = X - X.mean(axis=0)
+    np.testing.assert_allclose(stats.x_mean, X.mean(axis=0), atol=1e-12)
+    np.testing.assert_allclose(stats.xx, Xc.T @ Xc, atol=1e-10)
+    np.testing.assert_allclose(stats.xy, Xc.T @ (y - y.mean()), rtol=1e-10)
+    np.testing.assert_allclose(stats.yy, ((y - y.mean()) ** 2).sum(), rtol=1e-12)
+
+
+def test_incremental_matches_in_memory_fit(tmp_path):
+    """Test OLS and Ridge from streamed chunks equal sklearn on the same rows."""
+    path = _diabetes_csv(tmp_path)
+    parts = list(split_chunks(open_source(path, chunk_size=1000)))
+    X_train = np.vstack([p[0] for p in parts])
+    y_train = np.concatenate([p[1] for p in parts])
+    X_scaled = StandardScaler().fit_transform(X_train)
+
+    for alpha, reference in ((0.0, LinearRegression()), (10.0, Ridge(alpha=10.0))):
+        pipeline, metrics = train_incremental(
+            open_source(path, chunk_size=37), alpha=alpha
+        )
+        reference.fit(X_scaled, y_train)
+        np.testing.assert_allclose(pipeline["model"].coef_, reference.coef_, rtol=1e-8)
+        assert np.isclose(pipeline["model"].intercept_, reference.intercept_)
+        assert metrics["n_train"] == len(y_train)
+
+
+def test_test_metrics_match_direct_evaluation(tmp_path):
+    """Test RMSE computed from test-set statistics equals direct scoring."""
+    path = _diabetes_csv(tmp_path)
+    pipeline, metrics = train_incremental(open_source(path, chunk_size=64))
+
+    parts = list(split_chunks(open_source(path, chunk_size=1000)))
+    X_test = np.vstack([p[2] for p in parts])
+    y_test = np.concatenate([p[3] for p in parts])
+    predictions = pipeline["model"].predict(pipeline["scaler"].transform(X_test))
+
+    assert np.isclose(metrics["rmse"], np.sqrt(np.mean((predictions - y_test) ** 2)))
+    assert list(pipeline["scaler"].feature_names_in_) == FEATURE_NAMES
+
+
+def test_reservoir_keeps_a_sample_of_distinct_streamed_rows():
+    """Test the reservoir fills first, then holds ``size`` distinct rows."""
+    X = np.arange(200, dtype=np.float64).reshape(100, 2)
+    sample = ReservoirSample(30, 2)
+    sample.update(X[:10])
+    np.testing.assert_array_equal(sample.sample, X[:10])
+    for chunk in np.array_split(X[10:], 6):
+        sample.update(chunk)
+    assert sample.seen == 100 and sample.sample.shape == (30, 2)
+    assert len(np.unique(sample.sample[:, 0])) == 30
+    assert np.isin(sample.sample, X).all()
+
+
+def test_streaming_training_refuses_tree_version(tmp_path):
+    """Test v0.3 is not silently trained as a linear model."""
+    with pytest.raises(ValueError, match="v0.3"):
+        train_model_streaming(_diabetes_csv(tmp_path), version="v0.3")
+
+
+def test_streaming_training_attaches_reference_arrays(tmp_path):
+    """Test out-of-core training stores cohort, drift, lookup and reference rows."""
+    pipeline, metrics = train_model_streaming(_diabetes_csv(tmp_path))
+    assert len(pipeline["cohort_scores"]) == metrics["n_train"]
+    assert pipeline["drift_edges"].shape == (9, len(FEATURE_NAMES))
+    assert "lookup_preferred" in pipeline["lookup_tables"]
+    assert len(pipeline["reference_X"]) == metrics["n_test"]
@@ -0,0 +1,122 @@
+"""
+Tests for the inference engines.
+"""
+
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeRegressor
+from src.train import load_data, train_model_v01, train_model_v02
+from src.artifact import linear_pipeline_arrays
+from src.inference import (
+    FusedLinearEngine,
+    ReducedPrecisionEngine,
+    SklearnEngine,
+    build_engine,
+    max_deviation,
+    parse_precision_spec,
+    precision_for,
+    select_precision,
+    stored_deviation,
+)
+
+
+def _training_split():
+    X, y = load_data()
+    return X[:300], y[:300], X[300:].to_numpy()
+
+
+def test_fused_engine_matches_sklearn_v01():
+    """Test folded weights reproduce the v0.1 pipeline."""
+    X_train, y_train, X_test = _training_split()
+    pipeline = train_model_v01(X_train, y_train)
+
+    engine = build_engine(pipeline)
+
+    assert isinstance(engine, FusedLinearEngine)
+    assert max_deviation(engine, SklearnEngine(pipeline), X_test) < 1e-8
+
+
+def test_fused_engine_matches_sklearn_v02():
+    """Test folded weights reproduce the v0.2 pipeline."""
+    X_train, y_train, X_test = _training_split()
+    pipeline = train_model_v02(X_train, y_train)
+
+    engine = build_engine(pipeline)
+
+    assert isinstance(engine, FusedLinearEngine)
+    assert max_deviation(engine, SklearnEngine(pipeline), X_test) < 1e-8
+
+
+def test_single_row_prediction():
+    """Test the fused engine scores a single row like a batch row."""
+    X_train, y_train, X_test = _training_split()
+    engine = build_engine(train_model_v01(X_train, y_train))
+
+    batch = engine.predict(X_test)
+    single = engine.predict(X_test[3:4])
+
+    assert single.shape == (1,)
+    assert np.isclose(single[0], batch[3])
+
+
+def test_non_linear_pipeline_falls_back_to_sklearn():
+    """Test pipelines without coefficients use the sklearn engine."""
+    X_train, y_train, _ = _training_split()
+    pipeline = train_model_v01(X_train, y_train)
+    pipeline["model"] = DecisionTreeRegressor(max_depth=2).fit(
+        pipeline["scaler"].transform(X_train), y_train
+    )
+
+    assert isinstance(build_engine(pipeline), SklearnEngine)
+
+
+def test_forced_sklearn_mode():
+    """Test the fused path can be disabled explicitly."""
+    X_train, y_train, _ = _training_split()
+    pipeline = train_model_v01(X_train, y_train)
+
+    assert isinstance(build_engine(pipeline, mode="sklearn"), SklearnEngine)
+
+
+def _reduced(precision):
+    X_train, y_train, X_test = _training_split()
+    pipeline = train_model_v01(X_train, y_train)
+    fused = build_engine(pipeline)
+    engine = ReducedPrecisionEngine(fused.weights, fused.bias, precision)
+    return engine, fused, linear_pipeline_arrays(pipeline), X_test
+
+
+def test_float32_engine_scores_float32_rows_closely():
+    """Test float32 rows are scored in single precision near float64."""
+    engine, fused, _, X_test = _reduced("float32")
+    assert engine.weights.dtype == np.float32
+    assert stored_deviation(engine, fused, X_test) < 1e-3
+
+
+def test_float32_engine_scores_float64_rows_without_casting():
+    """Test float64 rows skip the cast and match the float64 engine exactly."""
+    engine, fused, _, X_test = _reduced("float32")
+    X = np.asarray(X_test, dtype=np.float64)
+    np.testing.assert_array_equal(engine.predict(X), fused.predict(X))
+
+
+def test_select_precision_refuses_inaccurate_engines():
+    """Test a reduced precision is only enabled within the tolerance."""
+    _, fused, arrays, X_test = _reduced("float32")
+
+    engine = select_precision(fused, arrays, "float32", X_test, tolerance=1e-9)
+    assert engine is fused
+
+    engine = select_precision(fused, arrays, "float32", X_test, tolerance=1e-3)
+    assert engine.kind == "fused-linear-float32"
+    assert 0 < engine.deviation < 1e-3
+
+
+def test_precision_spec_per_version():
+    """Test a precision spec sets a default and per-version overrides."""
+    assert precision_for("", "v0.1") == "float64"
+    assert precision_for("float32", "v0.1") == "float32"
+    assert precision_for("float64,v0.2:float32", "v0.2") == "float32"
+    assert precision_for("float64,v0.2:float32", "v0.1") == "float64"
+    with pytest.raises(ValueError):
+        parse_precision_spec("v0.1:int8")
@@ -2,9 +2,11 @@
 Integration tests for end-to-end workflows.
 """
 
+import os
 import pytest
 import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from pathlib import Path
 
@@ -19,6 +21,7 @@ def test_training_pipeline():
 
     # Check artifacts were created
     assert Path("models/model.pkl").exists()
+    assert Path("models/model.bin").exists()
     assert Path("models/metrics.json").exists()
 
 
@@ -110,3 +113,80 @@ def test_end_to_end_prediction():
     finally:
         process.terminate()
         process.wait(timeout=5)
+
+
+def test_lazy_startup_mode():
+    """Test the API serves requests when model loading is deferred to startup."""
+    if not Path("models/model.bin").exists():
+        pytest.skip("Model not trained yet")
+
+    process = subprocess.Popen(
+        [
+            "python",
+            "-m",
+            "uvicorn",
+            "src.api:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            "8003",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=dict(os.environ, STARTUP_MODE="lazy", MODEL_FORMAT="binary"),
+    )
+
+    try:
+        time.sleep(3)
+
+        response = requests.get("http://127.0.0.1:8003/health", timeout=5)
+        assert response.status_code == 200
+        assert response.json()["startup"]["sklearn_imported"] is False
+
+    finally:
+        process.terminate()
+        process.wait(timeout=5)
+
+
+def test_multi_worker_serving():
+    """Test the supervisor serves from several workers and reloads them together."""
+    if not Path("models/model.bin").exists():
+        pytest.skip("Model not trained yet")
+
+    process = subprocess.Popen(
+        [
+            "python",
+            "-m",
+            "src.serve",
+            "--workers",
+            "2",
+            "--port",
+            "8004",
+            "--watch-interval",
+            "0",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+
+    try:
+        time.sleep(5)
+
+        def health_pid(_):
+            return requests.get("http://127.0.0.1:8004/health", timeout=5).json()["pid"]
+
+        # Concurrent connections are accepted by both workers on the shared socket
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            pids = set(pool.map(health_pid, range(200)))
+        assert len(pids) == 2
+        assert process.pid not in pids
+
+        response = requests.post("http://127.0.0.1:8004/admin/reload", timeout=5)
+        assert response.json()["scheduled"] is True
+        time.sleep(2)
+
+    finally:
+        process.terminate()
+        output, _ = process.communicate(timeout=15)
+    assert "Generation 1 active on all 2 workers" in output
@@ -0,0 +1,135 @@
+"""
+Tests for the SQLite-backed bulk scoring job queue.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from src.audit import AuditLog, scan
+from src.features import FEATURE_NAMES
+from src.jobs import JobStore, job_status, process_job, run_once
+
+MODELS = Path("models")
+
+
+def _write_csv(path, n_rows):
+    rows = np.random.default_rng(0).normal(0, 0.05, size=(n_rows, 10))
+    lines = ["id," + ",".join(FEATURE_NAMES)]
+    lines += [f"p{i}," + ",".join(map(str, row)) for i, row in enumerate(rows)]
+    lines[5] = "p4,bad," + ",".join(["0"] * 9)
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def _results(store, job_id):
+    lines = store.result_path(job_id).read_text().splitlines()
+    return [json.loads(line) for line in lines]
+
+
+def test_job_is_scored_in_chunks(tmp_path):
+    """Test a queued job is claimed, scored chunk by chunk and marked done."""
+    store = JobStore(tmp_path / "jobs")
+    job = store.create(_write_csv(tmp_path / "in.csv", 25), "csv", None, 10)
+    assert run_once(store, "w1", MODELS) == job["id"]
+    assert run_once(store, "w1", MODELS) is None
+
+    status = job_status(store.get(job["id"]))
+    assert status["status"] == "done"
+    assert status["rows_done"] == 25 and status["errors"] == 1
+    assert status["progress"] == 1.0
+    results = _results(store, job["id"])
+    assert [r["index"] for r in results] == list(range(25))
+    assert [r["id"] for r in results][:2] == ["p0", "p1"]
+    assert "error" in results[4]
+
+
+def test_invalid_utf8_row_does_not_fail_the_job(tmp_path):
+    """Test an undecodable input line becomes that row's error."""
+    store = JobStore(tmp_path / "jobs")
+    path = _write_csv(tmp_path / "in.csv", 5)
+    path.write_bytes(path.read_bytes().replace(b"p2,", b"p\xff2,"))
+    job = store.create(path, "csv", None, 10)
+    run_once(store, "w1", MODELS)
+
+    assert store.get(job["id"])["status"] == "done"
+    results = _results(store, job["id"])
+    assert [r["index"] for r in results] == list(range(5))
+    assert results[2]["error"].startswith("Invalid UTF-8")
+    assert "prediction" in results[3]
+
+
+def test_job_rows_are_audited(tmp_path):
+    """Test every valid row a job scores is written to the audit log."""
+    store = JobStore(tmp_path / "jobs")
+    job = store.create(_write_csv(tmp_path / "in.csv", 25), "csv", None, 10)
+    audit_log = AuditLog(tmp_path / "audit", flush_interval=60)
+    run_once(store, "w1", MODELS, audit_log)
+    # Chunks are on disk before the job finishes, without closing the log
+    blocks = list(scan(tmp_path / "audit"))
+    audit_log.close()
+
+    predictions = np.concatenate([p for _, _, _, p in blocks])
+    scored = [r["prediction"] for r in _results(store, job["id"]) if "prediction" in r]
+    np.testing.assert_array_equal(predictions, scored)
+
+
+class _CrashAfterFirstChunk(JobStore):
+    def checkpoint(self, *args):
+        super().checkpoint(*args)
+        raise SystemExit("worker died")
+
+
+def test_job_resumes_from_last_checkpoint(tmp_path):
+    """Test a reclaimed job continues without lost or duplicated rows."""
+    source = _write_csv(tmp_path / "in.csv", 25)
+    reference = JobStore(tmp_path / "ref")
+    ref_job = reference.create(source, "csv", None, 10)
+    run_once(reference, "w1", MODELS)
+
+    store = _CrashAfterFirstChunk(tmp_path / "jobs")
+    job = store.create(source, "csv", None, 10)
+    claimed = store.claim("w1")
+    try:
+        process_job(store, claimed, "w1", MODELS)
+    except SystemExit:
+        pass
+    # Output written after the checkpoint must be discarded on resume
+    with open(store.result_path(job["id"]), "ab") as f:
+        f.write(b'{"index": 999}\n')
+    assert store.get(job["id"])["rows_done"] == 10
+
+    store = JobStore(tmp_path / "jobs")
+    assert store.claim("w2") is None
+    resumed = store.claim("w2", stale_after=0)
+    assert resumed["id"] == job["id"] and resumed["attempts"] == 2
+    assert process_job(store, resumed, "w2", MODELS) == "done"
+    assert _results(store, job["id"]) == _results(reference, ref_job["id"])
+
+
+class _CancelAfterCheckpoint(JobStore):
+    def checkpoint(self, job_id, *args):
+        committed = super().checkpoint(job_id, *args)
+        self.cancel(job_id)
+        return committed
+
+
+def test_cancelling_a_running_job_is_not_overwritten(tmp_path):
+    """Test a job cancelled while it is being scored stays cancelled."""
+    store = _CancelAfterCheckpoint(tmp_path / "jobs")
+    # One chunk: the cancel lands after the last checkpoint, before finish
+    job = store.create(_write_csv(tmp_path / "in.csv", 5), "csv", None, 10)
+    claimed = store.claim("w1")
+
+    assert process_job(store, claimed, "w1", MODELS) == "cancelled"
+    assert store.get(job["id"])["status"] == "cancelled"
+
+
+def test_cancel_stops_worker(tmp_path):
+    """Test a cancelled job is not claimed and cannot be checkpointed."""
+    store = JobStore(tmp_path)
+    job = store.create(_write_csv(tmp_path / "in.csv", 5), "csv", None, 10)
+    assert store.cancel(job["id"])["status"] == "cancelled"
+    assert store.claim("w1") is None
+    assert not store.checkpoint(job["id"], "w1", 0, 0, 0, 0)
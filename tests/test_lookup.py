@@ -0,0 +1,67 @@
+"""
+Tests for per-feature score lookup tables.
+"""
+
+import numpy as np
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import StandardScaler
+
+from src.artifact import linear_pipeline_arrays
+from src.inference import FusedLinearEngine
+from src.lookup import (
+    LookupEngine,
+    build_lookup_tables,
+    choose_engine,
+    tables_are_faster,
+)
+
+
+def _pipeline(seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 0.05, size=(300, 4))
+    # Two low-cardinality features: a binary one and a five-level one
+    X[:, 1] = rng.choice([-0.04, 0.05], size=300)
+    X[:, 3] = rng.integers(0, 5, size=300) * 0.01
+    y = X @ np.array([300.0, -50.0, 500.0, 120.0]) + 150
+    scaler = StandardScaler().fit(X)
+    model = LinearRegression().fit(scaler.transform(X), y)
+    return {"scaler": scaler, "model": model}, X
+
+
+def test_tables_cover_low_cardinality_features():
+    """Test only features under the distinct-value limit are tabulated."""
+    pipeline, X = _pipeline()
+    tables = build_lookup_tables(linear_pipeline_arrays(pipeline), X, max_values=8)
+    assert tables["lookup_features"].tolist() == [1, 3]
+    assert tables["lookup_offsets"].tolist() == [0, 2, 7]
+    np.testing.assert_array_equal(tables["lookup_keys"][:2], [-0.04, 0.05])
+
+
+def test_lookup_engine_matches_dot_product():
+    """Test table scores equal the fused engine, including untabulated values."""
+    pipeline, X = _pipeline(1)
+    arrays = linear_pipeline_arrays(pipeline)
+    engine = LookupEngine(dict(arrays, **build_lookup_tables(arrays, X, max_values=8)))
+    fused = FusedLinearEngine.from_pipeline(pipeline)
+
+    unseen = X.copy()
+    unseen[::3, 1] = 0.01
+    unseen[1::3, 3] = 1.5
+    for rows in (X, unseen, X[:1]):
+        np.testing.assert_allclose(engine.predict(rows), fused.predict(rows), atol=1e-9)
+
+
+def test_choose_engine_modes():
+    """Test "auto" follows the saved preference and the other modes force one."""
+    pipeline, X = _pipeline(2)
+    arrays = linear_pipeline_arrays(pipeline)
+    fused = FusedLinearEngine.from_pipeline(pipeline)
+    assert choose_engine(fused, arrays) is fused
+
+    arrays.update(build_lookup_tables(arrays, X, max_values=8))
+    assert choose_engine(fused, arrays, mode="dot") is fused
+    assert choose_engine(fused, arrays, mode="table").kind == "lookup-table"
+    assert choose_engine(fused, arrays, mode="auto") is fused
+    arrays["lookup_preferred"] = np.array([1], dtype=np.int8)
+    assert choose_engine(fused, arrays, mode="auto").kind == "lookup-table"
+    assert isinstance(tables_are_faster(arrays, X), bool)
@@ -0,0 +1,138 @@
+"""
+Tests for the model registry and hot reload.
+"""
+
+import json
+import os
+import pickle
+import numpy as np
+import pytest
+from src.inference import FusedLinearEngine
+from src.registry import LoadedModel, ModelNotFoundError, ModelRegistry
+from src.train import load_data, train_model_v01, train_model_v02, write_artifact_dir
+
+
+def _write_version(directory, version, train_fn=train_model_v01):
+    X, y = load_data()
+    write_artifact_dir(train_fn(X[:300], y[:300]), {"version": version}, directory)
+
+
+def test_lease_keeps_replaced_model_until_released():
+    """Test a swapped-out model drains before it is released."""
+    registry = ModelRegistry()
+    old = LoadedModel("v1", engine=FusedLinearEngine(np.zeros(10), 0.0), metadata={})
+    registry.register(old)
+
+    lease = registry.acquire("v1")
+    registry.register(
+        LoadedModel("v1", engine=FusedLinearEngine(np.zeros(10), 0.0), metadata={})
+    )
+
+    assert lease is old
+    assert old.engine is not None
+    assert registry.info()["draining"][0]["in_flight"] == 1
+
+    registry.release(lease)
+
+    assert old.engine is None
+    assert registry.info()["draining"] == []
+
+
+def test_unknown_version_raises():
+    """Test leasing a version that is not loaded."""
+    registry = ModelRegistry()
+    with pytest.raises(ModelNotFoundError):
+        registry.acquire("v404")
+
+
+def test_refresh_discovers_versions(tmp_path):
+    """Test the default directory and version subdirectories are all served."""
+    _write_version(tmp_path, "v0.2", train_model_v02)
+    _write_version(tmp_path / "v0.1", "v0.1")
+    _write_version(tmp_path / "v0.2", "v0.2", train_model_v02)
+
+    registry = ModelRegistry()
+    reloaded = registry.refresh(tmp_path)
+
+    assert sorted(reloaded) == ["v0.1", "v0.2"]
+    assert registry.default_version == "v0.2"
+    assert registry.get("v0.2").source.parent == tmp_path
+
+
+def test_refresh_reloads_changed_artifact(tmp_path):
+    """Test a rewritten artifact is swapped in and unchanged ones are kept."""
+    _write_version(tmp_path, "v0.1")
+    registry = ModelRegistry()
+    registry.refresh(tmp_path)
+    first = registry.get("v0.1")
+
+    assert registry.refresh(tmp_path) == []
+
+    _write_version(tmp_path, "v0.1", train_model_v02)
+    stat = (tmp_path / "model.bin").stat()
+    os.utime(tmp_path / "model.bin", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert registry.refresh(tmp_path) == ["v0.1"]
+    assert registry.get("v0.1") is not first
+
+
+def test_refresh_applies_precision_per_version(tmp_path):
+    """Test a precision spec switches only the named version's engine."""
+    _write_version(tmp_path, "v0.1")
+    _write_version(tmp_path / "v0.2", "v0.2", train_model_v02)
+
+    registry = ModelRegistry()
+    registry.refresh(tmp_path, precision="float64,v0.2:float32")
+
+    assert registry.get("v0.1").engine.kind == "fused-linear"
+    assert registry.get("v0.2").engine.kind == "fused-linear-float32"
+    assert registry.get("v0.2").info()["precision_deviation"] < 1e-3
+
+
+def test_broken_artifact_keeps_serving_previous(tmp_path):
+    """Test a corrupt replacement does not take the version offline."""
+    _write_version(tmp_path, "v0.1")
+    registry = ModelRegistry()
+    registry.refresh(tmp_path, fmt="binary")
+    first = registry.get("v0.1")
+
+    (tmp_path / "model.bin").write_bytes(b"garbage")
+    (tmp_path / "metrics.json").write_text(json.dumps({"version": "v0.1"}))
+
+    assert registry.refresh(tmp_path, fmt="binary") == []
+    assert registry.get("v0.1") is first
+    assert pickle.loads((tmp_path / "model.pkl").read_bytes())
+
+
+def test_pickle_fallback_is_not_reloaded_every_refresh(tmp_path):
+    """Test a model served from the pickle fallback counts as unchanged."""
+    _write_version(tmp_path, "v0.1")
+    (tmp_path / "model.bin").write_bytes(b"garbage")
+    registry = ModelRegistry()
+
+    assert registry.refresh(tmp_path) == ["v0.1"]
+    first = registry.get("v0.1")
+    assert first.source.name == "model.pkl"
+    assert registry.refresh(tmp_path) == []
+    assert registry.get("v0.1") is first
+
+    _write_version(tmp_path, "v0.1", train_model_v02)
+    stat = (tmp_path / "model.bin").stat()
+    os.utime(tmp_path / "model.bin", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert registry.refresh(tmp_path) == ["v0.1"]
+    assert registry.get("v0.1").source.name == "model.bin"
+
+
+def test_listeners_are_notified_on_swap():
+    """Test listeners (e.g. the prediction cache) hear about swaps and removals."""
+    registry = ModelRegistry()
+    seen = []
+    registry.add_listener(seen.append)
+
+    registry.register(
+        LoadedModel("v1", engine=FusedLinearEngine(np.zeros(10), 0.0), metadata={})
+    )
+    registry.unregister("v1")
+
+    assert seen == ["v1", "v1"]
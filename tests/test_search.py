@@ -0,0 +1,69 @@
+"""
+Tests for the cross-validated hyperparameter search.
+"""
+
+import numpy as np
+from sklearn.datasets import load_diabetes
+from sklearn.linear_model import ElasticNet, Lasso, Ridge
+
+from src.search import fit_best, l1_path_mse, ridge_path_mse, search, standardize
+
+
+def _split():
+    X, y = load_diabetes(return_X_y=True)
+    X_train, X_val = standardize(X[:350], X[350:])
+    return X_train, y[:350], X_val, y[350:]
+
+
+def _mse(model, X_train, y_train, X_val, y_val):
+    return np.mean((model.fit(X_train, y_train).predict(X_val) - y_val) ** 2)
+
+
+def test_ridge_path_matches_sklearn():
+    """Test the closed-form SVD path reproduces individual Ridge fits."""
+    X_train, y_train, X_val, y_val = _split()
+    alphas = np.array([100.0, 10.0, 0.1])
+    expected = [_mse(Ridge(alpha=a), X_train, y_train, X_val, y_val) for a in alphas]
+    np.testing.assert_allclose(
+        ridge_path_mse(X_train, y_train, X_val, y_val, alphas), expected, rtol=1e-9
+    )
+
+
+def test_l1_paths_match_sklearn():
+    """Test Lasso/ElasticNet path scores match individual fits."""
+    X_train, y_train, X_val, y_val = _split()
+    alphas = np.array([5.0, 1.0, 0.1])
+    lasso = [_mse(Lasso(alpha=a), X_train, y_train, X_val, y_val) for a in alphas]
+    enet = [
+        _mse(ElasticNet(alpha=a, l1_ratio=0.5), X_train, y_train, X_val, y_val)
+        for a in alphas
+    ]
+    np.testing.assert_allclose(
+        l1_path_mse(X_train, y_train, X_val, y_val, alphas), lasso, rtol=1e-3
+    )
+    np.testing.assert_allclose(
+        l1_path_mse(X_train, y_train, X_val, y_val, alphas, 0.5), enet, rtol=1e-3
+    )
+
+
+def test_search_is_independent_of_worker_count():
+    """Test the process pool finds the same winner as the serial run."""
+    X, y = load_diabetes(return_X_y=True)
+    serial = search(X, y, folds=3, workers=1, n_alphas=20)
+    parallel = search(X, y, folds=3, workers=2, n_alphas=20)
+
+    assert serial["best"] == parallel["best"]
+    assert serial["n_candidates"] == 20 * 5
+    assert set(serial["best_per_family"]) == {"ridge", "lasso", "elasticnet"}
+    assert serial["search_time_s"] > 0
+
+
+def test_fit_best_builds_servable_pipeline():
+    """Test the winner is refit as a scaler + model pipeline."""
+    X, y = load_diabetes(return_X_y=True)
+    summary = search(X, y, folds=3, workers=1, n_alphas=10)
+    pipeline = fit_best(X, y, summary)
+
+    assert pipeline["type"] == summary["best"]["family"]
+    predictions = pipeline["model"].predict(pipeline["scaler"].transform(X[:5]))
+    assert predictions.shape == (5,)
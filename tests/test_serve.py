@@ -0,0 +1,82 @@
+"""
+Tests for the multi-worker supervisor helpers.
+"""
+
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from src.serve import (
+    Supervisor,
+    artifact_signature,
+    configure_worker_environment,
+    validate_artifacts,
+)
+
+
+def _model_dir(tmp_path):
+    if not Path("models/model.bin").exists():
+        pytest.skip("Model not trained yet")
+    root = tmp_path / "models"
+    root.mkdir()
+    for name in ("model.bin", "metrics.json"):
+        shutil.copy(Path("models") / name, root / name)
+    return root
+
+
+def test_artifact_signature_tracks_changes(tmp_path):
+    """Test rewriting an artifact changes the signature."""
+    root = _model_dir(tmp_path)
+    before = artifact_signature(root)
+    assert before == artifact_signature(root)
+
+    data = (root / "model.bin").read_bytes()
+    (root / "model.bin").write_bytes(data + b"\0" * 64)
+    assert artifact_signature(root) != before
+
+
+def test_validate_rejects_corrupt_artifact(tmp_path):
+    """Test a corrupted artifact fails validation before workers reload."""
+    root = _model_dir(tmp_path)
+    validate_artifacts(root)
+
+    data = bytearray((root / "model.bin").read_bytes())
+    data[-1] ^= 0xFF
+    (root / "model.bin").write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        validate_artifacts(root)
+
+
+def test_worker_environment_defers_watching_to_supervisor():
+    """Test workers get the supervisor PID and no watcher of their own."""
+    saved = dict(os.environ)
+    try:
+        os.environ["MODEL_WATCH_INTERVAL"] = "5"
+        configure_worker_environment()
+        assert os.environ["MODEL_WATCH_INTERVAL"] == "0"
+        assert os.environ["SERVE_SUPERVISOR_PID"] == str(os.getpid())
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+
+def test_reload_acks_are_checked_without_blocking(capsys):
+    """Test a pending generation is resolved by later monitor-loop checks."""
+    supervisor = Supervisor(config=None, n_workers=2)
+    supervisor._pending = (1, time.monotonic() + 30)
+    supervisor.acks[0] = 1
+    supervisor._check_acks()
+    assert supervisor._pending is not None
+
+    supervisor.acks[1] = 1
+    supervisor._check_acks()
+    assert supervisor._pending is None
+    assert "Generation 1 active on all 2 workers" in capsys.readouterr().out
+
+    supervisor._pending = (2, time.monotonic())
+    supervisor._check_acks()
+    assert supervisor._pending is None
+    assert "not acknowledged by workers [0, 1]" in capsys.readouterr().out
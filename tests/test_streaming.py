@@ -0,0 +1,148 @@
+"""
+Tests for chunked NDJSON/CSV bulk scoring.
+"""
+
+import asyncio
+import json
+import numpy as np
+from src.features import FEATURE_NAMES
+from src.streaming import STREAM_MAX_LINE_BYTES, ChunkedScorer, main
+
+
+def _sum_score(X):
+    return X.sum(axis=1)
+
+
+def _results(blocks):
+    return [
+        json.loads(line) for block in blocks for line in block.decode().splitlines()
+    ]
+
+
+def test_ndjson_chunks_are_scored_in_blocks():
+    """Test NDJSON input is scored in chunk-sized engine calls."""
+    calls = []
+
+    def score(X):
+        calls.append(X.shape[0])
+        return _sum_score(X)
+
+    lines = [
+        json.dumps(dict({f: 0.01 for f in FEATURE_NAMES}, id=str(i))) for i in range(5)
+    ]
+    scorer = ChunkedScorer(score, fmt="ndjson", chunk_size=2)
+
+    results = _results(scorer.score_lines(lines))
+
+    assert calls == [2, 2, 1]
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert [r["id"] for r in results] == ["0", "1", "2", "3", "4"]
+    assert np.allclose([r["prediction"] for r in results], 0.1)
+
+
+def test_ndjson_bad_rows_are_reported():
+    """Test invalid JSON and missing features become per-row errors."""
+    good = json.dumps({f: 0.0 for f in FEATURE_NAMES})
+    lines = [good, "{not json", json.dumps({"age": 0.1})]
+
+    results = _results(ChunkedScorer(_sum_score).score_lines(lines))
+
+    assert "prediction" in results[0]
+    assert results[1]["error"].startswith("Invalid JSON")
+    assert "bmi" in results[2]["error"]
+
+
+def test_csv_header_and_id_column():
+    """Test CSV input with a header row, id column and shuffled feature order."""
+    header = ["id"] + FEATURE_NAMES[::-1]
+    lines = [",".join(header), "a," + ",".join(["1"] * 10), "b," + ",".join(["2"] * 10)]
+    scorer = ChunkedScorer(_sum_score, fmt="csv", chunk_size=1)
+
+    results = _results(scorer.score_lines(lines))
+
+    assert [(r["id"], r["prediction"]) for r in results] == [("a", 10.0), ("b", 20.0)]
+
+
+def test_cli_scores_local_file(tmp_path):
+    """Test the command-line mode over a local NDJSON file."""
+    from src.train import train_model_v01, load_data
+    import pickle
+
+    X, y = load_data()
+    model_path = tmp_path / "model.pkl"
+    with open(model_path, "wb") as f:
+        pickle.dump(train_model_v01(X, y), f)
+
+    input_path = tmp_path / "patients.ndjson"
+    rows = X.head(3).to_dict(orient="records")
+    input_path.write_text("\n".join(json.dumps(r) for r in rows) + "\n")
+    output_path = tmp_path / "scores.ndjson"
+
+    main([str(input_path), "-o", str(output_path), "--model", str(model_path)])
+
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert len(results) == 3
+    assert all("prediction" in r for r in results)
+
+
+def test_overlong_stream_line_is_a_row_error():
+    """Test a line over the limit is reported by index without being buffered."""
+    row = json.dumps({f: 0.01 for f in FEATURE_NAMES}).encode()
+    pieces = [row + b"\n", b"[" * 40000, b"1" * (STREAM_MAX_LINE_BYTES // 2)]
+    pieces += [b"x" * 40000 + b"\n" + row, b"\n"]
+
+    async def body():
+        for piece in pieces:
+            yield piece
+
+    async def collect():
+        scorer = ChunkedScorer(_sum_score, chunk_size=2)
+        return [block async for block in scorer.ascore_bytes(body())]
+
+    results = _results(asyncio.run(collect()))
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert "prediction" in results[0] and "prediction" in results[2]
+    assert results[1]["error"] == f"Line longer than {STREAM_MAX_LINE_BYTES} bytes"
+
+
+def test_invalid_utf8_line_is_a_row_error():
+    """Test an undecodable line is reported by index and the stream goes on."""
+    row = json.dumps({f: 0.01 for f in FEATURE_NAMES}).encode()
+    pieces = [row + b"\n", b'{"age": 0.1\xff}\n', row + b"\n"]
+
+    async def body():
+        for piece in pieces:
+            yield piece
+
+    async def collect():
+        scorer = ChunkedScorer(_sum_score, chunk_size=2)
+        return [block async for block in scorer.ascore_bytes(body())]
+
+    results = _results(asyncio.run(collect()))
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert "prediction" in results[0] and "prediction" in results[2]
+    assert results[1]["error"] == "Invalid UTF-8 at byte 11"
+
+
+def test_cli_loads_versions_through_the_registry(tmp_path):
+    """Test the CLI scores with the version the API would serve from a model root."""
+    from src.train import (
+        train_model_v01,
+        train_model_v02,
+        load_data,
+        write_artifact_dir,
+    )
+
+    X, y = load_data()
+    for version, train in (("v0.1", train_model_v01), ("v0.2", train_model_v02)):
+        write_artifact_dir(train(X, y), {"version": version}, tmp_path / version)
+    input_path = tmp_path / "patients.ndjson"
+    input_path.write_text(json.dumps(X.iloc[0].to_dict()) + "\n")
+
+    predictions = {}
+    for version in ("v0.1", "v0.2"):
+        output_path = tmp_path / f"{version}.ndjson"
+        argv = [str(input_path), "-o", str(output_path), "--model", str(tmp_path)]
+        main(argv + ["--version", version])
+        predictions[version] = json.loads(output_path.read_text())["prediction"]
+    assert predictions["v0.1"] != predictions["v0.2"]
@@ -0,0 +1,75 @@
+"""
+Tests for metric families and stage timing.
+"""
+
+from src.telemetry import (
+    MetricsRegistry,
+    StageTimer,
+    _current_timer,
+    instrumented,
+    timed,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test bucket counts are cumulative and end with +Inf."""
+    metrics = MetricsRegistry()
+    hist = metrics.histogram("latency", "Latency.", ("endpoint",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        hist.observe(("/predict",), value)
+
+    text = metrics.render()
+    assert 'latency_bucket{endpoint="/predict",le="0.1"} 1' in text
+    assert 'latency_bucket{endpoint="/predict",le="1.0"} 3' in text
+    assert 'latency_bucket{endpoint="/predict",le="+Inf"} 4' in text
+    assert 'latency_count{endpoint="/predict"} 4' in text
+    assert hist.count(("/predict",)) == 4
+
+
+def test_counter_and_collector_render():
+    """Test counters and collector samples appear in the exposition."""
+    metrics = MetricsRegistry()
+    counter = metrics.counter("requests_total", "Requests.", ("status",))
+    counter.inc(("200",))
+    counter.inc(("200",), 2)
+    metrics.add_collector(lambda: [("size", "gauge", "Size.", [({}, 7)])])
+
+    text = metrics.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{status="200"} 3' in text
+    assert "size 7" in text
+
+
+def test_timed_is_noop_without_active_timer():
+    """Test stages are recorded only inside an instrumented request."""
+    with timed("predict"):
+        pass
+
+    timer = StageTimer()
+    token = _current_timer.set(timer)
+    try:
+        with timed("predict"):
+            pass
+        with timed("predict"):
+            pass
+    finally:
+        _current_timer.reset(token)
+    assert set(timer.stages) == {"predict"}
+    assert timer.stages["predict"] >= 0
+
+
+def test_instrumented_marks_handler_boundaries():
+    """Test the decorator keeps the signature and stamps entry/exit times."""
+
+    def handler(x: int, y: int = 2):
+        return x + y
+
+    wrapped = instrumented(handler)
+    timer = StageTimer()
+    token = _current_timer.set(timer)
+    try:
+        assert wrapped(1) == 3
+    finally:
+        _current_timer.reset(token)
+    assert wrapped.__wrapped__ is handler
+    assert timer.started <= timer.handler_started <= timer.handler_finished
@@ -0,0 +1,85 @@
+"""
+Tests for the flattened tree-ensemble engine.
+"""
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+
+from src import trees
+from src.artifact import load_artifact, save_artifact
+from src.features import FEATURE_NAMES
+from src.inference import build_engine, engine_from_artifact
+from src.train import load_data, train_model_v03
+from src.trees import TreeEnsembleEngine, float32_thresholds, tree_ensemble_arrays
+
+
+def _pipeline(model):
+    X, y = load_data()
+    pipeline = train_model_v03(X[:300], y[:300])
+    if model is not None:
+        pipeline["model"] = model.fit(pipeline["scaler"].transform(X[:300]), y[:300])
+    return pipeline, X[300:].to_numpy()
+
+
+def _sklearn_predict(pipeline, X):
+    return pipeline["model"].predict(pipeline["scaler"].transform(X))
+
+
+def test_boosted_trees_match_sklearn_dense_and_paths():
+    """Test both evaluation strategies reproduce GradientBoosting predictions."""
+    pipeline, X_test = _pipeline(None)
+    engine = TreeEnsembleEngine.from_pipeline(pipeline)
+    assert engine.dense
+
+    expected = _sklearn_predict(pipeline, X_test)
+    np.testing.assert_allclose(engine.predict(X_test), expected, atol=1e-9)
+    engine.dense = False
+    np.testing.assert_allclose(engine.predict(X_test), expected, atol=1e-9)
+
+
+def test_deep_forest_matches_sklearn():
+    """Test a forest deeper than DENSE_MAX_DEPTH is walked path by path."""
+    forest = RandomForestRegressor(n_estimators=20, random_state=0)
+    pipeline, X_test = _pipeline(forest)
+    engine = TreeEnsembleEngine.from_pipeline(pipeline)
+    assert engine.depth > trees.DENSE_MAX_DEPTH and not engine.dense
+
+    expected = _sklearn_predict(pipeline, X_test)
+    np.testing.assert_allclose(engine.predict(X_test), expected, atol=1e-9)
+
+
+def test_uneven_depths_and_chunking():
+    """Test padded shallow leaves and chunk boundaries give exact sums."""
+    model = GradientBoostingRegressor(
+        n_estimators=15, max_depth=4, min_samples_leaf=40, random_state=0
+    )
+    pipeline, X_test = _pipeline(model)
+    X_test = np.tile(X_test, (5, 1))
+    assert len(X_test) > 2 * trees.DENSE_CHUNK_ROWS
+    engine = TreeEnsembleEngine.from_pipeline(pipeline)
+
+    expected = _sklearn_predict(pipeline, X_test)
+    np.testing.assert_allclose(engine.predict(X_test), expected, atol=1e-9)
+
+
+def test_float32_thresholds_keep_comparisons_exact():
+    """Test x > t32 agrees with x > t for float32 inputs around each threshold."""
+    thresholds = np.random.default_rng(0).normal(size=1000)
+    t32 = float32_thresholds(thresholds)
+    assert np.all(t32.astype(np.float64) <= thresholds)
+    for x in (t32, np.nextafter(t32, np.float32(np.inf))):
+        np.testing.assert_array_equal(x > t32, x.astype(np.float64) > thresholds)
+
+
+def test_tree_artifact_round_trip(tmp_path):
+    """Test a binary tree artifact serves the same predictions as the pickle."""
+    pipeline, X_test = _pipeline(None)
+    path = tmp_path / "model.bin"
+    save_artifact(path, tree_ensemble_arrays(pipeline), "tree_ensemble", FEATURE_NAMES)
+
+    engine = engine_from_artifact(load_artifact(path))
+    assert engine.kind == "tree-ensemble"
+    np.testing.assert_allclose(
+        engine.predict(X_test), _sklearn_predict(pipeline, X_test), atol=1e-9
+    )
+    assert build_engine(pipeline).kind == "tree-ensemble"
@@ -0,0 +1,48 @@
+"""
+Tests for cohort percentiles, risk tiers and top-K ranking.
+"""
+
+import numpy as np
+import pytest
+
+from src.triage import CohortIndex, cohort_scores, parse_tiers, top_k
+
+
+def test_percentile_is_share_of_cohort_at_or_below():
+    """Test percentiles come from a binary search over sorted scores."""
+    index = CohortIndex(np.arange(1.0, 101.0))
+    percentiles = index.percentile(np.array([0.5, 1.0, 50.0, 50.5, 100.0, 1e9]))
+    assert list(percentiles) == [0.0, 1.0, 50.0, 50.0, 100.0, 100.0]
+
+
+def test_tiers_use_upper_bounds():
+    """Test percentiles map to tiers with inclusive upper cutoffs."""
+    index = CohortIndex(np.arange(1.0, 101.0), tiers="low:50,high")
+    percentiles, tiers = index.triage([10.0, 50.0, 51.0])
+    assert percentiles == [10.0, 50.0, 51.0]
+    assert tiers == ["low", "low", "high"]
+
+
+def test_parse_tiers_rejects_bad_specs():
+    """Test tier specs need increasing bounds on all but the last tier."""
+    assert parse_tiers("a:10,b:20,c")[0] == ("a", "b", "c")
+    with pytest.raises(ValueError):
+        parse_tiers("a:20,b:10,c")
+    with pytest.raises(ValueError):
+        parse_tiers("a:10,b:20")
+
+
+def test_cohort_scores_are_sorted():
+    """Test cohort scores are sorted and CohortIndex rejects unsorted ones."""
+    scores = cohort_scores(lambda X: X[:, 0], np.array([[3.0], [1.0], [2.0]]))
+    assert list(scores) == [1.0, 2.0, 3.0]
+    with pytest.raises(ValueError):
+        CohortIndex(scores[::-1])
+
+
+def test_top_k_matches_full_sort():
+    """Test the partial sort returns the same ranking as a full sort."""
+    scores = np.random.default_rng(0).standard_normal(1000)
+    assert list(top_k(scores, 10)) == list(np.argsort(-scores)[:10])
+    assert list(top_k(scores[:3], 10)) == list(np.argsort(-scores[:3]))
+    assert top_k(scores, 0).size == 0